@@ -4,8 +4,10 @@ relevant information pertaining to backtesting strategies in the strategies modu
 """
 
 import pandas as pd 
-import matplotlib.pyplot as plt 
 import numpy as np
+from typing import Dict, Optional
+
+from backtest.metrics import Metrics
 
 
 class Backtest:
@@ -31,7 +33,7 @@ class Backtest:
                 raise ValueError(f"Error. Missing column: {r}")
 
     @staticmethod
-    def start(self, data:pd.DataFrame) -> pd.DataFrame:
+    def start(data: pd.DataFrame) -> pd.DataFrame:
         # Calculate returns 
         data.columns = [c.lower() for c in data.columns]
         
@@ -45,6 +47,20 @@ class Backtest:
         data['cumm_returns'] = data['strategy_returns'].cumsum()
         return data 
         
+    def metrics(self, periods_per_year: Optional[float] = None) -> Dict[str, float]:
+        """
+        Returns performance metrics of the backtest. See `Metrics`.
+
+        Parameters
+        ----------
+            periods_per_year: float
+                Number of bars per year, used to annualize Sharpe and Sortino
+        """
+        data = self.backtest_data
+        metrics = Metrics(periods_per_year)
+        metrics.extend(data['strategy_returns'].to_numpy(dtype=float), data['signal'].to_numpy(dtype=float))
+        return metrics.summary()
+
     def plot_equity_curve(self, data: pd.DataFrame = None) -> None:
         
         if data is None:
@@ -55,7 +71,10 @@ class Backtest:
 
         if 'cumm_returns' not in data.columns:
             raise ValueError("Strategy Returns not found in test dataframe.")
-        
+
+        # Imported on use, so headless runs (see `backtest.batch`) never load a GUI backend
+        import matplotlib.pyplot as plt
+
         data['cumm_returns'].plot(figsize=(12, 6))
         plt.title('Equity Curve')
         plt.ylabel('Strategy Returns')
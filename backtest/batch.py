@@ -0,0 +1,296 @@
+"""
+This module contains the headless batch backtest runner.
+
+A list of jobs (strategy key, config file, symbol, interval) is backtested concurrently, and each job writes its
+report to an output directory instead of showing a plot:
+
+    <output>/<job name>.png   - equity curve
+    <output>/<job name>.csv   - backtest data (returns, signal, cumulative returns)
+    <output>/<job name>.json  - performance metrics. See `Metrics`.
+    <output>/summary.json     - metrics (or error) of every job
+
+matplotlib is only imported when an equity curve is rendered, with the non-GUI Agg backend, so the runner works on
+machines without a display.
+
+Usage:
+    python -m backtest.batch --all --output reports
+    python -m backtest.batch --job ma_cross:default.ini:BTCUSDT:MIN_5 --job rsi:default.ini:ETHUSDT:MIN_15
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+from backtest.backtest import Backtest
+from configs.trade_cfg import TradeConfig
+from constants import constants as c
+from generic import generic
+from strategies.registry import load_strategy
+from templates.intervals import Timeframes
+
+_log = logging.getLogger(__name__)
+
+# Bars per year of calendar-based intervals. Minute intervals are derived from their value.
+PERIODS_PER_YEAR = {'D': 365, 'W': 52, 'M': 12}
+MINUTES_PER_YEAR = 365 * 24 * 60
+
+SUMMARY_FILE = 'summary.json'
+
+
+@dataclass
+class BacktestJob:
+    """
+    Holds a single batch backtest
+
+    Parameters
+    ----------
+        strategy: str
+            Strategy key in strategies.ini. Example: ma_cross
+
+        cfg: str
+            Config file in strategies/<strategy>/cfg. Example: default.ini
+
+        symbol: str
+            Symbol
+
+        interval: str
+            Timeframes name. Example: MIN_5
+
+        channel: str
+            Channel/Category
+    """
+    strategy: str
+    cfg: str
+    symbol: str = c.SYMBOL
+    interval: str = Timeframes.MIN_1.name
+    channel: str = c.CHANNEL
+
+    @property
+    def name(self) -> str:
+        cfg = os.path.splitext(self.cfg)[0]
+        return f"{self.strategy}_{cfg}_{self.symbol}_{self.interval}"
+
+    @classmethod
+    def parse(cls, value: str) -> "BacktestJob":
+        """
+        Parses a `<strategy>:<cfg>[:<symbol>[:<interval>]]` job from the command line.
+        """
+        parts = [p.strip() for p in value.split(':')]
+        if len(parts) < 2 or len(parts) > 4 or not all(parts):
+            raise ValueError(f"Invalid job: {value}. Use <strategy>:<cfg>[:<symbol>[:<interval>]]")
+        job = cls(*parts)
+        if job.interval not in Timeframes.available_timeframes():
+            raise ValueError(f"Invalid interval: {job.interval}. Valid values: {Timeframes.available_timeframes()}")
+        return job
+
+
+def periods_per_year(interval: Timeframes) -> float:
+    """
+    Returns the number of bars per year of an interval. Used to annualize Sharpe and Sortino.
+    """
+    if interval.value in PERIODS_PER_YEAR:
+        return PERIODS_PER_YEAR[interval.value]
+    return MINUTES_PER_YEAR / int(interval.value)
+
+
+def all_jobs(symbol: str = c.SYMBOL, interval: str = Timeframes.MIN_1.name) -> List[BacktestJob]:
+    """
+    Returns a job for every config file of every strategy registered in strategies.ini.
+    """
+    strategies_kv = generic.cfg_as_dict(os.path.join(c.STRATEGIES_DIRECTORY, c.STRATEGIES_FILE))
+    jobs = list()
+    for key in strategies_kv:
+        configs_directory = os.path.join(c.STRATEGIES_DIRECTORY, key, c.CONFIG_FOLDER)
+        if not os.path.isdir(configs_directory):
+            continue
+        for cfg in sorted(generic.get_configuration_files(configs_directory) or []):
+            jobs.append(BacktestJob(key, cfg, symbol, interval))
+    return jobs
+
+
+def render_equity_curve(equity: pd.Series, path: str, title: str) -> None:
+    """
+    Renders an equity curve to a PNG file, without a GUI backend.
+
+    Parameters
+    ----------
+        equity: pd.Series
+            Cumulative strategy returns
+
+        path: str
+            Output file
+
+        title: str
+            Chart title
+    """
+    # Figure and the Agg canvas are used directly, instead of pyplot, which selects an interactive backend and keeps
+    # global state that is not safe across worker threads.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.plot(equity.index, equity.to_numpy())
+    ax.set_title(title)
+    ax.set_ylabel('Strategy Returns')
+    figure.savefig(path)
+
+
+def write_report(name: str, data: pd.DataFrame, metrics: Dict[str, Any], directory: str) -> None:
+    """
+    Writes the equity curve (PNG), backtest data (CSV) and metrics (JSON) of a backtest.
+
+    Parameters
+    ----------
+        name: str
+            Report file name, without extension
+
+        data: pd.DataFrame
+            Backtest data, as returned by `Backtest.start()`
+
+        metrics: Dict[str, Any]
+            Performance metrics
+
+        directory: str
+            Output directory
+    """
+    path = os.path.join(directory, name)
+    columns = [col for col in ['close', 'calculated_side', 'signal', 'strategy_returns', 'cumm_returns']
+               if col in data.columns]
+    data[columns].to_csv(f"{path}.csv")
+    render_equity_curve(data['cumm_returns'], f"{path}.png", title=f"Equity Curve - {name}")
+    with open(f"{path}.json", 'w') as file:
+        json.dump(_json_safe(metrics), file, indent=4)
+
+
+def run_job(job: BacktestJob, directory: str, candles: int = 1000) -> Dict[str, Any]:
+    """
+    Fetches candles, backtests a single job, and writes its report. Errors are recorded in the result, so one failing
+    job does not stop the batch.
+
+    Parameters
+    ----------
+        job: BacktestJob
+            Job to run
+
+        directory: str
+            Output directory
+
+        candles: int
+            Number of candles to backtest
+    """
+    result: Dict[str, Any] = {'name': job.name, **asdict(job)}
+    try:
+        strategy = load_strategy(job.strategy)
+        interval = Timeframes[job.interval]
+        trade_config = TradeConfig(symbol=job.symbol, interval=interval, channel=job.channel)
+
+        cfg_path = os.path.join(c.STRATEGIES_DIRECTORY, job.strategy, c.CONFIG_FOLDER, job.cfg)
+        if not os.path.isfile(cfg_path):
+            raise FileNotFoundError(f"Config file not found: {cfg_path}")
+        instance = strategy(config=trade_config, strategy_config=generic.cfg_as_dict(cfg_path))
+
+        data = instance.fetch(candles)
+        if data is None:
+            raise RuntimeError("Unable to fetch candles.")
+
+        backtest = Backtest(instance.attach_indicators(data))
+        metrics = backtest.metrics(periods_per_year(interval))
+        write_report(job.name, backtest.backtest_data, metrics, directory)
+
+        result['metrics'] = metrics
+        result['error'] = None
+        _log.info(f"{job.name} - Total Return: {metrics['total_return']:.4f} Sharpe: {metrics['sharpe']:.2f}")
+    except Exception as e:
+        result['metrics'] = None
+        result['error'] = f"{type(e).__name__}: {e}"
+        _log.error(f"{job.name} - Backtest failed. {result['error']}")
+    return result
+
+
+def run_batch(
+        jobs: List[BacktestJob],
+        directory: str,
+        candles: int = 1000,
+        workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Runs backtest jobs concurrently, and writes a summary of every job to the output directory.
+
+    Jobs run in threads: most of a job is spent fetching candles, and jobs on the same instrument share one candle
+    store. See `get_store()`.
+
+    Parameters
+    ----------
+        jobs: List[BacktestJob]
+            Jobs to run
+
+        directory: str
+            Output directory. Created if it does not exist.
+
+        candles: int
+            Number of candles to backtest
+
+        workers: int
+            Number of worker threads. Defaults to the number of CPUs.
+    """
+    os.makedirs(directory, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda job: run_job(job, directory, candles), jobs))
+
+    with open(os.path.join(directory, SUMMARY_FILE), 'w') as file:
+        json.dump(_json_safe(results), file, indent=4)
+    return results
+
+
+def _json_safe(value: Any) -> Any:
+    # Metrics may contain NumPy scalars, and infinite profit factors, which are not valid JSON
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(v) for v in value]
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    return value
+
+
+def main(args: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description="Headless batch backtest runner")
+    parser.add_argument("--job", action="append", default=[],
+                        help="<strategy>:<cfg>[:<symbol>[:<interval>]]. Repeatable.")
+    parser.add_argument("--all", action="store_true", help="Runs every config of every strategy in strategies.ini")
+    parser.add_argument("--symbol", default=c.SYMBOL, help="Symbol used by --all")
+    parser.add_argument("--interval", default=Timeframes.MIN_1.name, choices=Timeframes.available_timeframes(),
+                        help="Interval used by --all")
+    parser.add_argument("--candles", type=int, default=1000, help="Number of candles to backtest")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="reports", help="Output directory")
+    options = parser.parse_args(args)
+
+    logging.basicConfig(format="%(asctime)s: %(message)s", level=logging.INFO, datefmt="%H:%M:%S")
+
+    jobs = [BacktestJob.parse(job) for job in options.job]
+    if options.all:
+        jobs += all_jobs(options.symbol, options.interval)
+    if len(jobs) == 0:
+        parser.error("No jobs. Use --job or --all.")
+
+    _log.info(f"Running {len(jobs)} backtests. Output: {options.output}")
+    results = run_batch(jobs, options.output, candles=options.candles, workers=options.workers)
+
+    failed = [r for r in results if r['error'] is not None]
+    _log.info(f"Completed {len(results) - len(failed)}/{len(results)} backtests.")
+    return results
+
+
+if __name__ == "__main__":
+    main()
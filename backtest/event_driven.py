@@ -0,0 +1,262 @@
+"""
+This module contains the EventBacktest class, an event-driven bar-by-bar backtester.
+
+Unlike the vectorized `Backtest`, positions are managed the way live orders are: a position is opened at the close of
+the bar where `calculated_side` becomes non-zero, with the take profit and stop loss that `Risk.calculate` attaches to
+live orders. Each following bar's High/Low is checked against TP/SL, and taker fees are charged on every fill.
+
+The inner loop runs on NumPy arrays. It is JIT-compiled with numba when numba is installed, and otherwise runs the same
+loop in the interpreter.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+
+from backtest.jit import jit
+from constants import constants as c
+from strategies.base.risk import Risk
+
+# Exit reasons recorded in the trade list
+EXIT_SIGNAL = 0  # Opposite signal
+EXIT_TAKE_PROFIT = 1
+EXIT_STOP_LOSS = 2
+EXIT_END = 3  # Closed on the last bar
+EXIT_REASONS = {
+    EXIT_SIGNAL: "Signal",
+    EXIT_TAKE_PROFIT: "Take Profit",
+    EXIT_STOP_LOSS: "Stop Loss",
+    EXIT_END: "End",
+}
+
+
+@jit
+def _pnl(side: int, quantity: float, entry_price: float, exit_price: float, fee: float) -> float:
+    # Profit of a closed trade, net of taker fees on entry and exit
+    return side * quantity * (exit_price - entry_price) - fee * quantity * (entry_price + exit_price)
+
+
+@jit
+def _record(
+        trade_index: np.ndarray,
+        trade_values: np.ndarray,
+        row: int,
+        entry_bar: int,
+        exit_bar: int,
+        side: int,
+        reason: int,
+        entry_price: float,
+        exit_price: float,
+        tp_price: float,
+        sl_price: float,
+        pnl: float) -> None:
+    # Writes a closed trade into the trade matrices
+    trade_index[row, 0] = entry_bar
+    trade_index[row, 1] = exit_bar
+    trade_index[row, 2] = side
+    trade_index[row, 3] = reason
+    trade_values[row, 0] = entry_price
+    trade_values[row, 1] = exit_price
+    trade_values[row, 2] = tp_price
+    trade_values[row, 3] = sl_price
+    trade_values[row, 4] = pnl
+
+
+@jit
+def _simulate(
+        open_: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        sides: np.ndarray,
+        quantity: float,
+        take_profit: float,
+        stop_loss: float,
+        fee: float,
+        digits: int,
+        reenter: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Simulates positions bar by bar.
+
+    Returns the equity of each bar, an integer trade matrix (entry bar, exit bar, side, exit reason), a float trade
+    matrix (entry price, exit price, take profit, stop loss, pnl), and the number of trades.
+    """
+    n = len(close)
+    equity = np.zeros(n)
+    # At most one entry per bar, so at most n trades
+    trade_index = np.zeros((n, 4), dtype=np.int64)
+    trade_values = np.zeros((n, 5))
+    count = 0
+
+    position = 0
+    entry_bar = -1
+    entry_price = 0.0
+    tp_price = 0.0
+    sl_price = 0.0
+    blocked_side = 0
+    realized = 0.0
+
+    for t in range(n):
+        # ----- Checks TP/SL against the bar's range. Gaps through a level fill at the open. ----- #
+        if position != 0 and t > entry_bar:
+            exit_price = 0.0
+            reason = -1
+            if position == 1:
+                if open_[t] <= sl_price:
+                    exit_price, reason = open_[t], EXIT_STOP_LOSS
+                elif open_[t] >= tp_price:
+                    exit_price, reason = open_[t], EXIT_TAKE_PROFIT
+                elif low[t] <= sl_price:
+                    # Stop loss is assumed first if both levels are within the bar
+                    exit_price, reason = sl_price, EXIT_STOP_LOSS
+                elif high[t] >= tp_price:
+                    exit_price, reason = tp_price, EXIT_TAKE_PROFIT
+            else:
+                if open_[t] >= sl_price:
+                    exit_price, reason = open_[t], EXIT_STOP_LOSS
+                elif open_[t] <= tp_price:
+                    exit_price, reason = open_[t], EXIT_TAKE_PROFIT
+                elif high[t] >= sl_price:
+                    exit_price, reason = sl_price, EXIT_STOP_LOSS
+                elif low[t] <= tp_price:
+                    exit_price, reason = tp_price, EXIT_TAKE_PROFIT
+
+            if reason >= 0:
+                pnl = _pnl(position, quantity, entry_price, exit_price, fee)
+                realized += pnl
+                _record(trade_index, trade_values, count, entry_bar, t, position, reason,
+                        entry_price, exit_price, tp_price, sl_price, pnl)
+                count += 1
+                if not reenter:
+                    blocked_side = position
+                position = 0
+
+        # ----- Acts on the calculated side at the close of the bar ----- #
+        side = sides[t]
+        if side != blocked_side:
+            blocked_side = 0
+        if side != 0 and side != position and side != blocked_side:
+            if position != 0:
+                # Closes the opposite position at the close
+                exit_price = close[t]
+                pnl = _pnl(position, quantity, entry_price, exit_price, fee)
+                realized += pnl
+                _record(trade_index, trade_values, count, entry_bar, t, position, EXIT_SIGNAL,
+                        entry_price, exit_price, tp_price, sl_price, pnl)
+                count += 1
+
+            # Opens a position with the same TP/SL as `Risk.calculate`
+            position = side
+            entry_bar = t
+            entry_price = close[t]
+            scale = 10.0 ** digits
+            tp_price = np.round((entry_price + side * entry_price * take_profit) * scale) / scale
+            sl_price = np.round((entry_price - side * entry_price * stop_loss) * scale) / scale
+
+        equity[t] = realized
+        if position != 0:
+            equity[t] += position * quantity * (close[t] - entry_price) - fee * quantity * entry_price
+
+    # ----- Closes any open position on the last bar ----- #
+    if position != 0 and n > 0:
+        exit_price = close[n - 1]
+        pnl = _pnl(position, quantity, entry_price, exit_price, fee)
+        _record(trade_index, trade_values, count, entry_bar, n - 1, position, EXIT_END,
+                entry_price, exit_price, tp_price, sl_price, pnl)
+        count += 1
+        equity[n - 1] = realized + pnl
+
+    return equity, trade_index, trade_values, count
+
+
+class EventBacktest:
+    """
+    Event-driven backtest of a strategy's calculated sides, honoring Risk TP/SL and taker fees.
+
+    Results:
+        equity: pd.Series
+            Realized plus open profit of each bar, in quote currency
+        trades: pd.DataFrame
+            One row per closed trade
+    """
+
+    def __init__(
+            self,
+            data: pd.DataFrame,
+            risk: Optional[Risk] = None,
+            fee: float = c.TAKER_FEE,
+            reenter: bool = True):
+        """
+        Parameters
+        ----------
+            data: pd.DataFrame
+                Output of `attach_indicators`. Required columns: open, high, low, close, calculated_side
+
+            risk: Risk
+                Risk parameters (quantity, take profit, stop loss). Defaults to `Risk()`, as used by live orders.
+
+            fee: float
+                Taker fee rate, charged on entry and exit notional
+
+            reenter: bool
+                Re-enters on the same side after a TP/SL exit, if the signal persists. Live strategies re-enter on
+                every candle with a signal.
+        """
+        self.valid_columns(data)
+        self.risk = risk if risk is not None else Risk()
+        self.fee = fee
+        self.reenter = reenter
+
+        self.data = data.copy()
+        self.data.columns = [col.lower() for col in self.data.columns]
+        self.equity, self.trades = self.start()
+
+    @staticmethod
+    def valid_columns(data: pd.DataFrame) -> None:
+        required_columns = ['open', 'high', 'low', 'close', 'calculated_side']
+        data_columns = [col.lower() for col in data.columns]
+        for r in required_columns:
+            if r not in data_columns:
+                raise ValueError(f"Error. Missing column: {r}")
+
+    def start(self) -> Tuple[pd.Series, pd.DataFrame]:
+        data = self.data
+        params = self.risk.params
+        equity, trade_index, trade_values, count = _simulate(
+            data['open'].to_numpy(dtype=np.float64),
+            data['high'].to_numpy(dtype=np.float64),
+            data['low'].to_numpy(dtype=np.float64),
+            data['close'].to_numpy(dtype=np.float64),
+            np.nan_to_num(data['calculated_side'].to_numpy(dtype=np.float64)).astype(np.int64),
+            float(params.quantity),
+            float(params.take_profit),
+            float(params.stop_loss),
+            float(self.fee),
+            int(self.risk.digits),
+            bool(self.reenter)
+        )
+
+        trade_index = trade_index[:count]
+        trade_values = trade_values[:count]
+        trades = pd.DataFrame({
+            'entry_time': data.index[trade_index[:, 0]],
+            'exit_time': data.index[trade_index[:, 1]],
+            'side': trade_index[:, 2],
+            'entry_price': trade_values[:, 0],
+            'exit_price': trade_values[:, 1],
+            'take_profit': trade_values[:, 2],
+            'stop_loss': trade_values[:, 3],
+            'quantity': params.quantity,
+            'fees': self.fee * params.quantity * (trade_values[:, 0] + trade_values[:, 1]),
+            'pnl': trade_values[:, 4],
+            'reason': [EXIT_REASONS[r] for r in trade_index[:, 3]],
+        })
+        return pd.Series(equity, index=data.index, name='equity'), trades
+
+    def plot_equity_curve(self) -> None:
+        import matplotlib.pyplot as plt
+
+        self.equity.plot(figsize=(12, 6))
+        plt.title('Equity Curve')
+        plt.ylabel('Profit (quote currency)')
+        plt.show()
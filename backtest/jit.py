@@ -0,0 +1,18 @@
+"""
+Optional JIT compilation for backtest inner loops.
+
+Loops decorated with `jit` are compiled with numba when numba is installed. Otherwise, the same loops run in the
+interpreter on NumPy arrays.
+"""
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def jit(func):
+    # Compiles the function if numba is available
+    if numba is None:
+        return func
+    return numba.njit(cache=True)(func)
@@ -0,0 +1,260 @@
+"""
+This module contains a broadcasted NumPy backtest kernel, which evaluates a whole family of signals at once.
+
+Signals are held as a 2-D matrix (one column per parameter set). Log returns, strategy returns and cumulative returns
+are computed column-wise in single broadcasted operations, and each run is summarized into one row of a compact
+structured array, instead of a DataFrame per run.
+
+Example: every (fast, slow) moving average pair of the MA Crossover strategy
+
+    results = ma_cross_grid(df['Close'].to_numpy(), fast_periods=range(5, 50), slow_periods=range(50, 300))
+    best = np.sort(results, order='total_return')[::-1][:10]
+"""
+
+import numpy as np
+from typing import Iterable, Optional, Tuple
+
+from templates.indicator import MAType
+
+# One row per evaluated signal column. Sharpe is per bar (not annualized), and position changes count every change of
+# the held position, including reversals. They are named apart from the `Metrics` fields (annualized sharpe, closed
+# trades), so scores of both paths are not compared as if they matched.
+RESULT_DTYPE = np.dtype([
+    ('total_return', np.float64),
+    ('sharpe_per_bar', np.float64),
+    ('max_drawdown', np.float64),
+    ('position_changes', np.int64),
+])
+
+# Maximum number of matrix elements processed at once. Larger grids are evaluated in column chunks.
+CHUNK_ELEMENTS = 4_000_000
+
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    """
+    Returns log returns of closing prices. The first value is 0.
+
+    Parameters
+    ----------
+        close: np.ndarray
+            Closing prices, oldest first
+    """
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.zeros_like(close)
+    returns[1:] = np.log(close[1:] / close[:-1])
+    return returns
+
+
+def sma_matrix(close: np.ndarray, periods: Iterable[int]) -> np.ndarray:
+    """
+    Returns simple moving averages for many periods from a single cumulative sum pass.
+
+    Matches `data.rolling(period).mean()`: the first `period - 1` rows of each column are NaN. Each column is a
+    difference of two slices of the cumulative sum, so no index arrays are allocated.
+
+    Parameters
+    ----------
+        close: np.ndarray
+            Closing prices, oldest first
+
+        periods: Iterable[int]
+            Rolling windows. One output column per period.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    periods = [int(period) for period in periods]
+    n = len(close)
+
+    cumsum = np.concatenate(([0.0], np.cumsum(close)))
+    out = np.full((n, len(periods)), np.nan, order='F')
+    for i, period in enumerate(periods):
+        if 0 < period <= n:
+            np.subtract(cumsum[period:], cumsum[:n + 1 - period], out=out[period - 1:, i])
+            out[period - 1:, i] /= period
+    return out
+
+
+def ema_matrix(close: np.ndarray, periods: Iterable[int]) -> np.ndarray:
+    """
+    Returns exponential moving averages for many spans, advancing all spans together one bar at a time.
+
+    Matches `data.ewm(span=period).mean()` (adjusted weights).
+
+    Parameters
+    ----------
+        close: np.ndarray
+            Closing prices, oldest first
+
+        periods: Iterable[int]
+            Spans. One output column per span.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    decay = 1.0 - 2.0 / (np.asarray(list(periods), dtype=np.float64) + 1.0)
+
+    out = np.empty((len(close), len(decay)))
+    numerator = np.zeros(len(decay))
+    denominator = np.zeros(len(decay))
+    for t, value in enumerate(close):
+        numerator = value + decay * numerator
+        denominator = 1.0 + decay * denominator
+        out[t] = numerator / denominator
+    return out
+
+
+def ma_matrix(close: np.ndarray, periods: Iterable[int], kind: MAType = MAType.SIMPLE) -> np.ndarray:
+    """
+    Returns moving averages of the specified type for many periods. See `sma_matrix()` and `ema_matrix()`.
+    """
+    if kind == MAType.SIMPLE:
+        return sma_matrix(close, periods)
+    if kind == MAType.EXPONENTIAL:
+        return ema_matrix(close, periods)
+    raise ValueError(f"Incorrect value for MA Type. Use: SIMPLE or EXPONENTIAL. Input: {kind}")
+
+
+def crossover_sides(fast_ma: np.ndarray, slow_ma: np.ndarray) -> np.ndarray:
+    """
+    Returns the calculated side of each bar: 1 if fast MA > slow MA, -1 if fast MA < slow MA, else 0.
+
+    Same rule as `MACross.attach_indicators()`. NaN values give 0.
+    """
+    with np.errstate(invalid='ignore'):
+        return (fast_ma > slow_ma).astype(np.int8) - (fast_ma < slow_ma).astype(np.int8)
+
+
+def positions(sides: np.ndarray) -> np.ndarray:
+    """
+    Returns the held position of each bar, for a matrix of calculated sides.
+
+    Same rule as `Backtest.start()`: the side calculated on a bar is held over the next bar.
+
+    Parameters
+    ----------
+        sides: np.ndarray
+            Calculated sides (1, -1, 0), shape (bars, signals)
+    """
+    sides = np.asarray(sides)
+    sides = sides.reshape(len(sides), -1)
+    signal = np.zeros(sides.shape)
+    signal[1:] = sides[:-1]
+    return signal
+
+
+def strategy_returns(close: np.ndarray, sides: np.ndarray) -> np.ndarray:
+    """
+    Returns strategy log returns for a matrix of calculated sides, one column per signal.
+
+    Parameters
+    ----------
+        close: np.ndarray
+            Closing prices, oldest first
+
+        sides: np.ndarray
+            Calculated sides (1, -1, 0), shape (bars, signals)
+    """
+    return positions(sides) * log_returns(close)[:, None]
+
+
+def summarize(returns: np.ndarray, signal: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Summarizes strategy returns column-wise into a structured array. See `RESULT_DTYPE`.
+
+    Parameters
+    ----------
+        returns: np.ndarray
+            Strategy log returns, shape (bars, signals). NaN values are treated as 0.
+
+        signal: np.ndarray
+            Held positions, shape (bars, signals). Used to count position changes.
+    """
+    returns = np.nan_to_num(np.asarray(returns, dtype=np.float64).reshape(len(returns), -1))
+    result = np.zeros(returns.shape[1], dtype=RESULT_DTYPE)
+    if len(returns) == 0:
+        return result
+
+    equity = np.cumsum(returns, axis=0)
+    sdev = returns.std(axis=0)
+    mean = returns.mean(axis=0)
+
+    result['total_return'] = equity[-1]
+    result['sharpe_per_bar'] = np.divide(mean, sdev, out=np.zeros_like(mean), where=sdev > 0)
+    # Cumulative returns start at 0, which is the first peak
+    peak = np.maximum(np.maximum.accumulate(equity, axis=0), 0.0)
+    result['max_drawdown'] = (peak - equity).max(axis=0)
+    if signal is not None:
+        signal = np.nan_to_num(np.asarray(signal, dtype=np.float64).reshape(returns.shape))
+        result['position_changes'] = np.count_nonzero(np.diff(signal, axis=0), axis=0)
+    return result
+
+
+def evaluate(close: np.ndarray, sides: np.ndarray) -> np.ndarray:
+    """
+    Backtests a matrix of calculated sides, and returns one summary row per column.
+
+    Parameters
+    ----------
+        close: np.ndarray
+            Closing prices, oldest first
+
+        sides: np.ndarray
+            Calculated sides (1, -1, 0), shape (bars, signals)
+    """
+    signal = positions(sides)
+    return summarize(signal * log_returns(close)[:, None], signal)
+
+
+def ma_pairs(fast_periods: Iterable[int], slow_periods: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns every (fast, slow) pair where fast < slow, as two aligned arrays.
+    """
+    fast, slow = np.meshgrid(np.asarray(list(fast_periods)), np.asarray(list(slow_periods)), indexing='ij')
+    valid = fast < slow
+    return fast[valid], slow[valid]
+
+
+def ma_cross_grid(
+        close: np.ndarray,
+        fast_periods: Iterable[int],
+        slow_periods: Iterable[int],
+        kind: MAType = MAType.SIMPLE) -> np.ndarray:
+    """
+    Backtests the MA Crossover strategy for every (fast, slow) pair where fast < slow.
+
+    Moving averages are computed once per distinct period, and pairs are evaluated in column chunks to bound memory.
+    Returns a structured array with the fast and slow periods, followed by the `RESULT_DTYPE` fields.
+
+    Parameters
+    ----------
+        close: np.ndarray
+            Closing prices, oldest first
+
+        fast_periods: Iterable[int]
+            Fast MA periods to test
+
+        slow_periods: Iterable[int]
+            Slow MA periods to test
+
+        kind: MAType
+            Type of moving average: SIMPLE or EXPONENTIAL
+    """
+    close = np.asarray(close, dtype=np.float64)
+    fast, slow = ma_pairs(fast_periods, slow_periods)
+
+    # One moving average column per distinct period
+    periods, inverse = np.unique(np.concatenate([fast, slow]), return_inverse=True)
+    averages = ma_matrix(close, periods, kind)
+    fast_index, slow_index = inverse[:len(fast)], inverse[len(fast):]
+
+    dtype = np.dtype([('fast_ma_period', np.int64), ('slow_ma_period', np.int64)] + RESULT_DTYPE.descr)
+    results = np.zeros(len(fast), dtype=dtype)
+    results['fast_ma_period'] = fast
+    results['slow_ma_period'] = slow
+
+    chunk = max(1, CHUNK_ELEMENTS // max(len(close), 1))
+    for begin in range(0, len(fast), chunk):
+        end = begin + chunk
+        sides = crossover_sides(averages[:, fast_index[begin:end]], averages[:, slow_index[begin:end]])
+        summary = evaluate(close, sides)
+        for name in RESULT_DTYPE.names:
+            results[name][begin:end] = summary[name]
+
+    return results
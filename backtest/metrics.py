@@ -0,0 +1,188 @@
+"""
+This module contains the Metrics class, which computes performance metrics in a single pass over strategy returns.
+
+Metrics are kept as a small running state, so they can be updated as new bars are appended (`update()`), or computed
+over a whole returns array (`extend()`) without adding a DataFrame column per metric.
+
+Metrics:
+    sharpe              - mean / standard deviation of bar returns (annualized if periods_per_year is set)
+    sortino             - mean / downside deviation of bar returns (annualized if periods_per_year is set)
+    max_drawdown        - largest drop of cumulative returns from a previous peak
+    max_drawdown_bars   - longest number of bars spent below a previous peak
+    win_rate            - share of trades with a positive return
+    profit_factor       - gross profit / gross loss of trades
+    exposure            - share of bars with an open position
+    turnover            - sum of absolute position changes
+"""
+
+import math
+import numpy as np
+from typing import Dict, Optional
+
+from backtest.jit import jit
+
+# ----- Running state layout ----- #
+COUNT = 0  # Number of bars
+MEAN = 1  # Mean bar return (Welford)
+M2 = 2  # Sum of squared deviations (Welford)
+DOWNSIDE = 3  # Sum of squared negative returns
+EQUITY = 4  # Cumulative returns
+PEAK = 5  # Highest cumulative returns
+MAX_DRAWDOWN = 6
+UNDERWATER = 7  # Bars since the last peak
+MAX_UNDERWATER = 8
+EXPOSED = 9  # Bars with an open position
+TURNOVER = 10
+POSITION = 11  # Position of the previous bar
+TRADE_RETURN = 12  # Return of the open trade
+WINS = 13
+LOSSES = 14
+GROSS_PROFIT = 15
+GROSS_LOSS = 16
+TRADES = 17  # Closed trades, including trades with a return of 0
+STATE_SIZE = 18
+
+
+@jit
+def _close_trade(state: np.ndarray) -> None:
+    trade = state[TRADE_RETURN]
+    state[TRADES] += 1
+    if trade > 0:
+        state[WINS] += 1
+        state[GROSS_PROFIT] += trade
+    elif trade < 0:
+        state[LOSSES] += 1
+        state[GROSS_LOSS] -= trade
+    state[TRADE_RETURN] = 0.0
+
+
+@jit
+def _accumulate(state: np.ndarray, returns: np.ndarray, positions: np.ndarray) -> None:
+    """
+    Advances the running state over an array of bar returns, and the positions held during each bar.
+    """
+    for t in range(len(returns)):
+        value = returns[t]
+        if value != value:
+            # NaN returns (e.g. first bar of a backtest) count as flat bars
+            value = 0.0
+        position = positions[t]
+        if position != position:
+            position = 0.0
+
+        # ----- Return distribution ----- #
+        state[COUNT] += 1
+        delta = value - state[MEAN]
+        state[MEAN] += delta / state[COUNT]
+        state[M2] += delta * (value - state[MEAN])
+        if value < 0:
+            state[DOWNSIDE] += value * value
+
+        # ----- Drawdown ----- #
+        # Cumulative returns start at 0, which is the first peak
+        state[EQUITY] += value
+        if state[EQUITY] >= state[PEAK]:
+            state[PEAK] = state[EQUITY]
+            state[UNDERWATER] = 0
+        else:
+            state[UNDERWATER] += 1
+            state[MAX_DRAWDOWN] = max(state[MAX_DRAWDOWN], state[PEAK] - state[EQUITY])
+            state[MAX_UNDERWATER] = max(state[MAX_UNDERWATER], state[UNDERWATER])
+
+        # ----- Trades ----- #
+        if position != state[POSITION]:
+            if state[POSITION] != 0:
+                _close_trade(state)
+            state[TURNOVER] += abs(position - state[POSITION])
+            state[POSITION] = position
+        if position != 0:
+            state[EXPOSED] += 1
+            state[TRADE_RETURN] += value
+
+
+class Metrics:
+    """
+    Single-pass performance metrics over strategy returns.
+
+    Returns are log returns of each bar (e.g. `strategy_returns` of `Backtest.start()`), and positions are the
+    positions held during each bar (e.g. `signal`). A trade is a run of bars with the same non-zero position.
+    """
+
+    def __init__(self, periods_per_year: Optional[float] = None):
+        """
+        Parameters
+        ----------
+            periods_per_year: float
+                Number of bars per year, used to annualize Sharpe and Sortino. Per-bar ratios are returned if None.
+                Example: 525600 for 1 minute bars.
+        """
+        self.periods_per_year = periods_per_year
+        self.state = np.zeros(STATE_SIZE)
+        self._one_return = np.zeros(1)
+        self._one_position = np.zeros(1)
+
+    def update(self, value: float, position: float = 0.0) -> None:
+        """
+        Advances the metrics by one bar.
+
+        Parameters
+        ----------
+            value: float
+                Strategy return of the bar
+
+            position: float
+                Position held during the bar (1, -1, 0)
+        """
+        self._one_return[0] = value
+        self._one_position[0] = position
+        _accumulate(self.state, self._one_return, self._one_position)
+
+    def extend(self, returns: np.ndarray, positions: Optional[np.ndarray] = None) -> "Metrics":
+        """
+        Advances the metrics over arrays of bars. Returns self, to allow `Metrics().extend(...).summary()`.
+
+        Parameters
+        ----------
+            returns: np.ndarray
+                Strategy returns of each bar
+
+            positions: np.ndarray
+                Positions held during each bar. Trade metrics are 0 if None.
+        """
+        returns = np.ascontiguousarray(returns, dtype=np.float64)
+        if positions is None:
+            positions = np.zeros(len(returns))
+        positions = np.ascontiguousarray(positions, dtype=np.float64)
+        _accumulate(self.state, returns, positions)
+        return self
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Returns the metrics of all bars received so far. The open trade, if any, is counted as closed.
+        """
+        state = self.state.copy()
+        if state[POSITION] != 0:
+            _close_trade(state)
+
+        count = state[COUNT]
+        sdev = math.sqrt(state[M2] / count) if count > 0 else 0.0
+        downside = math.sqrt(state[DOWNSIDE] / count) if count > 0 else 0.0
+        scale = math.sqrt(self.periods_per_year) if self.periods_per_year else 1.0
+        trades = state[TRADES]
+        if state[GROSS_LOSS] > 0:
+            profit_factor = state[GROSS_PROFIT] / state[GROSS_LOSS]
+        else:
+            profit_factor = math.inf if state[GROSS_PROFIT] > 0 else 0.0
+
+        return {
+            'total_return': float(state[EQUITY]),
+            'sharpe': state[MEAN] / sdev * scale if sdev > 0 else 0.0,
+            'sortino': state[MEAN] / downside * scale if downside > 0 else 0.0,
+            'max_drawdown': float(state[MAX_DRAWDOWN]),
+            'max_drawdown_bars': int(state[MAX_UNDERWATER]),
+            'trades': int(trades),
+            'win_rate': state[WINS] / trades if trades > 0 else 0.0,
+            'profit_factor': profit_factor,
+            'exposure': state[EXPOSED] / count if count > 0 else 0.0,
+            'turnover': float(state[TURNOVER]),
+        }
@@ -0,0 +1,487 @@
+"""
+This module contains the SimulatedBroker class, an in-process stand-in for the ByBit HTTP session, and the
+StageBacktest class, which drives a strategy's live `stage()` code through stored history.
+
+Vectorized backtests run `attach_indicators()`, so the decisions made in `stage()` - closes, flips, and the TP/SL
+attached by `Risk` - are never exercised on history. Here, each bar is staged as a confirmed candle, and the REST calls
+of the strategy are served by the broker:
+    get_kline           - candles up to the staged bar, plus the open of the next bar as the open candle
+    get_tickers         - close of the staged bar, as the mark price
+    get_positions       - position after the last fill
+    place_order         - market orders, filled at the open of the next bar
+    place_batch_order   - reduce-only closes, filled with the orders
+
+Positions are netted, as in one-way mode. Orders are filled before TP/SL are checked against the bar's High/Low, with
+the rules of `EventBacktest`: gaps through a level fill at the open, and the stop loss is assumed first if both levels
+are within the bar. Taker fees are charged on every fill.
+
+Usage:
+    python -m backtest.simulated_broker ma_cross --cfg default.ini --candles 2000
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest.event_driven import EXIT_END, EXIT_REASONS, EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT
+from constants import constants as c
+from market_data.store import CandleStore
+from market_data.window import CandleWindow
+from templates.candles import Candles
+
+_log = logging.getLogger(__name__)
+
+# Return codes of rejected requests, as sent by ByBit
+PARAMS_ERROR = 10001
+ORDER_NOT_FOUND = 110001
+REDUCE_ONLY_REJECTED = 110017
+
+# Fields of a V5 place_order request. Orders with other fields (e.g. take_profit instead of takeProfit) are
+# rejected, so a field the exchange would silently ignore fails the backtest instead.
+ORDER_FIELDS = {'category', 'symbol', 'isLeverage', 'side', 'orderType', 'qty', 'marketUnit', 'price',
+                'triggerDirection', 'orderFilter', 'triggerPrice', 'triggerBy', 'orderIv', 'timeInForce',
+                'positionIdx', 'orderLinkId', 'takeProfit', 'stopLoss', 'tpTriggerBy', 'slTriggerBy', 'reduceOnly',
+                'closeOnTrigger', 'smpType', 'mmp', 'tpslMode', 'tpLimitPrice', 'slLimitPrice', 'tpOrderType',
+                'slOrderType'}
+
+# Sizes below this are treated as flat
+_EPSILON = 1e-12
+
+
+@dataclass
+class SimulatedPosition:
+    side: int  # 1: Buy, -1: Sell
+    size: float
+    entry_price: float
+    entry_bar: int
+    take_profit: Optional[float] = None
+    stop_loss: Optional[float] = None
+
+
+class SimulatedBroker:
+    """
+    Serves the ByBit HTTP methods used by strategies from an array of historical candles, for a single symbol.
+
+    The broker is moved forward one bar at a time with `advance()`. Requests only see candles up to the current bar.
+    """
+
+    def __init__(self, data: pd.DataFrame, symbol: str, fee: float = c.TAKER_FEE):
+        """
+        Parameters
+        ----------
+            data: pd.DataFrame
+                Ascending OHLCV candles with a DatetimeIndex, as returned by `CandleStore.tail()`
+
+            symbol: str
+                Symbol served by the broker. Requests for other symbols are rejected.
+
+            fee: float
+                Taker fee rate, charged on entry and exit notional
+        """
+        if len(data) < 2:
+            raise ValueError(f"Invalid data. At least 2 candles are required. Input: {len(data)}")
+
+        self.symbol = symbol
+        self.fee = fee
+        self.index = data.index
+        self.time = ((data.index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+        self.interval = int(np.median(np.diff(self.time)))
+        self.open, self.high, self.low, self.close, self.volume, self.turnover = (
+            data[column].to_numpy(dtype=np.float64) for column in c.CANDLE_COLUMNS[1:])
+
+        # Index of the latest confirmed bar. -1 before the first bar.
+        self.cursor = -1
+        self.position: Optional[SimulatedPosition] = None
+        self.realized = 0.0
+        # Realized plus open profit at the close of each bar
+        self.equity = np.zeros(len(self.time))
+        self.pending: List[Dict] = list()
+        self.orders: List[Dict] = list()
+        self.trades: List[Dict] = list()
+        self.rejected = 0
+        self.order_ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def candle(self, bar: int) -> Candles:
+        """
+        Returns a bar as a confirmed candle, as received from the kline stream
+        """
+        start = int(self.time[bar])
+        end = start + self.interval - 1
+        return Candles(self.symbol, start, end, str(self.interval // 60_000), self.open[bar], self.close[bar],
+                       self.high[bar], self.low[bar], self.volume[bar], self.turnover[bar], True, end)
+
+    def advance(self) -> int:
+        """
+        Moves to the next bar. Fills pending orders at its open, checks TP/SL against its range, and marks the equity
+        at its close. Returns the new bar.
+        """
+        bar = self.cursor + 1
+        if bar >= len(self.time):
+            raise IndexError("No bars left to advance to.")
+        self.cursor = bar
+
+        pending, self.pending = self.pending, list()
+        for order in pending:
+            self.__fill(order, bar)
+        self.__check_exits(bar)
+
+        self.equity[bar] = self.__mark(bar)
+        return bar
+
+    def finish(self) -> None:
+        """
+        Closes any open position at the close of the current bar
+        """
+        bar = self.cursor
+        if self.position is not None and bar >= 0:
+            self.__close(self.position.size, self.close[bar], bar, EXIT_END)
+            self.equity[bar] = self.realized
+
+    # -------------------- REST Endpoints -------------------- #
+
+    def get_kline(self, symbol: str, limit: int = 200, start: Optional[int] = None, end: Optional[int] = None,
+                  **kwargs) -> Dict:
+        if symbol != self.symbol:
+            return _response({'symbol': symbol, 'list': []})
+
+        rows = list()
+        # The next bar is served as the open candle, with only its open price known
+        bar = self.cursor + 1
+        if bar < len(self.time) and (end is None or self.time[bar] <= end) and \
+                (start is None or self.time[bar] >= start):
+            price = str(self.open[bar])
+            rows.append([str(self.time[bar]), price, price, price, price, "0", "0"])
+
+        last = self.cursor + 1 if end is None else min(self.cursor + 1, int(np.searchsorted(self.time, end, 'right')))
+        first = 0 if start is None else int(np.searchsorted(self.time, start, 'left'))
+        first = max(first, last - (limit - len(rows)))
+        for i in range(last - 1, first - 1, -1):
+            rows.append([str(self.time[i]), str(self.open[i]), str(self.high[i]), str(self.low[i]),
+                         str(self.close[i]), str(self.volume[i]), str(self.turnover[i])])
+        return _response({'symbol': symbol, 'list': rows})
+
+    def get_tickers(self, symbol: str, **kwargs) -> Dict:
+        price = str(self.close[max(self.cursor, 0)])
+        return _response({'list': [{'symbol': symbol, 'markPrice': price, 'lastPrice': price}]})
+
+    def get_positions(self, **kwargs) -> Dict:
+        position = self.position
+        if position is None:
+            return _response({'list': []})
+        return _response({'list': [{
+            'symbol': self.symbol,
+            'side': _side_name(position.side),
+            'size': str(position.size),
+            'avgPrice': str(position.entry_price),
+            'takeProfit': str(position.take_profit or ''),
+            'stopLoss': str(position.stop_loss or ''),
+            'positionIdx': 0,
+        }]})
+
+    def get_open_orders(self, **kwargs) -> Dict:
+        # Market orders are filled on the next bar, and are never listed as open
+        return _response({'list': []})
+
+    def place_order(self, symbol: str, side: str, orderType: str, qty: Any, reduceOnly: bool = False,
+                    takeProfit: Optional[str] = None, stopLoss: Optional[str] = None, **kwargs) -> Dict:
+        # pybit sends keyword arguments unchanged, so only the V5 field names reach the exchange
+        unknown = sorted(set(kwargs) - ORDER_FIELDS)
+        if unknown:
+            _log.warning(f"Order rejected. Unknown fields: {unknown}")
+            return self.__reject(PARAMS_ERROR, f"Unknown order fields: {unknown}")
+
+        signed = 1 if side == 'Buy' else -1 if side == 'Sell' else 0
+        if symbol != self.symbol or signed == 0 or float(qty) <= 0:
+            return self.__reject(PARAMS_ERROR, f"Invalid order. Symbol: {symbol} Side: {side} Quantity: {qty}")
+        if orderType != 'Market':
+            return self.__reject(PARAMS_ERROR, f"Only market orders are simulated. Order type: {orderType}")
+        if reduceOnly and (self.position is None or self.position.side == signed):
+            return self.__reject(REDUCE_ONLY_REJECTED, "Reduce-only order has no position to reduce.")
+
+        order_id = f"sim-{next(self.order_ids)}"
+        order = {
+            'orderId': order_id,
+            'bar': self.cursor,
+            'side': signed,
+            'qty': float(qty),
+            'reduceOnly': bool(reduceOnly),
+            'takeProfit': float(takeProfit) if takeProfit else None,
+            'stopLoss': float(stopLoss) if stopLoss else None,
+        }
+        self.pending.append(order)
+        self.orders.append(order)
+        return _response({'orderId': order_id, 'orderLinkId': ''})
+
+    def place_batch_order(self, category: str, request: List[Dict]) -> Dict:
+        results = [self.place_order(category=category, **leg) for leg in request]
+        return {**_response({'list': [r['result'] for r in results]}),
+                'retExtInfo': {'list': [{'code': r['retCode'], 'msg': r['retMsg']} for r in results]}}
+
+    def cancel_batch_order(self, category: str, request: List[Dict]) -> Dict:
+        legs = [{'code': ORDER_NOT_FOUND, 'msg': "Order does not exist."}] * len(request)
+        return {**_response({'list': [{'orderId': r.get('orderId', '')} for r in request]}),
+                'retExtInfo': {'list': legs}}
+
+    def cancel_all_orders(self, **kwargs) -> Dict:
+        return _response({'list': []})
+
+    # -------------------- Private Methods -------------------- #
+
+    def __reject(self, code: int, message: str) -> Dict:
+        self.rejected += 1
+        return {'retCode': code, 'retMsg': message, 'result': {}}
+
+    def __fill(self, order: Dict, bar: int) -> None:
+        price = self.open[bar]
+        side = order['side']
+        qty = order['qty']
+        position = self.position
+
+        if order['reduceOnly']:
+            if position is None or position.side == side:
+                # The position was closed by an earlier order, or a TP/SL
+                self.rejected += 1
+                return
+            qty = min(qty, position.size)
+
+        if position is not None and position.side != side:
+            closed = min(qty, position.size)
+            self.__close(closed, price, bar, EXIT_SIGNAL)
+            qty -= closed
+
+        if qty <= _EPSILON:
+            return
+        position = self.position
+        if position is None:
+            self.position = SimulatedPosition(side, qty, price, bar, order['takeProfit'], order['stopLoss'])
+            return
+
+        # Adds to the position. TP/SL of the new order replace the position's.
+        size = position.size + qty
+        position.entry_price = (position.entry_price * position.size + price * qty) / size
+        position.size = size
+        if order['takeProfit'] is not None:
+            position.take_profit = order['takeProfit']
+        if order['stopLoss'] is not None:
+            position.stop_loss = order['stopLoss']
+
+    def __check_exits(self, bar: int) -> None:
+        position = self.position
+        if position is None:
+            return
+
+        open_, high, low = self.open[bar], self.high[bar], self.low[bar]
+        tp, sl = position.take_profit, position.stop_loss
+        if position.side == 1:
+            if sl is not None and open_ <= sl:
+                self.__close(position.size, open_, bar, EXIT_STOP_LOSS)
+            elif tp is not None and open_ >= tp:
+                self.__close(position.size, open_, bar, EXIT_TAKE_PROFIT)
+            elif sl is not None and low <= sl:
+                self.__close(position.size, sl, bar, EXIT_STOP_LOSS)
+            elif tp is not None and high >= tp:
+                self.__close(position.size, tp, bar, EXIT_TAKE_PROFIT)
+        else:
+            if sl is not None and open_ >= sl:
+                self.__close(position.size, open_, bar, EXIT_STOP_LOSS)
+            elif tp is not None and open_ <= tp:
+                self.__close(position.size, open_, bar, EXIT_TAKE_PROFIT)
+            elif sl is not None and high >= sl:
+                self.__close(position.size, sl, bar, EXIT_STOP_LOSS)
+            elif tp is not None and low <= tp:
+                self.__close(position.size, tp, bar, EXIT_TAKE_PROFIT)
+
+    def __close(self, qty: float, price: float, bar: int, reason: int) -> None:
+        position = self.position
+        fees = self.fee * qty * (position.entry_price + price)
+        pnl = position.side * qty * (price - position.entry_price) - fees
+        self.realized += pnl
+        self.trades.append({
+            'entry_time': self.index[position.entry_bar],
+            'exit_time': self.index[bar],
+            'side': position.side,
+            'entry_price': position.entry_price,
+            'exit_price': float(price),
+            'take_profit': position.take_profit,
+            'stop_loss': position.stop_loss,
+            'quantity': qty,
+            'fees': fees,
+            'pnl': pnl,
+            'reason': EXIT_REASONS[reason],
+        })
+        position.size -= qty
+        if position.size <= _EPSILON:
+            self.position = None
+
+    def __mark(self, bar: int) -> float:
+        position = self.position
+        if position is None:
+            return self.realized
+        return self.realized + position.side * position.size * (self.close[bar] - position.entry_price) \
+            - self.fee * position.size * position.entry_price
+
+
+class StageBacktest:
+    """
+    Runs a strategy's `stage()` on every bar of historical candles, with its REST calls sent to a SimulatedBroker.
+
+    The strategy is attached to the broker, a scratch candle store, and a fresh candle window. Streamed tickers and
+    account state are detached. Use a strategy instance that is not trading live.
+
+    Results:
+        equity: pd.Series
+            Realized plus open profit of each bar, in quote currency
+        trades: pd.DataFrame
+            One row per closed (or reduced) position, with the columns of `EventBacktest.trades`
+        broker: SimulatedBroker
+            Orders sent by the strategy, and the final account state
+    """
+
+    def __init__(
+            self,
+            strategy: Any,
+            data: pd.DataFrame,
+            warmup: Optional[int] = None,
+            fee: float = c.TAKER_FEE):
+        """
+        Parameters
+        ----------
+            strategy: Strategy
+                Strategy instance
+
+            data: pd.DataFrame
+                Ascending OHLCV candles with a DatetimeIndex
+
+            warmup: int
+                Number of leading candles served as history before the first staged candle. Defaults to the
+                strategy's `warmup_elements()`, or 0 if it has no streaming indicators.
+
+            fee: float
+                Taker fee rate, charged on entry and exit notional
+        """
+        if warmup is None:
+            try:
+                warmup = strategy.warmup_elements()
+            except NotImplementedError:
+                warmup = 0
+        if not 0 <= warmup < len(data) - 1:
+            raise ValueError(f"Invalid warmup. Value must be in [0, {len(data) - 1}). Input: {warmup}")
+
+        self.strategy = strategy
+        self.warmup = warmup
+        self.broker = SimulatedBroker(data, strategy.trade_config.symbol, fee=fee)
+        self.staged = 0
+        self.elapsed = 0.0
+        self.equity, self.trades = self.start()
+
+    @property
+    def rate(self) -> float:
+        # Candles staged per second
+        return self.staged / self.elapsed if self.elapsed > 0 else 0.0
+
+    def start(self) -> Tuple[pd.Series, pd.DataFrame]:
+        strategy = self.strategy
+        broker = self.broker
+        config = strategy.trade_config
+
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as directory:
+            strategy.attach_session(broker, CandleStore(config.symbol, config.channel, config.interval,
+                                                        directory=directory))
+            strategy.execution.tickers = None
+            strategy.execution.account = None
+
+            # Bars before the first staged bar are history
+            broker.cursor = self.warmup - 1
+            window = CandleWindow(c.CANDLE_WINDOW_CAPACITY)
+            strategy.attach_window(window)
+
+            last = len(broker) - 1
+            while True:
+                bar = broker.advance()
+                if bar == last:
+                    break
+                # Appended before staging, as by the strategy queue
+                candle = broker.candle(bar)
+                window.append_candle(candle)
+                strategy.stage(candle)
+                self.staged += 1
+            broker.finish()
+        self.elapsed = time.perf_counter() - start
+
+        equity = pd.Series(broker.equity, index=broker.index, name='equity')
+        columns = ['entry_time', 'exit_time', 'side', 'entry_price', 'exit_price', 'take_profit', 'stop_loss',
+                   'quantity', 'fees', 'pnl', 'reason']
+        return equity, pd.DataFrame(broker.trades, columns=columns)
+
+    def info(self) -> str:
+        return f"Staged: {self.staged} ({self.rate:.0f}/s) Orders: {len(self.broker.orders)} " \
+               f"Rejected: {self.broker.rejected} Trades: {len(self.trades)} Profit: {self.equity.iloc[-1]:.6f}"
+
+
+def _side_name(side: int) -> str:
+    return 'Buy' if side == 1 else 'Sell'
+
+
+def _response(result: Dict) -> Dict:
+    return {'retCode': 0, 'retMsg': 'OK', 'result': result}
+
+
+def main(args: Optional[List[str]] = None) -> StageBacktest:
+    from backtest.event_driven import EventBacktest
+    from strategies.registry import load_strategy
+    from configs.trade_cfg import TradeConfig
+    from generic import generic
+    from templates.intervals import Timeframes
+
+    parser = argparse.ArgumentParser(description="Runs a strategy's stage() on stored candles, with simulated fills")
+    parser.add_argument("strategy", help="Strategy key in strategies.ini. Example: ma_cross")
+    parser.add_argument("--cfg", default="default.ini", help="Config file in strategies/<strategy>/cfg, if present")
+    parser.add_argument("--symbol", default=c.SYMBOL)
+    parser.add_argument("--channel", default=c.CHANNEL)
+    parser.add_argument("--interval", default=Timeframes.MIN_1.name, choices=Timeframes.available_timeframes())
+    parser.add_argument("--candles", type=int, default=1000, help="Number of candles, including the warm-up")
+    parser.add_argument("--warmup", type=int, default=None, help="Defaults to the strategy's warm-up")
+    parser.add_argument("--verbose", action="store_true", help="Logs every staged candle")
+    options = parser.parse_args(args)
+
+    logging.basicConfig(format="%(asctime)s: %(message)s", level=logging.INFO, datefmt="%H:%M:%S")
+    if not options.verbose:
+        logging.getLogger('strategies').setLevel(logging.WARNING)
+
+    strategy_class = load_strategy(options.strategy)
+    trade_config = TradeConfig(symbol=options.symbol, interval=Timeframes[options.interval], channel=options.channel)
+    cfg_path = os.path.join(c.STRATEGIES_DIRECTORY, options.strategy, c.CONFIG_FOLDER, options.cfg)
+    strategy_config = generic.cfg_as_dict(cfg_path) if os.path.isfile(cfg_path) else dict()
+
+    # ----- Fetches candles once, through the strategy's candle store ----- #
+    loader = strategy_class(config=trade_config, strategy_config=dict(strategy_config))
+    data = loader.fetch(options.candles)
+    if data is None:
+        raise RuntimeError("Unable to fetch candles.")
+
+    strategy = strategy_class(config=trade_config, strategy_config=dict(strategy_config))
+    result = StageBacktest(strategy, data, warmup=options.warmup)
+    _log.info(f"Stage - {result.info()}")
+
+    # ----- Vectorized signals on the same candles, for comparison ----- #
+    if hasattr(loader, 'attach_indicators'):
+        event = EventBacktest(loader.attach_indicators(data.copy()).iloc[result.warmup:])
+        _log.info(f"Event - Trades: {len(event.trades)} Profit: {event.equity.iloc[-1]:.6f}")
+
+    return result
+
+
+if __name__ == "__main__":
+    main()
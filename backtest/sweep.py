@@ -0,0 +1,260 @@
+"""
+This module contains the parameter sweep backtester.
+
+A parameter grid over a strategy's config dataclass (e.g. `MACrossConfigs`) is expanded into configurations, and each
+configuration is backtested in a process pool. Candle data is placed in shared memory once, and attached by every
+worker, instead of being pickled per task.
+
+Usage:
+    python -m backtest.sweep ma_cross --grid fast_ma_period=10,20,30 --grid slow_ma_period=100,200
+"""
+
+import argparse
+import dataclasses
+import itertools
+import logging
+import os
+import sys
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+from backtest.backtest import Backtest
+from backtest.metrics import Metrics
+from configs.trade_cfg import TradeConfig
+from constants import constants as c
+from generic import generic
+from strategies.registry import load_strategy
+from templates.intervals import Timeframes
+
+_log = logging.getLogger(__name__)
+
+# Candle data attached by each worker process. See `_attach()`.
+_worker_data: Dict[str, Any] = dict()
+
+
+def config_class(strategy: type) -> type:
+    """
+    Returns the config dataclass of a strategy class.
+
+    Config dataclasses are named `<class_name>Configs`, and are found in the strategy module.
+
+    Parameters
+    ----------
+        strategy: type
+            Strategy class. Example: MACross
+    """
+    module = sys.modules[strategy.__module__]
+    configs = getattr(module, f"{strategy.__name__}Configs", None)
+    if configs is None or not dataclasses.is_dataclass(configs):
+        raise ValueError(f"Config dataclass not found for: {strategy.__name__}")
+    return configs
+
+
+def expand_grid(configs: type, grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Expands a parameter grid into a list of strategy configurations.
+
+    Parameters not in the grid keep the defaults of the config dataclass.
+
+    Parameters
+    ----------
+        configs: type
+            Config dataclass. Example: MACrossConfigs
+
+        grid: Dict[str, List[Any]]
+            Values to test, by config field
+    """
+    fields = {f.name: f for f in dataclasses.fields(configs)}
+    for key in grid:
+        if key not in fields:
+            raise ValueError(f"Invalid parameter for {configs.__name__}: {key}. Valid values: {list(fields)}")
+
+    defaults = {
+        name: f.default for name, f in fields.items()
+        if f.default is not dataclasses.MISSING and name not in grid
+    }
+
+    keys = list(grid.keys())
+    combinations = itertools.product(*(grid[k] for k in keys))
+    return [{**defaults, **dict(zip(keys, values))} for values in combinations]
+
+
+def score(data: pd.DataFrame) -> Dict[str, float]:
+    """
+    Summarizes a backtest, as returned by `Backtest.start()`, in a single pass. See `Metrics`.
+
+    Parameters
+    ----------
+        data: pd.DataFrame
+            Backtest data. Contains strategy_returns, signal
+    """
+    metrics = Metrics().extend(data['strategy_returns'].to_numpy(dtype=float), data['signal'].to_numpy(dtype=float))
+    return metrics.summary()
+
+
+def _attach(name: str, shape: Tuple[int, int]) -> None:
+    """
+    Pool initializer. Attaches the shared candle data once per worker.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    _worker_data['shm'] = shm
+    _worker_data['values'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _frame(values: np.ndarray) -> pd.DataFrame:
+    """
+    Builds a candle DataFrame whose columns are views of the shared data.
+    """
+    index = pd.DatetimeIndex(values[0].astype(np.int64).view('datetime64[ms]'), name='Time')
+    data = {name: values[i + 1] for i, name in enumerate(c.CANDLE_COLUMNS[1:])}
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def _run(strategy: type, trade_config: TradeConfig, strategy_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Backtests a single configuration against the shared candle data.
+    """
+    result: Dict[str, Any] = dict(strategy_config)
+    try:
+        instance = strategy(config=trade_config, strategy_config=dict(strategy_config))
+        df = instance.attach_indicators(_frame(_worker_data['values']))
+        result.update(score(Backtest.start(df)))
+        result['error'] = None
+    except Exception as e:
+        # Invalid configurations (e.g. fast MA greater than slow MA) are reported, and ranked last
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def sweep(
+        strategy: type,
+        trade_config: TradeConfig,
+        data: pd.DataFrame,
+        grid: Dict[str, List[Any]],
+        workers: Optional[int] = None,
+        rank_by: str = 'total_return') -> pd.DataFrame:
+    """
+    Backtests every configuration of a parameter grid in a process pool, and returns a ranked results table.
+
+    Parameters
+    ----------
+        strategy: type
+            Strategy class. Example: MACross
+
+        trade_config: TradeConfig
+            Trading configuration passed to each strategy instance
+
+        data: pd.DataFrame
+            OHLCV candles, as returned by `Strategy.fetch`
+
+        grid: Dict[str, List[Any]]
+            Values to test, by config field. Example: {"fast_ma_period": [10, 20], "slow_ma_period": [100, 200]}
+
+        workers: int
+            Number of worker processes. Defaults to the number of CPUs.
+
+        rank_by: str
+            Result column to rank by, in descending order
+    """
+    configurations = expand_grid(config_class(strategy), grid)
+
+    # ----- Places the candle data in shared memory: one row for Time, one row per OHLCV column ----- #
+    times = (data.index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+    values = np.vstack([np.asarray(times, dtype=np.float64), data[c.CANDLE_COLUMNS[1:]].to_numpy(dtype=float).T])
+    shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(configurations) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shm.name, values.shape)) as pool:
+            results = list(pool.map(
+                _run,
+                itertools.repeat(strategy),
+                itertools.repeat(trade_config),
+                configurations,
+                chunksize=chunksize
+            ))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    table = pd.DataFrame(results)
+    if rank_by in table.columns:
+        table = table.sort_values(rank_by, ascending=False, na_position='last')
+    return table.reset_index(drop=True)
+
+
+def parse_value(value: str) -> Any:
+    """
+    Converts a grid value from the command line to int, float, or str.
+    """
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            continue
+    return value
+
+
+def parse_grid(items: List[str]) -> Dict[str, List[Any]]:
+    """
+    Parses `<parameter>=<value>,<value>` items from the command line into a parameter grid.
+    """
+    grid = dict()
+    for item in items:
+        if '=' not in item:
+            raise ValueError(f"Invalid grid item: {item}. Use <parameter>=<value>,<value>")
+        key, values = item.split('=', 1)
+        grid[key.strip()] = [parse_value(v.strip()) for v in values.split(',') if v.strip()]
+    return grid
+
+
+def main(args: Optional[List[str]] = None) -> pd.DataFrame:
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep backtester")
+    parser.add_argument("strategy", help="Strategy key in strategies.ini. Example: ma_cross")
+    parser.add_argument("--grid", action="append", default=[], help="<parameter>=<value>,<value>. Repeatable.")
+    parser.add_argument("--cfg", default="default.ini", help="Strategy config used to fetch candles")
+    parser.add_argument("--symbol", default=c.SYMBOL)
+    parser.add_argument("--channel", default=c.CHANNEL)
+    parser.add_argument("--interval", default=Timeframes.MIN_1.name, choices=Timeframes.available_timeframes())
+    parser.add_argument("--candles", type=int, default=1000, help="Number of candles to backtest")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rank-by", default="total_return")
+    parser.add_argument("--top", type=int, default=20, help="Number of results to print")
+    parser.add_argument("--output", default=None, help="Writes the full results table to a CSV file")
+    options = parser.parse_args(args)
+
+    logging.basicConfig(format="%(asctime)s: %(message)s", level=logging.INFO, datefmt="%H:%M:%S")
+
+    strategy = load_strategy(options.strategy)
+    trade_config = TradeConfig(
+        symbol=options.symbol,
+        interval=Timeframes[options.interval],
+        channel=options.channel
+    )
+
+    # ----- Fetches candles once, through the strategy's candle store ----- #
+    cfg_path = os.path.join(c.STRATEGIES_DIRECTORY, options.strategy, c.CONFIG_FOLDER, options.cfg)
+    loader = strategy(config=trade_config, strategy_config=generic.cfg_as_dict(cfg_path))
+    data = loader.fetch(options.candles)
+    if data is None:
+        raise RuntimeError("Unable to fetch candles.")
+
+    grid = parse_grid(options.grid)
+    _log.info(f"Sweeping {len(expand_grid(config_class(strategy), grid))} configurations over {len(data)} candles")
+    table = sweep(strategy, trade_config, data, grid, workers=options.workers, rank_by=options.rank_by)
+
+    print(table.head(options.top).to_string())
+    if options.output is not None:
+        table.to_csv(options.output, index=False)
+        _log.info(f"Results written to: {options.output}")
+
+    return table
+
+
+if __name__ == "__main__":
+    main()
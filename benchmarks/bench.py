@@ -0,0 +1,320 @@
+"""
+Micro-benchmarks of the data path: strategy indicators, signal building, backtests, kline parsing and candle
+construction, on synthetic series.
+
+Each benchmark is timed `repeat` times, on a fresh copy of its input, and the median is compared against a stored
+baseline. Benchmarks slower than the baseline by more than `threshold` are reported as regressions.
+
+Usage:
+    python -m benchmarks.bench                              # 1k, 100k and 10M bars
+    python -m benchmarks.bench --sizes 1000 100000 --save   # stores the results as the baseline
+    python -m benchmarks.bench --filter MACross --threshold 0.1
+
+Baselines are machine specific, and are not committed.
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from configs.trade_cfg import TradeConfig
+from constants import constants as c
+from market_data.store import parse_klines
+from templates.candles import Candles
+from templates.intervals import Timeframes
+
+_log = logging.getLogger(__name__)
+
+BASELINE_FILE = os.path.join('benchmarks', 'baseline.json')
+SIZES = [1_000, 100_000, 10_000_000]
+# Median slowdown, relative to the baseline, reported as a regression
+THRESHOLD = 0.2
+# Bars of the series each strategy is checked on, before its benchmarks are added
+PROBE_BARS = 500
+
+# Strategy configurations used by the indicator benchmarks
+STRATEGY_CONFIGS = {
+    'MACross': {"fast_ma_period": "20", "slow_ma_period": "100", "ma_kind": "SIMPLE"},
+    'RSI': {"period": "14", "overbought": "70", "oversold": "30"},
+    'MeanReversion': {"mean_period": "20", "spread_mean_period": "10", "spread_sdev_period": "10",
+                      "threshold": 1.0, "ma_kind": "SIMPLE"},
+    'RiskPremia': {"skew_period": "20", "skew_threshold": "0.6"},
+}
+
+
+@dataclass
+class Result:
+    """
+    Holds the timings (seconds) of a benchmark
+    """
+    name: str
+    size: int
+    median: float
+    best: float
+    repeat: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+@dataclass
+class Benchmark:
+    """
+    Times `function(setup())`. `setup` runs before every timed call, outside the timing.
+    """
+    name: str
+    size: int
+    setup: Callable[[], Any]
+    function: Callable[[Any], Any]
+
+    def run(self, repeat: int) -> Result:
+        timings = list()
+        for _ in range(repeat):
+            data = self.setup()
+            start = time.perf_counter()
+            self.function(data)
+            timings.append(time.perf_counter() - start)
+        return Result(self.name, self.size, statistics.median(timings), min(timings), repeat)
+
+
+# -------------------- Synthetic Data -------------------- #
+
+def synthetic_ohlcv(bars: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Returns a random walk OHLCV series of 1 minute bars, with the columns of `Strategy.fetch`
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, bars)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.0005, bars)) * close
+    volume = rng.uniform(1, 100, bars)
+    index = pd.date_range('2024-01-01', periods=bars, freq='min', name='Time')
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': volume,
+        'Turnover': volume * close,
+    }, index=index)
+
+
+def kline_payload(rows: int, seed: int = 0) -> List[List[str]]:
+    """
+    Returns a canned `result.list` of a get_kline response (newest first), as received from ByBit
+    """
+    df = synthetic_ohlcv(rows, seed)
+    start = (df.index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+    columns = [start.astype(str)] + [df[column].map(repr) for column in c.CANDLE_COLUMNS[1:]]
+    return [list(row) for row in zip(*columns)][::-1]
+
+
+def kline_message(minute: int, confirm: bool = True) -> Dict[str, Any]:
+    """
+    Returns the data of a kline stream message. Confirmed by default.
+    """
+    start = minute * 60_000
+    return {"start": start, "end": start + 59_999, "interval": "1", "open": "100.5", "close": "100.7",
+            "high": "100.9", "low": "100.1", "volume": "12.5", "turnover": "1258.75", "confirm": confirm,
+            "timestamp": start + 59_999}
+
+
+# -------------------- Benchmarks -------------------- #
+
+def strategies() -> Dict[str, Any]:
+    """
+    Returns an instance of every benchmarked strategy. Strategies that cannot be created, or whose indicators fail on
+    a small series (e.g. a missing optional dependency, imported on first use), are skipped.
+    """
+    import strategies as s
+
+    config = TradeConfig(symbol=c.SYMBOL, interval=Timeframes.MIN_1, channel=c.CHANNEL)
+    probe = synthetic_ohlcv(PROBE_BARS)
+    instances = dict()
+    for name, strategy_config in STRATEGY_CONFIGS.items():
+        try:
+            strategy = getattr(s, name)(config=config, strategy_config=dict(strategy_config))
+            strategy.attach_indicators(probe.copy())
+        except Exception as e:
+            _log.warning(f"Skipping {name}. {type(e).__name__}: {e}")
+            continue
+        instances[name] = strategy
+    return instances
+
+
+class _Inputs:
+    """
+    Synthetic inputs of one series size. Each input is built on first use, so benchmarks excluded by a filter do not
+    build them.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+
+    @cached_property
+    def data(self) -> pd.DataFrame:
+        return synthetic_ohlcv(self.size)
+
+    @cached_property
+    def signals(self) -> pd.DataFrame:
+        # Backtest input: a series with signals attached
+        from strategies import Demo
+
+        return Demo.build(self.data.copy())
+
+    @cached_property
+    def payload(self) -> List[List[str]]:
+        return kline_payload(self.size)
+
+
+class _Messages:
+    """
+    Kline stream messages, built on first use
+    """
+
+    def __init__(self, count: int):
+        self.count = count
+
+    @cached_property
+    def confirmed(self) -> List[Dict[str, Any]]:
+        return [kline_message(i) for i in range(self.count)]
+
+    @cached_property
+    def stream(self) -> List[Dict[str, Any]]:
+        # A 1 minute kline is pushed about every second, and only the last push of a minute is confirmed
+        return [kline_message(i // 60, confirm=i % 60 == 59) for i in range(self.count)]
+
+
+def benchmarks(sizes: List[int], candles: int = 100_000) -> Iterator[Benchmark]:
+    """
+    Yields every benchmark, on series of each size. Inputs are built by the first setup that uses them, and released
+    once the benchmarks of their size have run.
+
+    Parameters
+    ----------
+        sizes: List[int]
+            Number of bars of the synthetic series
+
+        candles: int
+            Number of kline messages decoded per timed call
+    """
+    from backtest.backtest import Backtest
+    from strategies import Demo
+
+    instances = strategies()
+    for size in sizes:
+        inputs = _Inputs(size)
+        for name, strategy in instances.items():
+            yield Benchmark(f"{name}.attach_indicators", size, lambda i=inputs: i.data.copy(),
+                            strategy.attach_indicators)
+        yield Benchmark("Demo.build", size, lambda i=inputs: i.data.copy(), Demo.build)
+        yield Benchmark("Backtest.start", size, lambda i=inputs: i.signals.copy(), Backtest.start)
+        if size <= c.KLINE_LIMIT * 100:
+            # Payloads of more rows than a few hundred pages are not requested by `fetch`
+            yield Benchmark("parse_klines", size, lambda i=inputs: i.payload, parse_klines)
+
+    messages = _Messages(candles)
+    yield Benchmark("Candles", candles, lambda: messages.confirmed,
+                    lambda m: [Candles(c.SYMBOL, **data) for data in m])
+    yield Benchmark("Candles.from_kline", candles, lambda: messages.stream,
+                    lambda m: [Candles.from_kline(c.SYMBOL, data) for data in m])
+
+
+def run(
+        sizes: List[int],
+        repeat: int = 5,
+        name_filter: Optional[str] = None,
+        candles: int = 100_000) -> List[Result]:
+    """
+    Runs every benchmark passing the filter. A benchmark that raises (e.g. a dependency imported on first use) is
+    logged and left out of the results, and the others still run.
+    """
+    results = list()
+    for benchmark in benchmarks(sizes, candles):
+        if name_filter is not None and name_filter.lower() not in benchmark.name.lower():
+            continue
+        try:
+            # Large inputs are timed fewer times
+            result = benchmark.run(repeat if benchmark.size <= 100_000 else max(1, repeat // 2))
+        except Exception as e:
+            _log.error(f"{benchmark.name}[{benchmark.size}] failed. {type(e).__name__}: {e}")
+            continue
+        _log.info(f"{result.key:<40} median: {result.median * 1000:10.3f}ms best: {result.best * 1000:10.3f}ms")
+        results.append(result)
+    return results
+
+
+# -------------------- Baselines -------------------- #
+
+def load_baseline(path: str = BASELINE_FILE) -> Dict[str, Result]:
+    if not os.path.isfile(path):
+        return dict()
+    with open(path) as file:
+        return {r['name'] + f"[{r['size']}]": Result(**r) for r in json.load(file)}
+
+
+def save_baseline(results: List[Result], path: str = BASELINE_FILE) -> None:
+    """
+    Stores results as the baseline. Results of benchmarks that were not run are kept.
+    """
+    baseline = load_baseline(path)
+    baseline.update({r.key: r for r in results})
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump([asdict(r) for r in baseline.values()], file, indent=2)
+
+
+def regressions(results: List[Result], baseline: Dict[str, Result], threshold: float = THRESHOLD) -> List[str]:
+    """
+    Returns a description of every result slower than its baseline median by more than `threshold`
+    """
+    found = list()
+    for result in results:
+        base = baseline.get(result.key)
+        if base is None or base.median <= 0:
+            continue
+        change = result.median / base.median - 1
+        if change > threshold:
+            found.append(f"{result.key}: {base.median * 1000:.3f}ms -> {result.median * 1000:.3f}ms "
+                         f"(+{change:.0%})")
+    return found
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Runs the micro-benchmarks, and compares them to a baseline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="Bars of the synthetic series")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--filter', default=None, help="Runs benchmarks whose name contains this value")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Baseline file")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Regression threshold. Example: 0.2")
+    parser.add_argument('--save', action='store_true', help="Stores the results as the baseline")
+    options = parser.parse_args(args)
+
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+    results = run(options.sizes, options.repeat, options.filter)
+
+    found = regressions(results, load_baseline(options.baseline), options.threshold)
+    for regression in found:
+        _log.warning(f"Regression - {regression}")
+
+    if options.save:
+        save_baseline(results, options.baseline)
+        _log.info(f"Baseline saved: {options.baseline}")
+    return 1 if len(found) > 0 and not options.save else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
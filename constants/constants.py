@@ -6,3 +6,54 @@ STRATEGIES_FILE = 'strategies.ini'
 # CONSTANTS FOR TESTING STRATEGIES
 SYMBOL = 'BTCUSDT'
 CHANNEL = 'linear'
+
+# LOCAL CANDLE STORE
+CANDLE_STORE_DIRECTORY = 'candles'
+CANDLE_COLUMNS = ['Time', 'Open', 'High', 'Low', 'Close', 'Volume', 'Turnover']
+KLINE_LIMIT = 1000  # Maximum number of candles returned by a single get_kline request
+CANDLE_WINDOW_CAPACITY = 1000  # Number of candles held in memory by the rolling candle window
+
+# BACKTESTING
+TAKER_FEE = 0.00055  # Taker fee rate charged on each fill by the event-driven backtester
+
+# WEBSOCKET
+WS_SUBSCRIPTION_ARGS = 10  # Maximum number of topics sent in a single subscribe request
+
+# STRATEGY WORKERS
+STRATEGY_WORKERS = 8  # Maximum number of strategies running at the same time
+STRATEGY_QUEUE_CAPACITY = 100  # Maximum number of queued candles per strategy
+
+# ORDER EXECUTION
+ORDER_WORKERS = 16  # Maximum number of concurrent order REST calls, shared by all strategies
+BATCH_ORDER_LIMITS = {'linear': 20, 'inverse': 20, 'option': 20, 'spot': 10}  # Maximum legs per batch request
+TICKER_MAX_AGE = 5.0  # Maximum age (seconds) of a streamed mark price. Older prices are requested with REST.
+REDUCE_ONLY_REJECTED = 110017  # retCode of a reduce-only order rejected because the position is zero or reversed
+
+# ACCOUNT STATE
+RECONCILE_INTERVAL = 60.0  # Seconds between REST reconciles of the streamed position/order book
+EXECUTION_HISTORY = 1000  # Number of streamed executions kept in memory
+
+# HTTP SESSIONS
+HTTP_POOL_SIZE = 16  # Maximum number of open keep-alive connections per shared HTTP session
+
+# RATE LIMITS
+RATE_LIMITS = {'order': 10, 'batch': 10, 'position': 50, 'order_query': 50, 'account': 50, 'market': 120,
+               'default': 10}  # Requests per second per account, by endpoint class. Corrected from response headers.
+IP_RATE_LIMIT = 120  # Requests per second of all endpoints (600 per 5 seconds per IP)
+
+# LATENCY INSTRUMENTATION
+LATENCY_ENABLED = False  # Records tick-to-trade timing spans. See telemetry/latency.py.
+LATENCY_REPORT = 'reports/latency.json'  # Latency histograms written on shutdown
+
+# METRICS ENDPOINT
+METRICS_ENABLED = False  # Serves runtime metrics from root.py and engine.fleet. See telemetry/metrics.py.
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 8000  # Scraped at http://<host>:<port>/metrics. Use one port per process.
+
+# STREAM RECORDING
+RECORD_STREAMS = False  # Records the kline stream of root.py. Replayed with `python -m engine.replay`.
+RECORDINGS_DIRECTORY = 'recordings'
+
+# FLEET LAUNCHER
+FLEET_STARTUP_WORKERS = 16  # Strategies created and seeded at the same time by `engine.fleet`
+FLEET_STATUS_INTERVAL = 60.0  # Seconds between fleet status logs
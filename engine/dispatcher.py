@@ -0,0 +1,239 @@
+"""
+This module contains the Dispatcher class, which runs many strategies, on many symbols, from one WebSocket connection.
+
+Every `kline.{interval}.{symbol}` topic of the registered strategies is subscribed on a single connection per channel,
+and each confirmed candle is routed to the strategies registered for its topic. Routing is a single dictionary lookup
+per message.
+
+Each registered strategy has its own candle queue, drained by a shared worker pool (see `engine.workers`), so the
+WebSocket thread only parses and routes messages, and one slow strategy does not delay the others.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from pybit.unified_trading import WebSocket
+
+from configs.trade_cfg import TradeConfig
+from constants import constants as c
+from engine.replay import StreamRecorder
+from engine.workers import StrategyQueue, WorkerPool
+from market_data.window import CandleWindow
+from telemetry import latency, metrics
+from templates.candles import Candles
+
+_log = logging.getLogger(__name__)
+
+
+def kline_topic(config: TradeConfig) -> str:
+    """
+    Returns the kline topic of a trading configuration. Example: kline.1.BTCUSDT
+    """
+    return f"kline.{config.interval.value}.{config.symbol}"
+
+
+def record_receive(symbol: str, contents: Dict, received: float) -> None:
+    """
+    Records the ws_receive and candle latency spans of a kline message. See `telemetry.latency`.
+
+    Parameters
+    ----------
+        symbol: str
+            Symbol of the message
+
+        contents: dict
+            Received JSON contents from bybit. `ts` is the exchange message time (ms).
+
+        received: float
+            Local receive time, from `latency.clock()`
+    """
+    latency.record('', symbol, 'candle', latency.clock() - received)
+    if 'ts' in contents:
+        latency.record('', symbol, 'ws_receive', max(time.time() - int(contents['ts']) / 1000, 0.0))
+
+
+class Dispatcher:
+    """
+    Multi-symbol, multi-strategy kline dispatcher on a single WebSocket connection.
+
+    Example:
+        dispatcher = Dispatcher(channel='linear')
+        dispatcher.add_strategy(btc_strategy)
+        dispatcher.add_strategy(eth_strategy)
+        dispatcher.run()
+    """
+
+    def __init__(
+            self,
+            channel: str = c.CHANNEL,
+            testnet: bool = True,
+            websocket: Any = None,
+            pool: Optional[WorkerPool] = None,
+            recorder: Optional[StreamRecorder] = None):
+        """
+        Parameters
+        ----------
+            channel: str
+                Channel/Category shared by every registered strategy
+
+            testnet: bool
+                Connects to the testnet
+
+            websocket: WebSocket
+                Existing connection. A connection is opened by `run()` if None.
+
+            pool: WorkerPool
+                Worker pool running the strategies
+
+            recorder: StreamRecorder
+                Appends every received message to a recording file. See `engine.replay`.
+        """
+        self.channel = channel
+        self.testnet = testnet
+        self.ws = websocket
+        self.pool = pool if pool is not None else WorkerPool()
+        self.recorder = recorder
+        self.running = False
+
+        # Topic -> candle queues of the strategies registered on the topic
+        self.routes: Dict[str, List[StrategyQueue]] = defaultdict(list)
+        self.configs: Dict[str, TradeConfig] = dict()
+        self.subscribed: Set[str] = set()
+
+    @property
+    def queues(self) -> List[StrategyQueue]:
+        return [q for queues in self.routes.values() for q in queues]
+
+    def register(
+            self,
+            config: TradeConfig,
+            callback: Callable[[Candles], Any],
+            window: Optional[CandleWindow] = None,
+            name: Optional[str] = None) -> StrategyQueue:
+        """
+        Registers a new candle callback on the kline topic of a trading configuration.
+
+        Parameters
+        ----------
+            config: TradeConfig
+                Trading configuration (symbol, interval, channel)
+
+            callback: Callable[[Candles], Any]
+                New candle callback. Example: strategy.stage
+
+            window: CandleWindow
+                Rolling candle window, appended to before each callback
+
+            name: str
+                Name used in logs, and strategy label of the latency spans. Defaults to the topic.
+        """
+        if config.channel != self.channel:
+            raise ValueError(f"Invalid channel for dispatcher. Expected: {self.channel}. Input: {config.channel}")
+
+        topic = kline_topic(config)
+        strategy_queue = StrategyQueue(name or topic, callback, self.pool, window=window, symbol=config.symbol)
+        self.routes[topic].append(strategy_queue)
+        self.configs[topic] = config
+        if self.running:
+            self.__subscribe()
+        return strategy_queue
+
+    def add_strategy(self, strategy: Any, window_capacity: int = c.CANDLE_WINDOW_CAPACITY) -> StrategyQueue:
+        """
+        Seeds a rolling candle window for a strategy, and registers its `stage` function.
+
+        Parameters
+        ----------
+            strategy: Strategy
+                Strategy instance
+
+            window_capacity: int
+                Capacity of the strategy's candle window
+        """
+        window = CandleWindow(window_capacity)
+        strategy.attach_window(window)
+        return self.register(strategy.trade_config, strategy.stage, window=window, name=strategy.name)
+
+    def handler(self, contents: Dict) -> None:
+        """
+        Handler for ByBit Websocket. Routes confirmed candles to the strategies registered on the message topic.
+
+        Parameters
+        ----------
+            contents: dict
+                Received JSON contents from bybit
+        """
+        received = latency.clock()
+        if not self.running:
+            return
+        if self.recorder is not None:
+            self.recorder.record(contents)
+
+        topic = contents.get('topic')
+        queues = self.routes.get(topic)
+        if not queues:
+            return
+
+        symbol = self.configs[topic].symbol
+        for data in contents['data']:
+            candle = Candles.from_kline(symbol, data, received)
+            if candle is None:
+                continue
+            if received:
+                record_receive(symbol, contents, received)
+            for strategy_queue in queues:
+                strategy_queue.submit(candle)
+
+    def run(self) -> None:
+        """
+        Subscribes every registered topic
+        """
+        logging.info(f"Running dispatcher. Topics: {len(self.routes)} Strategies: {len(self.queues)}")
+        if self.ws is None:
+            self.ws = metrics.count_reconnects(WebSocket(testnet=self.testnet, channel_type=self.channel), self.channel)
+
+        self.running = True
+        self.__subscribe()
+
+    def terminate(self, wait: bool = True) -> None:
+        """
+        Ends the connection with the WebSocket, and stops the strategy workers. See `TradeMain.terminate()`.
+
+        Parameters
+        ----------
+            wait: bool
+                Waits for running strategies to finish
+        """
+        logging.info("Terminating dispatcher..")
+        self.running = False
+        if self.ws is not None:
+            # Note: Kill the ping thread first before calling exit. See `TradeMain.terminate()`.
+            if getattr(self.ws, 'timer', None) is not None:
+                self.ws.timer.join()
+            self.ws.exit()
+
+        self.pool.shutdown(wait=wait)
+        if self.recorder is not None:
+            self.recorder.close()
+        logging.info("Dispatcher stopped.")
+
+    # -------------------- Private Methods -------------------- #
+
+    def __subscribe(self) -> None:
+        # Subscribes new topics, grouped by interval, in batches of up to WS_SUBSCRIPTION_ARGS symbols per request
+        pending: Dict[Any, List[str]] = defaultdict(list)
+        for topic, config in self.configs.items():
+            if topic in self.subscribed:
+                continue
+            pending[config.interval.value].append(config.symbol)
+            self.subscribed.add(topic)
+
+        for interval, symbols in pending.items():
+            for i in range(0, len(symbols), c.WS_SUBSCRIPTION_ARGS):
+                self.ws.kline_stream(
+                    interval=interval,
+                    symbol=symbols[i:i + c.WS_SUBSCRIPTION_ARGS],
+                    callback=self.handler
+                )
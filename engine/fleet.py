@@ -0,0 +1,411 @@
+"""
+This module contains the headless fleet launcher, which starts every strategy of a manifest in one supervised process.
+
+Strategies share one Dispatcher (kline connection) and ticker cache per channel, one HTTP session and private stream
+per account, and one candle store per instrument. Strategies are created and their candle windows seeded
+concurrently, so startup takes about as long as the slowest history download. The process runs until SIGINT or
+SIGTERM, and then stops every strategy after its running stage.
+
+Manifest (JSON):
+    {
+        "testnet": true,
+        "accounts": {
+            "demo": {"demo": true},
+            "main": {"api_key_env": "BYBIT_MAIN_KEY", "api_secret_env": "BYBIT_MAIN_SECRET", "demo": false}
+        },
+        "strategies": [
+            {"strategy": "ma_cross", "cfg": "default.ini", "symbol": "BTCUSDT", "interval": "MIN_1",
+             "channel": "linear", "account": "demo"}
+        ]
+    }
+
+Demo accounts without credential variables use `api_secrets`. Live accounts must name both variables. The "demo"
+account is always defined. Metrics and latency spans of each strategy are labelled by its entry name.
+
+Usage:
+    python -m engine.fleet fleet.json
+    python -m engine.fleet fleet.json --metrics-port 8001
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from api_secrets import api_secrets
+from configs.trade_cfg import TradeConfig
+from constants import constants as c
+from engine.dispatcher import Dispatcher
+from engine.workers import WorkerPool
+from exchange.state import AccountState, get_account_state
+from generic import generic
+from market_data.store import CandleStore
+from market_data.tickers import TickerCache, get_ticker_cache
+from market_data.window import CandleWindow
+from session.bybit_session import get_session
+from strategies.registry import load_strategy
+from telemetry import latency, metrics
+from templates.intervals import Timeframes
+
+_log = logging.getLogger(__name__)
+
+DEFAULT_ACCOUNT = 'demo'
+
+
+@dataclass
+class FleetAccount:
+    """
+    Holds the connection settings of a trading account
+
+    Parameters
+    ----------
+        endpoint: str
+            Base URL replacing the ByBit endpoint. Example: a `mock_exchange` URL
+
+        private_stream: bool
+            Tracks positions and orders from the private stream. Requested with REST if False.
+    """
+    api_key: Optional[str] = None
+    api_secret: Optional[str] = None
+    demo: bool = True
+    testnet: bool = False
+    endpoint: Optional[str] = None
+    private_stream: bool = True
+
+    @classmethod
+    def parse(cls, spec: Dict[str, Any]) -> "FleetAccount":
+        """
+        Parses an account of the manifest. Credentials are read from the environment variables named by
+        `api_key_env` and `api_secret_env`. Demo accounts default to `api_secrets`. Live accounts (`"demo": false`)
+        must name both variables.
+        """
+        spec = dict(spec)
+        key_env, secret_env = spec.pop('api_key_env', None), spec.pop('api_secret_env', None)
+        if 'api_key' in spec or 'api_secret' in spec:
+            raise ValueError("Credentials are not read from the manifest. Use api_key_env and api_secret_env.")
+
+        account = cls(**spec)
+        if not account.demo and not (key_env and secret_env):
+            raise ValueError("Live accounts require api_key_env and api_secret_env. Demo keys are not used.")
+        account.api_key = os.environ[key_env] if key_env else api_secrets.bybit_api_demo
+        account.api_secret = os.environ[secret_env] if secret_env else api_secrets.bybit_api_secret
+        return account
+
+    def session(self) -> Any:
+        return get_session(api_key=self.api_key, api_secret=self.api_secret, demo=self.demo, testnet=self.testnet,
+                           endpoint=self.endpoint)
+
+
+@dataclass
+class FleetEntry:
+    """
+    Holds a single strategy instance of the fleet
+
+    Parameters
+    ----------
+        strategy: str
+            Strategy key in strategies.ini. Example: ma_cross
+
+        cfg: str
+            Config file in strategies/<strategy>/cfg. Example: default.ini. Strategy defaults are used if None.
+
+        interval: str
+            Timeframes name. Example: MIN_5
+
+        account: str
+            Account name in the manifest
+    """
+    strategy: str
+    cfg: Optional[str] = None
+    symbol: str = c.SYMBOL
+    interval: str = Timeframes.MIN_1.name
+    channel: str = c.CHANNEL
+    account: str = DEFAULT_ACCOUNT
+
+    @property
+    def name(self) -> str:
+        cfg = os.path.splitext(self.cfg)[0] if self.cfg else 'defaults'
+        return f"{self.strategy}_{cfg}_{self.symbol}_{self.interval}_{self.account}"
+
+    def trade_config(self) -> TradeConfig:
+        return TradeConfig(symbol=self.symbol, interval=Timeframes[self.interval], channel=self.channel)
+
+
+@dataclass
+class Manifest:
+    """
+    Holds the accounts and strategies of a fleet. See module docstring.
+
+    Parameters
+    ----------
+        testnet: bool
+            Streams klines from the testnet, as `TradeMain` does
+    """
+    entries: List[FleetEntry]
+    accounts: Dict[str, FleetAccount] = field(default_factory=dict)
+    testnet: bool = True
+
+    @classmethod
+    def parse(cls, spec: Dict[str, Any]) -> "Manifest":
+        """
+        Parses and validates a manifest. Raises ValueError on unknown intervals or accounts.
+        """
+        accounts = {name: FleetAccount.parse(a) for name, a in spec.get('accounts', dict()).items()}
+        if DEFAULT_ACCOUNT not in accounts:
+            accounts[DEFAULT_ACCOUNT] = FleetAccount.parse(dict())
+
+        entries = [FleetEntry(**e) for e in spec.get('strategies', list())]
+        for entry in entries:
+            if entry.interval not in Timeframes.available_timeframes():
+                raise ValueError(f"Invalid interval: {entry.interval}. Valid values: "
+                                 f"{Timeframes.available_timeframes()}")
+            if entry.account not in accounts:
+                raise ValueError(f"Account not found in manifest: {entry.account}")
+        return cls(entries=entries, accounts=accounts, testnet=bool(spec.get('testnet', True)))
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        with open(path) as file:
+            return cls.parse(json.load(file))
+
+
+class Fleet:
+    """
+    Starts and supervises every strategy of a manifest.
+
+    Example:
+        fleet = Fleet(Manifest.load('fleet.json'))
+        fleet.start()
+        fleet.run_forever()  # Until SIGINT or SIGTERM
+    """
+
+    def __init__(
+            self,
+            manifest: Manifest,
+            workers: int = c.STRATEGY_WORKERS,
+            startup_workers: int = c.FLEET_STARTUP_WORKERS,
+            websocket: Optional[Callable[[str], Any]] = None,
+            store_directory: Optional[str] = None):
+        """
+        Parameters
+        ----------
+            manifest: Manifest
+                Accounts and strategies to start
+
+            workers: int
+                Worker threads running the strategies, per channel
+
+            startup_workers: int
+                Strategies created and seeded at the same time
+
+            websocket: Callable[[str], WebSocket]
+                Returns the public connection of a channel, shared by its dispatcher and ticker cache. Connections
+                are opened by the dispatcher and `get_ticker_cache()` if None.
+
+            store_directory: str
+                Root directory of the candle stores. Defaults to the shared stores. See `get_store()`.
+        """
+        self.manifest = manifest
+        self.workers = workers
+        self.startup_workers = startup_workers
+        self.websocket = websocket
+        self.store_directory = store_directory
+
+        self.dispatchers: Dict[str, Dispatcher] = dict()
+        self.tickers: Dict[str, TickerCache] = dict()
+        self.account_states: List[AccountState] = list()
+        self.strategies: List[Any] = list()
+        # Entry name -> error, of entries that failed to start
+        self.failed: Dict[str, str] = dict()
+        self.startup = 0.0
+
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.running = False
+        self._configs: Dict[str, Dict[str, str]] = dict()
+        self._stores: Dict[Tuple[str, str, Timeframes], CandleStore] = dict()
+
+    def start(self) -> None:
+        """
+        Creates every strategy, seeds its candle window, and subscribes its kline topic. Entries that fail to start
+        are logged, and recorded in `failed`.
+        """
+        start = time.perf_counter()
+        entries = self.manifest.entries
+        for channel in sorted({e.channel for e in entries}):
+            connection = self.websocket(channel) if self.websocket is not None else None
+            self.dispatchers[channel] = Dispatcher(channel=channel, testnet=self.manifest.testnet,
+                                                   websocket=connection, pool=WorkerPool(self.workers))
+
+        with ThreadPoolExecutor(max_workers=max(self.startup_workers, 1), thread_name_prefix="fleet") as pool:
+            futures = [pool.submit(self.__create, entry) for entry in entries]
+
+            # Registered in manifest order
+            for i, (entry, future) in enumerate(zip(entries, futures)):
+                try:
+                    strategy, window = future.result()
+                except Exception as e:
+                    name = f"{i}:{entry.name}"
+                    self.failed[name] = f"{type(e).__name__}: {e}"
+                    _log.error(f"{name} - Start failed. {self.failed[name]}")
+                    continue
+                self.dispatchers[entry.channel].register(strategy.trade_config, strategy.stage, window=window,
+                                                         name=entry.name)
+                self.strategies.append(strategy)
+
+        for dispatcher in self.dispatchers.values():
+            dispatcher.run()
+        self.running = True
+        self.startup = time.perf_counter() - start
+        _log.info(f"Fleet started in {self.startup:.2f}s. Strategies: {len(self.strategies)} "
+                  f"Failed: {len(self.failed)} Channels: {list(self.dispatchers)}")
+
+    def status(self) -> Dict[str, int]:
+        """
+        Returns the candle queue counters, summed over every strategy. See `StrategyQueue.stats()`.
+        """
+        total: Dict[str, int] = dict()
+        for dispatcher in self.dispatchers.values():
+            for strategy_queue in dispatcher.queues:
+                for key, value in strategy_queue.stats().items():
+                    total[key] = total.get(key, 0) + value
+        return total
+
+    def run_forever(self, status_interval: float = c.FLEET_STATUS_INTERVAL) -> None:
+        """
+        Blocks until SIGINT or SIGTERM, logging the fleet status periodically, then stops the fleet. Must be called
+        from the main thread.
+
+        Parameters
+        ----------
+            status_interval: float
+                Seconds between status logs
+        """
+        def on_signal(signum, frame) -> None:
+            _log.info(f"Received {signal.Signals(signum).name}. Stopping fleet..")
+            self.stopped.set()
+
+        previous = {s: signal.signal(s, on_signal) for s in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            while not self.stopped.wait(status_interval):
+                _log.info(f"Fleet - Strategies: {len(self.strategies)} Candles: {self.status()}")
+        finally:
+            for s, handler in previous.items():
+                signal.signal(s, handler)
+            self.stop()
+
+    def stop(self) -> None:
+        """
+        Stops the kline streams, waits for running stages to finish, and closes the ticker and private streams
+        """
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+        self.stopped.set()
+
+        for dispatcher in self.dispatchers.values():
+            dispatcher.terminate(wait=True)
+
+        # Connections given to the ticker caches are closed by their dispatcher
+        connections = [d.ws for d in self.dispatchers.values()]
+        for cache in self.tickers.values():
+            if cache.ws is not None and all(cache.ws is not ws for ws in connections):
+                cache.ws.exit()
+        for state in self.account_states:
+            state.stop()
+            if state.ws is not None:
+                state.ws.exit()
+
+        latency.dump()
+        _log.info(f"Fleet stopped. Candles: {self.status()}")
+
+    # -------------------- Private Methods -------------------- #
+
+    def __create(self, entry: FleetEntry) -> Tuple[Any, CandleWindow]:
+        # Creates a strategy, and attaches its account, candle window and streams
+        account = self.manifest.accounts[entry.account]
+        strategy = load_strategy(entry.strategy)(config=entry.trade_config(),
+                                                 strategy_config=self.__strategy_config(entry))
+        # Spans and metrics are labelled by entry, so instances of the same strategy class are told apart
+        strategy.name = entry.name
+        strategy.execution.name = entry.name
+        session = account.session()
+        strategy.attach_session(session, self.__store(strategy.trade_config))
+
+        window = CandleWindow(c.CANDLE_WINDOW_CAPACITY)
+        strategy.attach_window(window)
+        strategy.attach_tickers(self.__tickers(entry.channel))
+
+        if account.private_stream:
+            state = get_account_state(session, entry.channel, api_key=account.api_key,
+                                      api_secret=account.api_secret, demo=account.demo)
+            with self.lock:
+                if state not in self.account_states:
+                    self.account_states.append(state)
+            strategy.attach_account(state)
+        return strategy, window
+
+    def __tickers(self, channel: str) -> TickerCache:
+        with self.lock:
+            if channel not in self.tickers:
+                if self.websocket is not None:
+                    self.tickers[channel] = TickerCache(channel, websocket=self.dispatchers[channel].ws)
+                else:
+                    self.tickers[channel] = get_ticker_cache(channel)
+            return self.tickers[channel]
+
+    def __store(self, config: TradeConfig) -> Optional[CandleStore]:
+        # Strategies of an instrument share its store, as with `get_store()`
+        if self.store_directory is None:
+            return None
+        key = (config.symbol, config.channel, config.interval)
+        with self.lock:
+            if key not in self._stores:
+                self._stores[key] = CandleStore(*key, directory=self.store_directory)
+            return self._stores[key]
+
+    def __strategy_config(self, entry: FleetEntry) -> Dict[str, str]:
+        # Config files are read once, and copied for every instance
+        if not entry.cfg:
+            return dict()
+        path = os.path.join(c.STRATEGIES_DIRECTORY, entry.strategy, c.CONFIG_FOLDER, entry.cfg)
+        with self.lock:
+            if path not in self._configs:
+                self._configs[path] = generic.cfg_as_dict(path)
+            return dict(self._configs[path])
+
+
+def main(args: Optional[List[str]] = None) -> Fleet:
+    parser = argparse.ArgumentParser(description="Starts every strategy of a manifest, without prompts")
+    parser.add_argument("manifest", help="Manifest file (JSON)")
+    parser.add_argument("--workers", type=int, default=c.STRATEGY_WORKERS, help="Strategy workers per channel")
+    parser.add_argument("--startup-workers", type=int, default=c.FLEET_STARTUP_WORKERS)
+    parser.add_argument("--status-interval", type=float, default=c.FLEET_STATUS_INTERVAL, help="Seconds")
+    parser.add_argument("--store-directory", default=None, help=f"Defaults to {c.CANDLE_STORE_DIRECTORY}")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help=f"Serves metrics on this port. Defaults to {c.METRICS_PORT} if METRICS_ENABLED is set.")
+    options = parser.parse_args(args)
+
+    logging.basicConfig(format="%(asctime)s: %(message)s", level=logging.INFO, datefmt="%H:%M:%S")
+    # Stage and REST durations are served on the metrics endpoint from the latency histograms
+    server = None
+    if options.metrics_port is not None or c.METRICS_ENABLED:
+        server = metrics.start_server(port=options.metrics_port if options.metrics_port is not None else c.METRICS_PORT)
+    latency.enable(c.LATENCY_ENABLED or server is not None)
+
+    fleet = Fleet(Manifest.load(options.manifest), workers=options.workers, startup_workers=options.startup_workers,
+                  store_directory=options.store_directory)
+    fleet.start()
+    fleet.run_forever(options.status_interval)
+    return fleet
+
+
+if __name__ == "__main__":
+    main()
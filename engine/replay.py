@@ -0,0 +1,363 @@
+"""
+This module contains the record and replay classes of WebSocket streams.
+
+`StreamRecorder` appends every message received by a handler (e.g. `TradeMain.handler`) to a file, with its receive
+time. `StreamReplayer` feeds the messages back into a handler at the recorded pace, N times faster, or as fast as
+possible, so live sessions can be reproduced offline, and the callback path load tested.
+
+During a replay, strategies send their REST calls to a `ReplaySession`, which serves klines and mark prices from the
+replayed messages, and acknowledges orders without sending them. Candles are staged on the replaying thread, so none
+is coalesced or dropped, and a replay sends the same orders every time.
+
+File format (append-only, little endian), one record per message:
+    int64   receive time (ns since epoch)
+    uint32  payload length
+    bytes   payload, compact JSON
+
+A record cut short by a crash is ignored when reading.
+
+Usage:
+    python -m engine.replay recordings/BTCUSDT.rec --strategy ma_cross --cfg default.ini --speed 100
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from constants import constants as c
+
+_log = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct('<qI')
+
+
+class StreamRecorder:
+    """
+    Appends received WebSocket messages to a recording file. Thread safe.
+
+    Example:
+        recorder = StreamRecorder('recordings/BTCUSDT.rec')
+        trade_main = TradeMain(config, strategy.stage, recorder=recorder)
+    """
+
+    def __init__(self, path: str):
+        """
+        Parameters
+        ----------
+            path: str
+                Recording file. Created if it does not exist, and appended to otherwise.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.file: Optional[BinaryIO] = open(path, 'ab')
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def record(self, contents: Dict, received: Optional[int] = None) -> None:
+        """
+        Appends a message. Each record is flushed, so a crash loses at most the message being written.
+
+        Parameters
+        ----------
+            contents: dict
+                Received JSON contents from bybit
+
+            received: int
+                Receive time (ns since epoch). Defaults to now.
+        """
+        received = received if received is not None else time.time_ns()
+        payload = json.dumps(contents, separators=(',', ':')).encode()
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD_HEADER.pack(received, len(payload)) + payload)
+            self.file.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def __enter__(self) -> "StreamRecorder":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def read_records(path: str) -> Iterator[Tuple[int, Dict]]:
+    """
+    Yields the (receive time (ns), contents) of every complete record of a recording file
+    """
+    with open(path, 'rb') as file:
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            received, length = RECORD_HEADER.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length:
+                _log.warning(f"Truncated record at the end of {path}. Ignored.")
+                return
+            yield received, json.loads(payload)
+
+
+class ReplaySession:
+    """
+    Stub of the ByBit HTTP session used during replays. Klines and mark prices are served from the messages replayed
+    so far, positions and open orders are always empty, and orders are acknowledged and kept in `orders`.
+    """
+
+    def __init__(self):
+        # Symbol -> {start: kline row}, including the latest open candle, as returned by get_kline
+        self.klines: Dict[str, Dict[int, List[str]]] = dict()
+        self.orders: List[Dict] = list()
+        self.lock = threading.Lock()
+        self.order_ids = itertools.count(1)
+
+    def on_message(self, contents: Dict) -> None:
+        """
+        Stores the candles of a kline message. Called by the replayer before the message is handled.
+        """
+        topic = contents.get('topic', '')
+        if not topic.startswith('kline.'):
+            return
+        symbol = topic.split('.')[-1]
+        with self.lock:
+            rows = self.klines.setdefault(symbol, dict())
+            for d in contents['data']:
+                rows[int(d['start'])] = [str(d['start']), str(d['open']), str(d['high']), str(d['low']),
+                                         str(d['close']), str(d['volume']), str(d['turnover'])]
+
+    # -------------------- REST Endpoints -------------------- #
+
+    def get_kline(self, symbol: str, limit: int = 200, start: Optional[int] = None, end: Optional[int] = None,
+                  **kwargs) -> Dict:
+        with self.lock:
+            rows = self.klines.get(symbol, dict())
+            starts = sorted((s for s in rows if (start is None or s >= start) and (end is None or s <= end)),
+                            reverse=True)
+            page = [list(rows[s]) for s in starts[:limit]]
+        return _response({'symbol': symbol, 'list': page})
+
+    def get_tickers(self, symbol: str, **kwargs) -> Dict:
+        with self.lock:
+            rows = self.klines.get(symbol, dict())
+            close = rows[max(rows)][4] if rows else "0"
+        return _response({'list': [{'symbol': symbol, 'markPrice': close, 'lastPrice': close}]})
+
+    def get_positions(self, **kwargs) -> Dict:
+        return _response({'list': []})
+
+    def get_open_orders(self, **kwargs) -> Dict:
+        return _response({'list': []})
+
+    def place_order(self, **kwargs) -> Dict:
+        order_id = f"replay-{next(self.order_ids)}"
+        with self.lock:
+            self.orders.append({'orderId': order_id, **kwargs})
+        return _response({'orderId': order_id})
+
+    def place_batch_order(self, category: str, request: List[Dict]) -> Dict:
+        legs = [self.place_order(category=category, **r)['result'] for r in request]
+        return {**_response({'list': legs}), 'retExtInfo': {'list': [{'code': 0, 'msg': 'OK'}] * len(legs)}}
+
+    def cancel_batch_order(self, category: str, request: List[Dict]) -> Dict:
+        return {**_response({'list': list(request)}), 'retExtInfo': {'list': [{'code': 0, 'msg': 'OK'}] * len(request)}}
+
+    def cancel_all_orders(self, **kwargs) -> Dict:
+        return _response({'list': []})
+
+
+@dataclass
+class ReplayStats:
+    """
+    Holds the result of a replay
+
+    Parameters
+    ----------
+        duration: float
+            Seconds between the first and last recorded message
+
+        elapsed: float
+            Seconds taken by the replay
+    """
+    messages: int = 0
+    duration: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        # Messages per second
+        return self.messages / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def speedup(self) -> float:
+        return self.duration / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class StreamReplayer:
+    """
+    Feeds the messages of a recording file into a handler.
+
+    Example:
+        replayer = StreamReplayer('recordings/BTCUSDT.rec', session)
+        stats = replayer.replay(trade_main.handler, speed=100)
+    """
+
+    def __init__(self, path: str, session: Optional[ReplaySession] = None):
+        """
+        Parameters
+        ----------
+            path: str
+                Recording file
+
+            session: ReplaySession
+                Session receiving every message before the handler
+        """
+        self.path = path
+        self.session = session
+
+    def replay(self, handler: Callable[[Dict], Any], speed: Optional[float] = 1.0) -> ReplayStats:
+        """
+        Calls the handler with every recorded message, in order.
+
+        Parameters
+        ----------
+            handler: Callable[[dict], Any]
+                WebSocket handler. Example: trade_main.handler
+
+            speed: float
+                Replay speed, relative to the recording. Example: 1 (recorded pace), 100. Messages are replayed as
+                fast as possible if None or 0.
+        """
+        if speed is not None and speed < 0:
+            raise ValueError(f"Invalid speed. Value must be greater than or equal to 0. Input: {speed}")
+
+        stats = ReplayStats()
+        first: Optional[int] = None
+        last = 0
+        start = time.perf_counter()
+        for received, contents in read_records(self.path):
+            first = received if first is None else first
+            last = received
+            if speed:
+                # Waits until the recorded offset of the message, scaled by the speed
+                delay = (received - first) / 1e9 / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            if self.session is not None:
+                self.session.on_message(contents)
+            handler(contents)
+            stats.messages += 1
+
+        stats.elapsed = time.perf_counter() - start
+        stats.duration = (last - first) / 1e9 if first is not None else 0.0
+        return stats
+
+
+def attach_replay(strategy: Any, session: ReplaySession, directory: str) -> None:
+    """
+    Sends the REST calls of a strategy to a replay session, and keeps its candles in a scratch store, so a replay does
+    not touch the exchange or the local candle store.
+
+    Parameters
+    ----------
+        strategy: Strategy
+            Strategy instance
+
+        session: ReplaySession
+            Replay session
+
+        directory: str
+            Root directory of the scratch candle store
+    """
+    from market_data.store import CandleStore
+
+    config = strategy.trade_config
+    strategy.attach_session(session, CandleStore(config.symbol, config.channel, config.interval, directory=directory))
+
+
+def _response(result: Dict) -> Dict:
+    return {'retCode': 0, 'retMsg': 'OK', 'result': result}
+
+
+def replay_strategy(path: str, strategy: Any, speed: Optional[float] = None) -> Tuple[ReplayStats, ReplaySession, Any]:
+    """
+    Replays a recording through `TradeMain` into a strategy. Returns the replay stats, the replay session (holding the
+    sent orders), and the `TradeMain` instance (holding the candle counters of its queue).
+
+    Candles are staged on the replaying thread, one by one (see `InlinePool`), so every confirmed candle reaches the
+    strategy and its window, and two replays of the same recording send the same orders.
+
+    Parameters
+    ----------
+        path: str
+            Recording file
+
+        strategy: Strategy
+            Strategy instance. Its REST calls are sent to the replay session, and its candles kept in a scratch store.
+
+        speed: float
+            Replay speed, relative to the recording. Messages are replayed as fast as possible if None or 0.
+    """
+    from engine.workers import InlinePool
+    from market_data.window import CandleWindow
+    from root import TradeMain
+
+    session = ReplaySession()
+    with tempfile.TemporaryDirectory() as directory:
+        attach_replay(strategy, session, directory)
+        window = CandleWindow(c.CANDLE_WINDOW_CAPACITY)
+        strategy.attach_window(window)
+
+        trade_main = TradeMain(strategy.trade_config, strategy.stage, window=window, pool=InlinePool(),
+                               name=strategy.name, websocket=object())
+        trade_main.running = True
+        stats = StreamReplayer(path, session).replay(trade_main.handler, speed=speed)
+    return stats, session, trade_main
+
+
+def main(args: Optional[List[str]] = None) -> ReplayStats:
+    from strategies.registry import load_strategy
+    from configs.trade_cfg import TradeConfig
+    from generic import generic
+    from templates.intervals import Timeframes
+
+    parser = argparse.ArgumentParser(description="Replays a recorded kline stream through TradeMain")
+    parser.add_argument("path", help="Recording file")
+    parser.add_argument("--strategy", required=True, help="Strategy key in strategies.ini. Example: ma_cross")
+    parser.add_argument("--cfg", default="default.ini", help="Config file in strategies/<strategy>/cfg")
+    parser.add_argument("--symbol", default=c.SYMBOL)
+    parser.add_argument("--interval", default=Timeframes.MIN_1.name, choices=Timeframes.available_timeframes())
+    parser.add_argument("--channel", default=c.CHANNEL)
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed. 0 replays as fast as possible.")
+    options = parser.parse_args(args)
+
+    logging.basicConfig(format="%(asctime)s: %(message)s", level=logging.INFO, datefmt="%H:%M:%S")
+
+    config = TradeConfig(symbol=options.symbol, interval=Timeframes[options.interval], channel=options.channel)
+    cfg_path = os.path.join(c.STRATEGIES_DIRECTORY, options.strategy, c.CONFIG_FOLDER, options.cfg)
+    strategy = load_strategy(options.strategy)(config=config, strategy_config=generic.cfg_as_dict(cfg_path))
+
+    stats, session, trade_main = replay_strategy(options.path, strategy, speed=options.speed)
+
+    _log.info(f"Replayed {stats.messages} messages in {stats.elapsed:.2f}s ({stats.rate:.0f}/s, "
+              f"{stats.speedup:.0f}x). Orders: {len(session.orders)} Candles: {trade_main.queue.stats()}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
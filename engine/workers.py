@@ -0,0 +1,224 @@
+"""
+This module contains the off-thread strategy execution classes: a bounded, coalescing candle queue per strategy, and a
+worker pool shared by all strategies.
+
+The WebSocket thread only appends candles to a strategy's queue, and never waits on strategy work. Each queue is
+drained by at most one worker at a time, so a strategy never runs concurrently with itself, and candles are processed
+in order.
+
+If a strategy is still busy when new candles arrive, the queued candles are coalesced when it becomes free: every
+candle is appended to the strategy's candle window, but only the newest candle is staged. Stale candles would only
+send late orders.
+"""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from constants import constants as c
+from market_data.window import CandleWindow
+from telemetry import latency, metrics
+from templates.candles import Candles
+
+_log = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """
+    Thread pool running strategy queues. Threads are started on first use.
+    """
+
+    def __init__(self, workers: int = c.STRATEGY_WORKERS):
+        """
+        Parameters
+        ----------
+            workers: int
+                Maximum number of strategies running at the same time
+        """
+        self.workers = workers
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.lock = threading.Lock()
+
+    def schedule(self, strategy_queue: "StrategyQueue") -> None:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="strategy")
+            self.executor.submit(strategy_queue.drain)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the worker threads. Waits for running strategies to finish if `wait` is True.
+        """
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+class InlinePool(WorkerPool):
+    """
+    Runs strategy queues on the calling thread. Each candle is staged before `StrategyQueue.submit` returns, so no
+    candle is coalesced or dropped.
+
+    Used by replays, so a recorded session is reproduced deterministically. See `engine.replay`.
+    """
+
+    def __init__(self):
+        super().__init__(workers=1)
+
+    def schedule(self, strategy_queue: "StrategyQueue") -> None:
+        strategy_queue.drain()
+
+
+class StrategyQueue:
+    """
+    Bounded, coalescing queue of confirmed candles for a single strategy.
+
+    Counters:
+        received    - candles submitted
+        processed   - candles staged
+        coalesced   - candles skipped because a newer candle was queued
+        dropped     - candles discarded because the queue was full
+        errors      - callbacks that raised an exception
+    """
+
+    def __init__(
+            self,
+            name: str,
+            callback: Callable[[Candles], Any],
+            pool: WorkerPool,
+            window: Optional[CandleWindow] = None,
+            capacity: int = c.STRATEGY_QUEUE_CAPACITY,
+            symbol: str = ''):
+        """
+        Parameters
+        ----------
+            name: str
+                Name used in logs, and strategy label of the latency spans
+
+            callback: Callable[[Candles], Any]
+                New candle callback. Example: strategy.stage
+
+            pool: WorkerPool
+                Worker pool running the callback
+
+            window: CandleWindow
+                Rolling candle window of the strategy. Every candle is appended to it, including coalesced candles.
+
+            capacity: int
+                Maximum number of queued candles. The oldest candle is dropped when full.
+
+            symbol: str
+                Symbol label of the queue metrics
+        """
+        if capacity <= 0:
+            raise ValueError(f"Invalid capacity. Value must be greater than 0. Input: {capacity}")
+
+        self.name = name
+        self.callback = callback
+        self.pool = pool
+        self.window = window
+        self.capacity = capacity
+        self.symbol = symbol
+
+        self.pending: Deque[Candles] = deque()
+        self.lock = threading.Lock()
+        # True while the queue is scheduled on, or being drained by, a worker
+        self.scheduled = False
+
+        self.received = 0
+        self.processed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+
+        # Served on the metrics endpoint. See `telemetry.metrics`.
+        metrics.register(self.metrics)
+
+    @property
+    def busy(self) -> bool:
+        return self.scheduled
+
+    def submit(self, candle: Candles) -> None:
+        """
+        Queues a candle. Called on the WebSocket thread, and never waits on strategy work.
+
+        Parameters
+        ----------
+            candle: Candles
+                Confirmed candle
+        """
+        with self.lock:
+            self.received += 1
+            if len(self.pending) >= self.capacity:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append(candle)
+            if self.scheduled:
+                return
+            self.scheduled = True
+
+        self.pool.schedule(self)
+
+    def drain(self) -> None:
+        """
+        Runs the strategy on the newest queued candle, until the queue is empty. Called on a worker thread.
+        """
+        while True:
+            with self.lock:
+                if len(self.pending) == 0:
+                    self.scheduled = False
+                    return
+                candles = list(self.pending)
+                self.pending.clear()
+                dropped = self.dropped
+
+            candle = candles[-1]
+            if len(candles) > 1:
+                self.coalesced += len(candles) - 1
+                _log.warning(f"{self.name} {candle.symbol} - Strategy is behind. Coalesced {len(candles) - 1} "
+                             f"candles. Dropped: {dropped}")
+
+            try:
+                # Tick-to-trade spans of this stage are measured from the candle's receive time
+                latency.mark_tick(candle.received)
+                if candle.received:
+                    latency.record(self.name, candle.symbol, 'queue', latency.clock() - candle.received)
+                if self.window is not None:
+                    for queued in candles:
+                        self.window.append_candle(queued)
+                with latency.span(self.name, candle.symbol, 'stage'):
+                    self.callback(candle)
+            except Exception as e:
+                # A failing strategy is logged, and keeps receiving candles
+                self.errors += 1
+                _log.exception(f"{self.name} - Error on new candle: {e}")
+            self.processed += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the queue counters, and the number of queued candles.
+        """
+        with self.lock:
+            return {
+                'received': self.received,
+                'processed': self.processed,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'pending': len(self.pending),
+            }
+
+    def metrics(self) -> List[metrics.Sample]:
+        """
+        Returns the queue counters as metric samples
+        """
+        stats = self.stats()
+        labels = {'strategy': self.name, 'symbol': self.symbol}
+        samples = [metrics.Sample('bybit_candles_total', {**labels, 'state': state}, stats[state])
+                   for state in ('received', 'processed', 'coalesced', 'dropped')]
+        samples.append(metrics.Sample('bybit_strategy_errors_total', labels, stats['errors']))
+        samples.append(metrics.Sample('bybit_strategy_queue_depth', labels, stats['pending']))
+        return samples
@@ -1,2 +1,3 @@
 from .accounts import * 
-from .exchange import *
\ No newline at end of file
+from .exchange import *
+from .state import *
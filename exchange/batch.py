@@ -0,0 +1,211 @@
+"""
+This module contains batch order functions, which send many order legs in a few requests.
+
+Closing or flipping positions sends one `place_batch_order` request per chunk of legs, and cancelling sends one
+`cancel_batch_order` request per chunk, instead of one request per order. Chunks are split at the exchange batch
+limit of the channel, and sent concurrently. Legs of different symbols share a request.
+
+Each leg is reported separately, as a batch request succeeds even if some of its legs are rejected.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from constants import constants as c
+from templates.open_order import OpenOrder
+from templates.order import Order
+from templates.position import Position
+from templates.side import Side
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class LegResult:
+    """
+    Holds the result of a single leg of a batch request
+    """
+    symbol: str
+    order_id: str
+    code: int
+    message: str
+
+    @property
+    def success(self) -> bool:
+        return self.code == 0
+
+
+def batch_limit(channel: str) -> int:
+    """
+    Returns the maximum number of legs in a batch request of a channel
+    """
+    return c.BATCH_ORDER_LIMITS.get(channel, min(c.BATCH_ORDER_LIMITS.values()))
+
+
+def chunks(items: List[Any], size: int) -> List[List[Any]]:
+    """
+    Splits a list into consecutive chunks of at most `size` items
+    """
+    if size <= 0:
+        raise ValueError(f"Invalid chunk size. Value must be greater than 0. Input: {size}")
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def close_requests(positions: Iterable[Position]) -> List[Dict]:
+    """
+    Returns reduce-only market order legs that close positions
+    """
+    requests = list()
+    for p in positions:
+        side = Side.SELL if p.side == Side.BUY.name.title() else Side.BUY
+        requests.append({
+            'symbol': p.symbol,
+            'side': side.name.title(),
+            'orderType': Order.MARKET.name.title(),
+            'qty': str(p.size),
+            'reduceOnly': True,
+        })
+    return requests
+
+
+def place_batch(
+        session: Any,
+        channel: str,
+        requests: List[Dict],
+        executor: Optional[ThreadPoolExecutor] = None) -> List[LegResult]:
+    """
+    Places order legs with `place_batch_order`, in chunks of the channel's batch limit. Returns one result per leg, in
+    the order of `requests`.
+
+    Parameters
+    ----------
+        session: HTTP
+            ByBit HTTP session
+
+        channel: str
+            Channel/Category
+
+        requests: List[Dict]
+            Order legs. Example: {'symbol': 'BTCUSDT', 'side': 'Sell', 'orderType': 'Market', 'qty': '0.001'}
+
+        executor: ThreadPoolExecutor
+            Pool sending chunks concurrently. Chunks are sent one after another if None.
+    """
+    def send(chunk: List[Dict]) -> List[LegResult]:
+        response = session.place_batch_order(category=channel, request=chunk)
+        return _leg_results(response, chunk, [r['symbol'] for r in chunk], [''] * len(chunk))
+
+    return _send(send, chunks(requests, batch_limit(channel)), executor)
+
+
+def cancel_batch(
+        session: Any,
+        channel: str,
+        orders: List[OpenOrder],
+        executor: Optional[ThreadPoolExecutor] = None) -> List[LegResult]:
+    """
+    Cancels open orders with `cancel_batch_order`, in chunks of the channel's batch limit. Returns one result per
+    order, in the order of `orders`.
+
+    Parameters
+    ----------
+        session: HTTP
+            ByBit HTTP session
+
+        channel: str
+            Channel/Category
+
+        orders: List[OpenOrder]
+            Orders to cancel
+
+        executor: ThreadPoolExecutor
+            Pool sending chunks concurrently. Chunks are sent one after another if None.
+    """
+    def send(chunk: List[OpenOrder]) -> List[LegResult]:
+        request = [{'symbol': o.symbol, 'orderId': o.order_id} for o in chunk]
+        response = session.cancel_batch_order(category=channel, request=request)
+        return _leg_results(response, request, [o.symbol for o in chunk], [o.order_id for o in chunk])
+
+    return _send(send, chunks(orders, batch_limit(channel)), executor)
+
+
+def cancel_all(session: Any, channel: str, symbols: Iterable[str]) -> List[LegResult]:
+    """
+    Cancels every open order of each symbol with `cancel_all_orders`. Returns one result per symbol.
+    """
+    results = list()
+    for symbol in sorted(set(symbols)):
+        response = session.cancel_all_orders(category=channel, symbol=symbol)
+        results.append(LegResult(symbol, '', int(response['retCode']), response['retMsg']))
+    return results
+
+
+def flatten(
+        session: Any,
+        channel: str,
+        positions: List[Position],
+        orders: Optional[List[OpenOrder]] = None,
+        executor: Optional[ThreadPoolExecutor] = None) -> List[LegResult]:
+    """
+    Cancels open orders, and closes positions, of any number of symbols in batch requests. Returns the cancel results
+    followed by the close results.
+
+    Parameters
+    ----------
+        session: HTTP
+            ByBit HTTP session
+
+        channel: str
+            Channel/Category
+
+        positions: List[Position]
+            Positions to close
+
+        orders: List[OpenOrder]
+            Orders to cancel before closing. Example: resting entry orders that would reopen a position.
+
+        executor: ThreadPoolExecutor
+            Pool sending chunks concurrently
+    """
+    results = cancel_batch(session, channel, orders, executor) if orders else list()
+    results += place_batch(session, channel, close_requests(positions), executor)
+
+    failed = [r for r in results if not r.success]
+    if len(failed) > 0:
+        _log.warning(f"Flatten - Failed legs: {[(r.symbol, r.message) for r in failed]}")
+    return results
+
+
+# -------------------- Private Functions -------------------- #
+
+def _send(send, batches: List[List[Any]], executor: Optional[ThreadPoolExecutor]) -> List[LegResult]:
+    if executor is None or len(batches) <= 1:
+        results = [send(batch) for batch in batches]
+    else:
+        results = list(executor.map(send, batches))
+    return [leg for batch in results for leg in batch]
+
+
+def _leg_results(response: Dict, request: List[Dict], symbols: List[str], order_ids: List[str]) -> List[LegResult]:
+    """
+    Pairs the legs of a batch request with their results. A rejected request rejects every leg.
+    """
+    code = int(response['retCode'])
+    if code != 0:
+        return [LegResult(s, o, code, response['retMsg']) for s, o in zip(symbols, order_ids)]
+
+    legs = (response.get('result') or {}).get('list') or []
+    statuses = (response.get('retExtInfo') or {}).get('list') or []
+    results = list()
+    for i in range(len(request)):
+        leg = legs[i] if i < len(legs) else {}
+        status = statuses[i] if i < len(statuses) else {'code': -1, 'msg': 'Missing leg result'}
+        results.append(LegResult(
+            symbol=leg.get('symbol') or symbols[i],
+            order_id=leg.get('orderId') or order_ids[i],
+            code=int(status.get('code', 0)),
+            message=status.get('msg', '')
+        ))
+    return results
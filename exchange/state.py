@@ -0,0 +1,334 @@
+"""
+This module contains the AccountState class, a local book of open positions and orders per (account, symbol).
+
+The book is kept current from ByBit's private position, order and execution streams, so strategies read their
+positions without a `get_positions` request on every close or flip. It is reconciled against REST when a symbol is
+first tracked, and then periodically, to repair anything missed while the stream was disconnected.
+
+Stream and REST records carry an `updatedTime` (ms). A reconcile never replaces a record with an older one, so a
+stream update received while a REST request is in flight is kept. Closed positions and orders are kept until the next
+reconcile for the same reason.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from pybit.unified_trading import WebSocket
+
+from constants import constants as c
+from telemetry import metrics
+from exchange.batch import LegResult, flatten
+from templates.open_order import OpenOrder
+from templates.position import Position
+
+_log = logging.getLogger(__name__)
+
+# Order statuses of orders that are still working
+OPEN_ORDER_STATUSES = {'New', 'PartiallyFilled', 'Untriggered'}
+
+
+def _updated(record: Dict) -> int:
+    return int(record.get('updatedTime') or 0)
+
+
+def _is_open_position(p: Dict) -> bool:
+    return float(p['size']) != 0
+
+
+def _is_open_order(o: Dict) -> bool:
+    return o['orderStatus'] in OPEN_ORDER_STATUSES
+
+
+def to_position(p: Dict) -> Position:
+    """
+    Converts a position record from the REST API or the position stream
+    """
+    return Position(symbol=p['symbol'], side=p['side'], size=p['size'])
+
+
+def to_open_order(o: Dict) -> OpenOrder:
+    """
+    Converts an order record from the REST API or the order stream
+    """
+    return OpenOrder(
+        symbol=o['symbol'],
+        order_id=o['orderId'],
+        side=o['side'],
+        order_type=o.get('orderType', ''),
+        qty=o.get('qty', ''),
+        price=o.get('price', ''),
+        status=o['orderStatus'],
+        reduce_only=bool(o.get('reduceOnly', False))
+    )
+
+
+class AccountState:
+    """
+    Open positions and orders of a single account, by symbol.
+
+    Example:
+        state = get_account_state(session, 'linear', api_key, api_secret)
+        state.track('BTCUSDT')
+        state.start()
+        positions = state.get_positions('BTCUSDT')
+    """
+
+    def __init__(
+            self,
+            session: Any,
+            channel: str = c.CHANNEL,
+            api_key: Optional[str] = None,
+            api_secret: Optional[str] = None,
+            demo: bool = True,
+            testnet: bool = False,
+            websocket: Any = None,
+            reconcile_interval: float = c.RECONCILE_INTERVAL):
+        """
+        Parameters
+        ----------
+            session: HTTP
+                ByBit HTTP session of the account, used to reconcile
+
+            channel: str
+                Channel/Category of the tracked positions and orders
+
+            api_key, api_secret: str
+                Credentials of the private stream
+
+            demo: bool
+                Connects to demo trading
+
+            testnet: bool
+                Connects to the testnet
+
+            websocket: WebSocket
+                Existing private connection. A connection is opened by `start()` if None.
+
+            reconcile_interval: float
+                Seconds between REST reconciles. Reconciles are disabled if 0.
+        """
+        self.session = session
+        self.channel = channel
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.demo = demo
+        self.testnet = testnet
+        self.ws = websocket
+        self.reconcile_interval = reconcile_interval
+
+        # Symbol -> {positionIdx: raw position}, Symbol -> {orderId: raw order}
+        self.positions: Dict[str, Dict[int, Dict]] = defaultdict(dict)
+        self.orders: Dict[str, Dict[str, Dict]] = defaultdict(dict)
+        self.executions: Deque[Dict] = deque(maxlen=c.EXECUTION_HISTORY)
+        self.symbols: Set[str] = set()
+        self.seeded: Set[str] = set()
+
+        self.lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.reconciles = 0
+        # Records corrected by reconciles. Non-zero values mean stream updates were missed.
+        self.corrections = 0
+
+    def track(self, symbol: str) -> None:
+        """
+        Adds a symbol to the book, and seeds it from REST. Symbols already tracked are ignored.
+        """
+        with self.lock:
+            if symbol in self.symbols:
+                return
+            self.symbols.add(symbol)
+        self.reconcile(symbol)
+
+    def start(self) -> None:
+        """
+        Subscribes to the private position, order and execution streams, and starts periodic reconciles
+        """
+        if self.ws is None:
+            self.ws = metrics.count_reconnects(WebSocket(
+                testnet=self.testnet,
+                channel_type="private",
+                api_key=self.api_key,
+                api_secret=self.api_secret,
+                demo=self.demo
+            ), "private")
+        self.ws.position_stream(callback=self.on_position)
+        self.ws.order_stream(callback=self.on_order)
+        self.ws.execution_stream(callback=self.on_execution)
+
+        if self.reconcile_interval > 0 and self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.__reconcile_loop, name="account-reconcile", daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    # -------------------- Stream Handlers -------------------- #
+
+    def on_position(self, contents: Dict) -> None:
+        with self.lock:
+            for p in contents['data']:
+                if p.get('category', self.channel) == self.channel:
+                    self.__set_position(p)
+
+    def on_order(self, contents: Dict) -> None:
+        with self.lock:
+            for o in contents['data']:
+                if o.get('category', self.channel) == self.channel:
+                    self.__set_order(o)
+
+    def on_execution(self, contents: Dict) -> None:
+        # Fills are kept for inspection. Position changes are received on the position stream.
+        for e in contents['data']:
+            if e.get('category', self.channel) == self.channel:
+                self.executions.append(e)
+
+    # -------------------- Reads -------------------- #
+
+    def get_positions(self, symbol: str) -> List[Position]:
+        """
+        Returns the open positions of a symbol
+        """
+        with self.lock:
+            return [to_position(p) for p in self.positions.get(symbol, {}).values() if _is_open_position(p)]
+
+    def get_orders(self, symbol: str) -> List[OpenOrder]:
+        """
+        Returns the open orders of a symbol
+        """
+        with self.lock:
+            return [to_open_order(o) for o in self.orders.get(symbol, {}).values() if _is_open_order(o)]
+
+    def flatten(self, symbols: Optional[List[str]] = None) -> List[LegResult]:
+        """
+        Cancels every open order, and closes every open position, of the tracked symbols in batch requests.
+
+        Parameters
+        ----------
+            symbols: List[str]
+                Symbols to flatten. Flattens every tracked symbol if None.
+        """
+        symbols = sorted(self.symbols) if symbols is None else symbols
+        positions = [p for s in symbols for p in self.get_positions(s)]
+        orders = [o for s in symbols for o in self.get_orders(s)]
+        return flatten(self.session, self.channel, positions, orders)
+
+    # -------------------- Reconcile -------------------- #
+
+    def reconcile(self, symbol: Optional[str] = None) -> int:
+        """
+        Replaces the book of a symbol (or of every tracked symbol) with REST results, keeping records that were
+        updated by the stream after the request. Returns the number of corrected records.
+
+        Parameters
+        ----------
+            symbol: str
+                Symbol to reconcile. Reconciles every tracked symbol if None.
+        """
+        symbols = [symbol] if symbol is not None else sorted(self.symbols)
+        corrections = 0
+        for s in symbols:
+            requested = int(time.time() * 1000)
+            positions = self.session.get_positions(category=self.channel, symbol=s)['result']['list']
+            orders = self.session.get_open_orders(category=self.channel, symbol=s)['result']['list']
+            with self.lock:
+                changed = self.__replace(self.positions[s], positions, requested, self.__position_key, _is_open_position)
+                changed += self.__replace(self.orders[s], orders, requested, lambda o: o['orderId'], _is_open_order)
+                # The first reconcile of a symbol seeds the book
+                if s in self.seeded:
+                    corrections += changed
+                self.seeded.add(s)
+
+        self.reconciles += 1
+        self.corrections += corrections
+        if corrections > 0:
+            _log.warning(f"Account state reconciled. Corrected records: {corrections}")
+        return corrections
+
+    # -------------------- Private Methods -------------------- #
+
+    @staticmethod
+    def __position_key(p: Dict) -> int:
+        # One-way mode positions have positionIdx 0. Hedge mode positions have 1 (Buy) and 2 (Sell).
+        return int(p.get('positionIdx', 0))
+
+    def __set_position(self, p: Dict) -> None:
+        self.__set(self.positions[p['symbol']], self.__position_key(p), p)
+
+    def __set_order(self, o: Dict) -> None:
+        self.__set(self.orders[o['symbol']], o['orderId'], o)
+
+    @staticmethod
+    def __set(book: Dict, key: Any, record: Dict) -> None:
+        # Closed records are kept until the next reconcile, so an older REST snapshot cannot reopen them
+        current = book.get(key)
+        if current is not None and _updated(current) > _updated(record):
+            return
+        book[key] = record
+
+    @staticmethod
+    def __replace(book: Dict, records: List[Dict], requested: int, key, is_open) -> int:
+        # Applies a REST snapshot to a book. Returns the number of open records that were missing or outdated.
+        corrections = 0
+        snapshot = {key(r): r for r in records}
+        for k in list(book.keys()):
+            if k not in snapshot and _updated(book[k]) <= requested:
+                corrections += is_open(book.pop(k))
+        for k, record in snapshot.items():
+            current = book.get(k)
+            if current is not None and _updated(current) >= _updated(record):
+                continue
+            corrections += is_open(record) or (current is not None and is_open(current))
+            book[k] = record
+        return corrections
+
+    def __reconcile_loop(self) -> None:
+        while not self.stopped.wait(self.reconcile_interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                _log.error(f"Account state reconcile failed. {e}")
+
+
+# Account states by (api key, channel). Strategies trading the same account share one private connection.
+_states: Dict[Tuple[Optional[str], str], AccountState] = dict()
+_states_lock = threading.Lock()
+
+
+def get_account_state(
+        session: Any,
+        channel: str,
+        api_key: Optional[str] = None,
+        api_secret: Optional[str] = None,
+        demo: bool = True) -> AccountState:
+    """
+    Returns the shared AccountState of an (account, channel), creating and starting it on first use.
+
+    Parameters
+    ----------
+        session: HTTP
+            ByBit HTTP session of the account
+
+        channel: str
+            Channel/Category
+
+        api_key, api_secret: str
+            Account credentials
+
+        demo: bool
+            Connects to demo trading
+    """
+    key = (api_key, channel)
+    with _states_lock:
+        if key not in _states:
+            state = AccountState(session, channel, api_key=api_key, api_secret=api_secret, demo=demo)
+            state.start()
+            _states[key] = state
+        return _states[key]
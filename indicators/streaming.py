@@ -0,0 +1,457 @@
+"""
+This module contains stateful streaming indicators that advance by one bar in constant time.
+
+Each indicator mirrors the pandas calculation currently used by the strategies, and can be checked against it with
+`check_parity()`:
+
+    SMA          - data.rolling(period).mean()
+    EMA          - data.ewm(span=period).mean()
+    RSI          - pandas_ta.rsi(data, period) (Wilder smoothing)
+    RollingStd   - data.rolling(period).std()
+    ZScore       - (data - mean) / data.rolling(period).std()
+    RollingSkew  - data.rolling(period).skew()
+"""
+
+import math
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Dict
+
+from templates.indicator import MAType
+
+NAN = float('nan')
+
+
+class Indicator:
+    """
+    Base class for streaming indicators.
+
+    `update()` advances the indicator by one value and returns the latest indicator value. NaN is returned until
+    enough values are received, and NaN inputs are skipped, matching pandas.
+    """
+
+    def __init__(self):
+        self.value = NAN
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.value)
+
+    def update(self, value: float) -> float:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        self.value = NAN
+
+    def reference(self, data: pd.Series) -> pd.Series:
+        """
+        Returns the pandas calculation this indicator streams.
+
+        Parameters
+        ----------
+            data: pd.Series
+                Input values
+        """
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    """
+    Simple moving average, kept as a running sum over a fixed window.
+    """
+
+    def __init__(self, period: int):
+        """
+        Parameters
+        ----------
+            period: int
+                Rolling window
+        """
+        super().__init__()
+        self.period = period
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        self.values = deque(maxlen=self.period)
+        self.total = 0.0
+
+    def update(self, value: float) -> float:
+        if math.isnan(value):
+            return self.value
+
+        if len(self.values) == self.period:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+        if len(self.values) == self.period:
+            self.value = self.total / self.period
+        return self.value
+
+    def reference(self, data: pd.Series) -> pd.Series:
+        return data.rolling(self.period).mean()
+
+
+class EWM(Indicator):
+    """
+    Exponentially weighted mean, updated recursively.
+
+    With `adjust=True`, the weights are normalized the same way as pandas `ewm(adjust=True)`, so the result matches
+    pandas from the first value instead of converging to it.
+    """
+
+    def __init__(self, alpha: float, min_periods: int = 0, adjust: bool = True):
+        """
+        Parameters
+        ----------
+            alpha: float
+                Smoothing factor, 0 < alpha <= 1
+
+            min_periods: int
+                Number of values required before a value is returned
+
+            adjust: bool
+                Normalizes the weights of early values. See pandas `ewm()`.
+        """
+        super().__init__()
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.adjust = adjust
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        self.count = 0
+        self.numerator = 0.0
+        self.denominator = 0.0
+
+    def update(self, value: float) -> float:
+        if math.isnan(value):
+            return self.value
+
+        decay = 1.0 - self.alpha
+        if self.adjust:
+            self.numerator = value + decay * self.numerator
+            self.denominator = 1.0 + decay * self.denominator
+            mean = self.numerator / self.denominator
+        else:
+            mean = value if self.count == 0 else decay * self.numerator + self.alpha * value
+            self.numerator = mean
+
+        self.count += 1
+        if self.count >= max(self.min_periods, 1):
+            self.value = mean
+        return self.value
+
+    def reference(self, data: pd.Series) -> pd.Series:
+        return data.ewm(alpha=self.alpha, min_periods=self.min_periods, adjust=self.adjust).mean()
+
+
+class EMA(EWM):
+    """
+    Exponential moving average, matching `ewm(span=period).mean()`.
+    """
+
+    def __init__(self, period: int):
+        """
+        Parameters
+        ----------
+            period: int
+                Span of the moving average
+        """
+        self.period = period
+        super().__init__(alpha=2.0 / (period + 1.0))
+
+    def reference(self, data: pd.Series) -> pd.Series:
+        return data.ewm(span=self.period).mean()
+
+
+class RSI(Indicator):
+    """
+    Relative Strength Index with Wilder smoothing (alpha = 1 / period), matching `pandas_ta.rsi()`.
+    """
+
+    def __init__(self, period: int):
+        """
+        Parameters
+        ----------
+            period: int
+                RSI period
+        """
+        super().__init__()
+        self.period = period
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        self.previous = NAN
+        self.gains = EWM(alpha=1.0 / self.period, min_periods=self.period)
+        self.losses = EWM(alpha=1.0 / self.period, min_periods=self.period)
+
+    def update(self, value: float) -> float:
+        if math.isnan(value):
+            return self.value
+
+        change = value - self.previous
+        self.previous = value
+        if math.isnan(change):
+            return self.value
+
+        gain = self.gains.update(max(change, 0.0))
+        loss = self.losses.update(-min(change, 0.0))
+        if not math.isnan(gain):
+            self.value = 100.0 * gain / (gain + loss) if gain + loss != 0 else NAN
+        return self.value
+
+    def reference(self, data: pd.Series) -> pd.Series:
+        change = data.diff()
+        alpha = 1.0 / self.period
+        gain = change.clip(lower=0).ewm(alpha=alpha, min_periods=self.period).mean()
+        loss = change.clip(upper=0).abs().ewm(alpha=alpha, min_periods=self.period).mean()
+        return 100.0 * gain / (gain + loss)
+
+
+class RollingStd(Indicator):
+    """
+    Rolling sample standard deviation, updated with Welford's algorithm over a fixed window.
+    """
+
+    def __init__(self, period: int):
+        """
+        Parameters
+        ----------
+            period: int
+                Rolling window
+        """
+        super().__init__()
+        self.period = period
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        self.values = deque(maxlen=self.period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value: float) -> float:
+        if math.isnan(value):
+            return self.value
+
+        if len(self.values) < self.period:
+            # Window is filling: regular Welford update
+            self.values.append(value)
+            delta = value - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (value - self.mean)
+        else:
+            # Window is full: replace the oldest value
+            oldest = self.values[0]
+            self.values.append(value)
+            previous_mean = self.mean
+            self.mean += (value - oldest) / self.period
+            self.m2 += (value - oldest) * (value - self.mean + oldest - previous_mean)
+
+        if len(self.values) == self.period and self.period > 1:
+            self.value = math.sqrt(max(self.m2, 0.0) / (self.period - 1))
+        return self.value
+
+    def reference(self, data: pd.Series) -> pd.Series:
+        return data.rolling(self.period).std()
+
+
+class ZScore(Indicator):
+    """
+    Rolling z-score: distance of the latest value from its moving average, in rolling standard deviations.
+    """
+
+    def __init__(self, mean: Indicator, sdev_period: int):
+        """
+        Parameters
+        ----------
+            mean: Indicator
+                Moving average of the input values (SMA or EMA)
+
+            sdev_period: int
+                Rolling window of the standard deviation
+        """
+        super().__init__()
+        self.mean = mean
+        self.sdev = RollingStd(sdev_period)
+
+    def reset(self) -> None:
+        super().reset()
+        self.mean.reset()
+        self.sdev.reset()
+
+    def update(self, value: float) -> float:
+        if math.isnan(value):
+            return self.value
+
+        mean = self.mean.update(value)
+        sdev = self.sdev.update(value)
+        self.value = (value - mean) / sdev if sdev > 0 else NAN
+        return self.value
+
+    def reference(self, data: pd.Series) -> pd.Series:
+        return (data - self.mean.reference(data)) / self.sdev.reference(data)
+
+
+class RollingSkew(Indicator):
+    """
+    Rolling bias-corrected sample skewness, kept as running power sums of the first three moments.
+
+    Values are shifted by a reference value to limit cancellation errors on large prices. The reference is moved to
+    the window mean, and the sums are rebuilt, once every `period` updates (amortized constant time).
+    """
+
+    def __init__(self, period: int):
+        """
+        Parameters
+        ----------
+            period: int
+                Rolling window. Must be at least 3.
+        """
+        super().__init__()
+        self.period = period
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        self.values = deque(maxlen=self.period)
+        self.shift = 0.0
+        self.updates = 0
+        self.s1 = self.s2 = self.s3 = 0.0
+
+    def update(self, value: float) -> float:
+        if math.isnan(value):
+            return self.value
+
+        if len(self.values) == self.period:
+            x = self.values[0] - self.shift
+            self.s1 -= x
+            self.s2 -= x * x
+            self.s3 -= x * x * x
+        self.values.append(value)
+        x = value - self.shift
+        self.s1 += x
+        self.s2 += x * x
+        self.s3 += x * x * x
+
+        self.updates += 1
+        if self.updates % self.period == 0:
+            self.__recenter()
+
+        n = len(self.values)
+        if n < self.period or n < 3:
+            return self.value
+
+        mean = self.s1 / n
+        m2 = self.s2 / n - mean * mean
+        m3 = self.s3 / n - 3.0 * mean * self.s2 / n + 2.0 * mean ** 3
+        if m2 <= 1e-14 * max(1.0, (self.shift + mean) ** 2):
+            self.value = NAN
+        else:
+            self.value = math.sqrt(n * (n - 1)) / (n - 2) * m3 / m2 ** 1.5
+        return self.value
+
+    def reference(self, data: pd.Series) -> pd.Series:
+        return data.rolling(self.period).skew()
+
+    # -------------------- Private Methods -------------------- #
+
+    def __recenter(self) -> None:
+        # Rebuilds the power sums around the current window mean
+        self.shift = sum(self.values) / len(self.values)
+        self.s1 = self.s2 = self.s3 = 0.0
+        for value in self.values:
+            x = value - self.shift
+            self.s1 += x
+            self.s2 += x * x
+            self.s3 += x * x * x
+
+
+def moving_average(kind: MAType, period: int) -> Indicator:
+    """
+    Returns a streaming moving average of the specified type.
+
+    Parameters
+    ----------
+        kind: MAType
+            Type of moving average: SIMPLE or EXPONENTIAL
+
+        period: int
+            Rolling window / span
+    """
+    if kind == MAType.SIMPLE:
+        return SMA(period)
+    if kind == MAType.EXPONENTIAL:
+        return EMA(period)
+    raise ValueError(f"Incorrect value for MA Type. Use: SIMPLE or EXPONENTIAL. Input: {kind}")
+
+
+def check_parity(indicator: Indicator, data: pd.Series, tolerance: float = 1e-6) -> float:
+    """
+    Streams `data` through a freshly reset indicator, and compares every value against the pandas calculation.
+
+    Returns the largest relative error. Raises ValueError if it exceeds the tolerance, or if the warm-up (NaN)
+    periods differ.
+
+    Parameters
+    ----------
+        indicator: Indicator
+            Streaming indicator to check. The indicator is reset.
+
+        data: pd.Series
+            Input values
+
+        tolerance: float
+            Maximum relative error
+    """
+    indicator.reset()
+    streamed = np.array([indicator.update(float(x)) for x in data])
+    expected = indicator.reference(data.astype(float)).to_numpy()
+
+    if not np.array_equal(np.isnan(streamed), np.isnan(expected)):
+        raise ValueError(f"Parity check failed for {type(indicator).__name__}. NaN values differ.")
+
+    valid = ~np.isnan(expected)
+    if not valid.any():
+        return 0.0
+
+    error = np.abs(streamed[valid] - expected[valid]) / np.maximum(np.abs(expected[valid]), 1.0)
+    worst = float(error.max())
+    if worst > tolerance:
+        raise ValueError(f"Parity check failed for {type(indicator).__name__}. Relative error: {worst}")
+    return worst
+
+
+def parity_errors(values: Dict[str, float], expected: pd.Series, tolerance: float = 1e-6) -> Dict[str, float]:
+    """
+    Compares streamed indicator values with the last row of a pandas calculation (e.g. `attach_indicators`).
+
+    Returns the relative errors of values that exceed the tolerance.
+
+    Parameters
+    ----------
+        values: Dict[str, float]
+            Streamed values, keyed by column name
+
+        expected: pd.Series
+            Row of pandas values, indexed by column name
+
+        tolerance: float
+            Maximum relative error
+    """
+    errors = dict()
+    for name, value in values.items():
+        if name not in expected.index:
+            continue
+        reference = float(expected[name])
+        if math.isnan(value) and math.isnan(reference):
+            continue
+        error = abs(value - reference) / max(abs(reference), 1.0)
+        if not error <= tolerance:
+            errors[name] = error
+    return errors
@@ -0,0 +1,243 @@
+"""
+This module contains the CandleStore class, a persistent local OHLCV store that sits behind `Strategy.fetch`.
+
+Confirmed candles are kept on disk per (symbol, channel, interval), and only candles newer than the last stored
+timestamp are requested from ByBit. Restarts reuse the stored history instead of downloading it again.
+"""
+
+import os
+import threading
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+from constants import constants as c
+from templates.intervals import Timeframes
+
+
+def parse_klines(rows: List[List[str]]) -> pd.DataFrame:
+    """
+    Converts the `result.list` payload of a get_kline response into an ascending OHLCV DataFrame.
+
+    Parameters
+    ----------
+        rows: List[List[str]]
+            Kline rows as received from ByBit (newest first). Each row contains:
+            start time (ms), open, high, low, close, volume, turnover
+    """
+    df = pd.DataFrame(rows, columns=c.CANDLE_COLUMNS)
+    df = df.set_index('Time', drop=True)
+    # convert timestamp to datetime
+    df.index = pd.to_datetime(df.index.astype('int64'), unit='ms')
+    df.index.name = 'Time'
+    # sets values to float
+    df = df.astype(float)
+    # inverts the dataframe
+    return df[::-1]
+
+
+class CandleStore:
+    """
+    Persistent store of confirmed candles for a single (symbol, channel, interval).
+
+    Candles are kept in memory after the first load, and appended to
+    `candles/<channel>/<symbol>_<interval>.csv` as they are confirmed.
+    """
+
+    def __init__(
+            self,
+            symbol: str,
+            channel: str,
+            interval: Timeframes,
+            directory: str = c.CANDLE_STORE_DIRECTORY):
+        """
+        Parameters
+        ----------
+            symbol: str
+                Symbol
+
+            channel: str
+                Channel/Category
+
+            interval: Timeframes
+                Candle interval
+
+            directory: str
+                Root directory of the candle store
+        """
+        self.symbol = symbol
+        self.channel = channel
+        self.interval = interval
+        self.path = os.path.join(directory, channel, f"{symbol}_{interval.value}.csv")
+
+        # In-memory copy of the stored candles. Loaded lazily.
+        self.data: Optional[pd.DataFrame] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> pd.DataFrame:
+        """
+        Returns the stored candles, reading them from disk on first use.
+        """
+        if self.data is not None:
+            return self.data
+
+        if not os.path.isfile(self.path):
+            self.data = parse_klines([])
+            return self.data
+
+        df = pd.read_csv(self.path, index_col='Time')
+        df.index = pd.to_datetime(df.index.astype('int64'), unit='ms')
+        self.data = df.astype(float)
+        return self.data
+
+    def last_timestamp(self) -> Optional[int]:
+        """
+        Returns the start time (ms) of the most recent stored candle, or None if the store is empty.
+        """
+        data = self.load()
+        if len(data) == 0:
+            return None
+        return self.__to_ms(data.index[-1])
+
+    def append(self, candles: pd.DataFrame) -> int:
+        """
+        Merges candles into the store and persists them. Returns the number of new candles.
+
+        New candles are appended to the file. The file is rewritten only if older history is backfilled.
+
+        Parameters
+        ----------
+            candles: pd.DataFrame
+                Confirmed candles, as returned by `parse_klines`
+        """
+        data = self.load()
+        new = candles[~candles.index.isin(data.index)]
+        if len(new) == 0:
+            return 0
+
+        backfill = len(data) > 0 and new.index[0] < data.index[-1]
+        self.data = pd.concat([data, new]).sort_index()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if backfill or not os.path.isfile(self.path):
+            self.__write(self.data, mode='w')
+        else:
+            self.__write(new, mode='a')
+
+        return len(new)
+
+    def tail(self, elements: int) -> pd.DataFrame:
+        """
+        Returns a copy of the latest stored candles.
+
+        Parameters
+        ----------
+            elements: int
+                Number of candles to return
+        """
+        return self.load().iloc[-elements:].copy()
+
+    def top_up(self, session: Any, elements: int) -> pd.DataFrame:
+        """
+        Requests candles newer than the last stored timestamp, and returns the latest `elements` candles.
+
+        The full window is downloaded only when the store holds fewer than `elements` candles.
+
+        Parameters
+        ----------
+            session: HTTP
+                ByBit session used for get_kline requests
+
+            elements: int
+                Number of confirmed candles required by the caller
+        """
+        with self._lock:
+            last = self.last_timestamp()
+
+            if last is None or len(self.data) < elements:
+                # Not enough history on disk. Download the requested window once.
+                rows = self.__download(session, count=elements + 1)
+            else:
+                rows = self.__download(session, start=last)
+
+            if len(rows) > 0:
+                # excludes the newest row since this is fresh candle, and is still open
+                self.append(parse_klines(rows)[:-1])
+
+            return self.tail(elements)
+
+    # -------------------- Private Methods -------------------- #
+
+    def __download(self, session: Any, start: Optional[int] = None, count: Optional[int] = None) -> List[List[str]]:
+        """
+        Pages backwards through get_kline until `start` is reached, or `count` candles are received.
+
+        Parameters
+        ----------
+            session: HTTP
+                ByBit session used for get_kline requests
+
+            start: int
+                Oldest candle start time (ms) to request
+
+            count: int
+                Maximum number of candles to request
+        """
+        rows = list()
+        end = None
+        while True:
+            limit = c.KLINE_LIMIT if count is None else min(count - len(rows), c.KLINE_LIMIT)
+            params: Dict[str, Any] = dict(
+                category=self.channel,
+                symbol=self.symbol,
+                interval=self.interval.value,
+                limit=limit
+            )
+            if start is not None:
+                params['start'] = start
+            if end is not None:
+                params['end'] = end
+
+            page = session.get_kline(**params)['result']['list']
+            rows.extend(page)
+
+            if len(page) < limit or (count is not None and len(rows) >= count):
+                return rows
+            # Continue from the oldest received candle
+            end = int(page[-1][0]) - 1
+
+    def __write(self, data: pd.DataFrame, mode: str) -> None:
+        out = data.copy()
+        out.index = (data.index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+        out.index.name = 'Time'
+        out.to_csv(self.path, mode=mode, header=(mode == 'w'))
+
+    @staticmethod
+    def __to_ms(timestamp: pd.Timestamp) -> int:
+        return int(timestamp.value // 1_000_000)
+
+
+# ----- Process-wide stores, shared by strategies trading the same instrument ----- #
+_stores: Dict[Tuple[str, str, Timeframes], CandleStore] = dict()
+_stores_lock = threading.Lock()
+
+
+def get_store(symbol: str, channel: str, interval: Timeframes) -> CandleStore:
+    """
+    Returns the shared CandleStore for a (symbol, channel, interval), creating it on first use.
+
+    Parameters
+    ----------
+        symbol: str
+            Symbol
+
+        channel: str
+            Channel/Category
+
+        interval: Timeframes
+            Candle interval
+    """
+    key = (symbol, channel, interval)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = CandleStore(symbol, channel, interval)
+        return _stores[key]
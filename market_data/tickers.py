@@ -0,0 +1,180 @@
+"""
+This module contains the TickerCache class, an in-memory cache of the latest ticker values per symbol, kept current
+from ByBit's ticker stream.
+
+Orders read the mark price from the cache instead of requesting it with `get_tickers` on every order. A cached value
+older than `max_age` seconds (e.g. after a disconnect) is not used, and callers fall back to REST.
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from pybit.unified_trading import WebSocket
+
+from constants import constants as c
+from telemetry import metrics
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Ticker:
+    """
+    Latest ticker values of a symbol
+
+    Parameters
+    ----------
+        received: float
+            Local receive time, from `time.monotonic()`. Used for staleness checks.
+
+        timestamp: int
+            Exchange message time (ms)
+    """
+    symbol: str
+    mark_price: float
+    last_price: float
+    bid: float
+    ask: float
+    received: float
+    timestamp: int
+
+    @property
+    def age(self) -> float:
+        # Seconds since the ticker was received
+        return time.monotonic() - self.received
+
+
+def _price(data: Dict, key: str) -> float:
+    # Spot tickers do not contain mark price, or bid/ask
+    value = data.get(key)
+    return float(value) if value not in (None, '') else math.nan
+
+
+class TickerCache:
+    """
+    Latest mark/last/bid/ask per symbol, from the ticker stream of a single channel.
+
+    Example:
+        tickers = get_ticker_cache('linear')
+        tickers.subscribe('BTCUSDT')
+        mark_price = tickers.mark_price('BTCUSDT')  # None if missing or stale
+    """
+
+    def __init__(
+            self,
+            channel: str = c.CHANNEL,
+            max_age: float = c.TICKER_MAX_AGE,
+            testnet: bool = False,
+            websocket: Any = None):
+        """
+        Parameters
+        ----------
+            channel: str
+                Channel/Category
+
+            max_age: float
+                Maximum age (seconds) of a cached value
+
+            testnet: bool
+                Connects to the testnet. Demo trading uses mainnet prices.
+
+            websocket: WebSocket
+                Existing public connection. A connection is opened on the first subscription if None.
+        """
+        self.channel = channel
+        self.max_age = max_age
+        self.testnet = testnet
+        self.ws = websocket
+
+        self.tickers: Dict[str, Ticker] = dict()
+        self.symbols: Set[str] = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self, symbol: str) -> None:
+        """
+        Subscribes to the ticker stream of a symbol. Symbols already subscribed are ignored.
+        """
+        with self.lock:
+            if symbol in self.symbols:
+                return
+            self.symbols.add(symbol)
+            if self.ws is None:
+                self.ws = metrics.count_reconnects(WebSocket(testnet=self.testnet, channel_type=self.channel),
+                                                   f"{self.channel}.tickers")
+        self.ws.ticker_stream(symbol=symbol, callback=self.handler)
+        _log.info(f"Subscribed to tickers: {symbol}")
+
+    def handler(self, contents: Dict) -> None:
+        """
+        Handler for ByBit Websocket. Stores the latest ticker values. Delta messages are merged into the snapshot by
+        pybit before the callback.
+
+        Parameters
+        ----------
+            contents: dict
+                Received JSON contents from bybit
+        """
+        data = contents['data']
+        symbol = data['symbol']
+        self.tickers[symbol] = Ticker(
+            symbol=symbol,
+            mark_price=_price(data, 'markPrice'),
+            last_price=_price(data, 'lastPrice'),
+            bid=_price(data, 'bid1Price'),
+            ask=_price(data, 'ask1Price'),
+            received=time.monotonic(),
+            timestamp=int(contents.get('ts', 0))
+        )
+
+    def get(self, symbol: str, max_age: Optional[float] = None) -> Optional[Ticker]:
+        """
+        Returns the latest ticker of a symbol, or None if missing or older than `max_age` seconds.
+
+        Parameters
+        ----------
+            symbol: str
+                Symbol
+
+            max_age: float
+                Maximum age (seconds). Defaults to the cache's `max_age`.
+        """
+        ticker = self.tickers.get(symbol)
+        if ticker is None:
+            return None
+        if ticker.age > (self.max_age if max_age is None else max_age):
+            return None
+        return ticker
+
+    def mark_price(self, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        """
+        Returns the cached mark price of a symbol, or None if missing or stale. Spot symbols use the last price.
+        """
+        ticker = self.get(symbol, max_age)
+        if ticker is None:
+            return None
+        price = ticker.mark_price if not math.isnan(ticker.mark_price) else ticker.last_price
+        return None if math.isnan(price) else price
+
+
+# Ticker caches by channel. Strategies trading the same channel share one connection.
+_caches: Dict[str, TickerCache] = dict()
+_caches_lock = threading.Lock()
+
+
+def get_ticker_cache(channel: str) -> TickerCache:
+    """
+    Returns the shared TickerCache of a channel, creating it on first use.
+
+    Parameters
+    ----------
+        channel: str
+            Channel/Category
+    """
+    with _caches_lock:
+        if channel not in _caches:
+            _caches[channel] = TickerCache(channel)
+        return _caches[channel]
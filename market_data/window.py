@@ -0,0 +1,181 @@
+"""
+This module contains the CandleWindow class, a fixed-capacity rolling window of confirmed candles.
+
+The window is seeded once at startup, and appended to from the WebSocket stream by `TradeMain.handler`, so strategies
+can read their candles without a REST round trip on every stage.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+from constants import constants as c
+from templates.candles import Candles
+
+
+class CandleWindow:
+    """
+    Array-backed ring buffer of OHLCV candles.
+
+    Columns are preallocated NumPy arrays of twice the capacity. Each candle is written at the head pointer and at
+    head + capacity, so the latest `capacity` candles are always a contiguous slice. Reads return views into the
+    buffer, without copying.
+
+    Views are only valid until the window wraps around, and should be consumed within the stage that requested them.
+    """
+
+    VALUE_COLUMNS = c.CANDLE_COLUMNS[1:]
+
+    def __init__(self, capacity: int = c.CANDLE_WINDOW_CAPACITY):
+        """
+        Parameters
+        ----------
+            capacity: int
+                Maximum number of candles held by the window
+        """
+        if capacity <= 0:
+            raise ValueError(f"Invalid capacity. Value must be greater than 0. Input: {capacity}")
+
+        self.capacity = capacity
+        self.size = 0
+        # Next write position, in [0, capacity)
+        self.head = 0
+
+        self._time = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.full((len(self.VALUE_COLUMNS), 2 * capacity), np.nan)
+        self._columns = {name: i for i, name in enumerate(self.VALUE_COLUMNS)}
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """
+        Start time (ms) of the latest candle, or None if the window is empty.
+        """
+        if self.size == 0:
+            return None
+        return int(self._time[self.head + self.capacity - 1])
+
+    def append(
+            self,
+            time: int,
+            open: float,
+            high: float,
+            low: float,
+            close: float,
+            volume: float,
+            turnover: float) -> bool:
+        """
+        Appends a confirmed candle. Returns False if the candle is not newer than the latest candle.
+
+        Parameters
+        ----------
+            time: int
+                Candle start time (ms)
+
+            open, high, low, close, volume, turnover: float
+                Candle values
+        """
+        last = self.last_timestamp
+        if last is not None and time <= last:
+            return False
+
+        head = self.head
+        mirror = head + self.capacity
+        self._time[head] = self._time[mirror] = time
+        values = self._values
+        values[0, head] = values[0, mirror] = open
+        values[1, head] = values[1, mirror] = high
+        values[2, head] = values[2, mirror] = low
+        values[3, head] = values[3, mirror] = close
+        values[4, head] = values[4, mirror] = volume
+        values[5, head] = values[5, mirror] = turnover
+
+        self.head = (head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def append_candle(self, candle: Candles) -> bool:
+        """
+        Appends a confirmed candle received from the kline stream.
+
+        The window is cleared if candles were missed since the latest candle (e.g. during a reconnect), so that
+        readers reseed it instead of reading a window with gaps.
+
+        Parameters
+        ----------
+            candle: Candles
+                Contains the latest ticker information
+        """
+        # Candle fields are converted on construction
+        start = candle.start
+        last = self.last_timestamp
+        if last is not None and start - (candle.end + 1 - start) > last:
+            self.clear()
+
+        return self.append(start, candle.open, candle.high, candle.low, candle.close, candle.volume, candle.turnover)
+
+    def clear(self) -> None:
+        """
+        Empties the window. Preallocated columns are kept.
+        """
+        self.size = 0
+        self.head = 0
+
+    def seed(self, data: pd.DataFrame) -> None:
+        """
+        Fills the window with historical candles, as returned by `Strategy.fetch`. Existing candles are replaced.
+
+        Parameters
+        ----------
+            data: pd.DataFrame
+                OHLCV DataFrame indexed by candle start time
+        """
+        self.clear()
+        data = data.iloc[-self.capacity:]
+        times = (data.index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+        values = data[self.VALUE_COLUMNS].to_numpy(dtype=float)
+        for time, row in zip(times, values):
+            self.append(int(time), *row)
+
+    def column(self, name: str, elements: Optional[int] = None) -> np.ndarray:
+        """
+        Returns a view of the latest values of a column, oldest first.
+
+        Parameters
+        ----------
+            name: str
+                Column name: Time, Open, High, Low, Close, Volume, Turnover
+
+            elements: int
+                Number of candles to return. Returns all candles if None.
+        """
+        start, end = self.__bounds(elements)
+        if name == 'Time':
+            return self._time[start:end]
+        return self._values[self._columns[name], start:end]
+
+    def frame(self, elements: Optional[int] = None) -> pd.DataFrame:
+        """
+        Returns the latest candles as a DataFrame in the same layout as `Strategy.fetch`.
+
+        Columns are views into the window.
+
+        Parameters
+        ----------
+            elements: int
+                Number of candles to return. Returns all candles if None.
+        """
+        start, end = self.__bounds(elements)
+        index = pd.DatetimeIndex(self._time[start:end].view('datetime64[ms]'), name='Time')
+        data = {name: self._values[i, start:end] for name, i in self._columns.items()}
+        return pd.DataFrame(data, index=index, copy=False)
+
+    # -------------------- Private Methods -------------------- #
+
+    def __bounds(self, elements: Optional[int]):
+        if elements is None or elements > self.size:
+            elements = self.size
+        end = self.head + self.capacity
+        return end - elements, end
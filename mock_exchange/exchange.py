@@ -0,0 +1,688 @@
+"""
+This module contains a local stand-in for the ByBit V5 API. It is used to load test the whole trading loop, from the
+kline stream to `place_order`, without the demo environment.
+
+One HTTP server serves:
+    GET  /v5/market/kline, /v5/market/tickers, /v5/position/list, /v5/order/realtime
+    POST /v5/order/create, /v5/order/create-batch, /v5/order/cancel-batch, /v5/order/cancel-all
+    WebSocket /v5/public/<channel>, with the kline.<interval>.<symbol> and tickers.<symbol> topics
+
+Each symbol's price is a random walk, advanced every `tick` seconds. Every `ticks_per_candle` ticks the open candle
+is confirmed, and the next candle starts one interval later, so a candle of market time passes in
+`tick * ticks_per_candle` seconds.
+
+Orders are matched against the last price. Market orders fill immediately, limit orders rest until the price crosses
+them, and positions (one-way mode) are closed when their TP or SL is crossed. Accounts are keyed by the request's API
+key. Each response is delayed by `latency` +/- `jitter` seconds. A fraction `error_rate` of requests fail with retCode
+10016. Requests over `rate_limit` per second per account and endpoint fail with retCode 10006, with the X-Bapi-Limit
+headers set.
+
+Example:
+    exchange = MockExchange(ExchangeConfig(symbols=['BTCUSDT', 'ETHUSDT'], latency=0.005))
+    exchange.start()
+    session = get_session(api_key='key', api_secret='secret', endpoint=exchange.url)
+    ws = MockWebSocket(exchange.ws_url('linear'), channel_type='linear')
+    ...
+    exchange.stop()
+"""
+
+import json
+import logging
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from pybit.unified_trading import WebSocket
+
+from constants import constants as c
+from session.scheduler import TokenBucket
+from templates.intervals import Timeframes
+from . import websocket
+
+_log = logging.getLogger(__name__)
+
+# (HTTP method, path) -> MockExchange method
+ROUTES = {
+    ('GET', '/v5/market/kline'): 'get_kline',
+    ('GET', '/v5/market/tickers'): 'get_tickers',
+    ('GET', '/v5/position/list'): 'get_positions',
+    ('GET', '/v5/order/realtime'): 'get_open_orders',
+    ('POST', '/v5/order/create'): 'place_order',
+    ('POST', '/v5/order/create-batch'): 'place_batch_order',
+    ('POST', '/v5/order/cancel-batch'): 'cancel_batch_order',
+    ('POST', '/v5/order/cancel-all'): 'cancel_all_orders',
+}
+
+# ByBit return codes used by the mock
+PARAMS_ERROR = 10001
+RATE_LIMITED = 10006
+SERVER_ERROR = 10016
+ORDER_NOT_FOUND = 110001
+REDUCE_ONLY_REJECTED = 110017
+
+# pybit stores a subscription request after sending it, so a reply faster than the network would be unknown to it
+SUBSCRIBE_DELAY = 0.05
+
+
+@dataclass
+class ExchangeConfig:
+    """
+    Holds the market, latency and failure settings of a mock exchange
+
+    Parameters
+    ----------
+        volatility: float
+            Standard deviation of the price return of a tick
+
+        history: int
+            Confirmed candles served by get_kline before the first tick
+
+        latency, jitter: float
+            Response delay (seconds), and its maximum random deviation
+
+        error_rate: float
+            Fraction of requests failing with retCode 10016. Example: 0.01
+
+        rate_limit: float
+            Requests per second per account and endpoint. Not limited if None.
+    """
+    symbols: List[str] = field(default_factory=lambda: [c.SYMBOL])
+    interval: Timeframes = Timeframes.MIN_1
+    price: float = 100.0
+    volatility: float = 0.001
+    history: int = c.CANDLE_WINDOW_CAPACITY
+    tick: float = 0.1
+    ticks_per_candle: int = 10
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: Optional[float] = None
+    seed: int = 0
+
+
+@dataclass
+class ExchangeStats:
+    """
+    Holds the request and matching counts of a mock exchange
+    """
+    requests: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    errors: int = 0
+    throttled: int = 0
+    orders: int = 0
+    fills: int = 0
+    candles: int = 0
+    messages: int = 0
+
+
+class _Market:
+    """
+    Random walk candles of a symbol. Candles are [start (ms), open, high, low, close, volume, turnover], ascending.
+    """
+
+    def __init__(self, symbol: str, config: ExchangeConfig, rng: random.Random):
+        self.symbol = symbol
+        self.rng = rng
+        self.volatility = config.volatility
+        self.ticks_per_candle = config.ticks_per_candle
+        self.interval_ms = config.interval.value * 60_000
+        self.ticks = 0
+
+        start = int(time.time() * 1000) // self.interval_ms * self.interval_ms - config.history * self.interval_ms
+        self.price = config.price
+        self.candles: List[List[float]] = list()
+        for i in range(config.history):
+            self.open = self.__new_candle(start + i * self.interval_ms)
+            for _ in range(self.ticks_per_candle):
+                self.__move()
+            self.candles.append(self.open)
+        self.open = self.__new_candle(start + config.history * self.interval_ms)
+
+    def step(self) -> Optional[List[float]]:
+        """
+        Moves the price one tick. Returns the confirmed candle if the tick closes the open candle.
+        """
+        self.__move()
+        self.ticks += 1
+        if self.ticks % self.ticks_per_candle != 0:
+            return None
+        confirmed = self.open
+        self.candles.append(confirmed)
+        self.open = self.__new_candle(confirmed[0] + self.interval_ms)
+        return confirmed
+
+    def rows(self, start: Optional[int], end: Optional[int], limit: int) -> List[List[str]]:
+        """
+        Returns get_kline rows between start and end (ms), newest first, including the open candle
+        """
+        candles = self.candles + [self.open]
+        first = candles[0][0]
+        low = 0 if start is None else max(0, -(-(start - first) // self.interval_ms))
+        high = len(candles) if end is None else min(len(candles), (end - first) // self.interval_ms + 1)
+        selected = candles[max(low, high - limit):high] if high > low else []
+        return [[str(int(k[0]))] + [repr(v) for v in k[1:]] for k in reversed(selected)]
+
+    def message(self, candle: List[float], confirm: bool) -> Dict:
+        """
+        Returns the data of a kline stream message
+        """
+        return {
+            "start": int(candle[0]), "end": int(candle[0]) + self.interval_ms - 1,
+            "interval": str(self.interval_ms // 60_000), "open": repr(candle[1]), "close": repr(candle[4]),
+            "high": repr(candle[2]), "low": repr(candle[3]), "volume": repr(candle[5]),
+            "turnover": repr(candle[6]), "confirm": confirm, "timestamp": int(time.time() * 1000)
+        }
+
+    def __new_candle(self, start: int) -> List[float]:
+        return [start, self.price, self.price, self.price, self.price, 0.0, 0.0]
+
+    def __move(self) -> None:
+        self.price = round(self.price * (1 + self.rng.gauss(0, self.volatility)), 4)
+        volume = round(self.rng.uniform(0.1, 10), 3)
+        self.open[2] = max(self.open[2], self.price)
+        self.open[3] = min(self.open[3], self.price)
+        self.open[4] = self.price
+        self.open[5] += volume
+        self.open[6] += volume * self.price
+
+
+class _Account:
+    """
+    Positions (one-way mode) and resting orders of an API key
+    """
+
+    def __init__(self):
+        # Symbol -> {'side', 'size', 'avgPrice', 'takeProfit', 'stopLoss'}
+        self.positions: Dict[str, Dict[str, Any]] = dict()
+        # Order ID -> order
+        self.orders: Dict[str, Dict[str, Any]] = dict()
+
+
+class _Connection:
+    """
+    A WebSocket client of the mock exchange, and its subscribed topics
+    """
+
+    def __init__(self, sock: socket.socket, wfile: Any):
+        self.sock = sock
+        self.wfile = wfile
+        self.topics: Set[str] = set()
+        self.lock = threading.Lock()
+        self.id = uuid.uuid4().hex
+
+    def send(self, payload: bytes, opcode: int = websocket.TEXT) -> None:
+        with self.lock:
+            self.wfile.write(websocket.frame(payload, opcode))
+
+
+class MockExchange:
+    """
+    Local ByBit V5 REST and public WebSocket server, with a random walk market and a matching model. See module
+    docstring.
+    """
+
+    def __init__(self, config: Optional[ExchangeConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Parameters
+        ----------
+            config: ExchangeConfig
+                Market, latency and failure settings
+
+            host: str
+                Interface to listen on
+
+            port: int
+                Port to listen on. A free port is picked if 0.
+        """
+        self.config = config if config is not None else ExchangeConfig()
+        self.random = random.Random(self.config.seed)
+        self.markets = {s: _Market(s, self.config, random.Random(f"{self.config.seed}.{s}"))
+                        for s in self.config.symbols}
+        self.accounts: Dict[str, _Account] = defaultdict(_Account)
+        self.buckets: Dict[Tuple[str, str], TokenBucket] = dict()
+        self.stats = ExchangeStats()
+        self.lock = threading.Lock()
+
+        self.connections: List[_Connection] = list()
+        self.connections_lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.exchange = self
+        self.threads: List[threading.Thread] = list()
+        self.stopped = threading.Event()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def ws_url(self, channel: str = c.CHANNEL) -> str:
+        host, port = self.server.server_address[:2]
+        return f"ws://{host}:{port}/v5/public/{channel}"
+
+    def start(self, feed: bool = True) -> None:
+        """
+        Starts serving, on daemon threads
+
+        Parameters
+        ----------
+            feed: bool
+                Advances the market every `tick` seconds. Otherwise, the market only moves on `step()`.
+        """
+        self.stopped.clear()
+        targets = [('mock-exchange', self.server.serve_forever)]
+        if feed:
+            targets.append(('mock-exchange-feed', self.__feed))
+        for name, target in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        _log.info(f"Mock exchange serving {len(self.markets)} symbols on {self.url}")
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.server.shutdown()
+        with self.connections_lock:
+            for connection in self.connections:
+                try:
+                    connection.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        for thread in self.threads:
+            thread.join()
+        self.threads.clear()
+        self.server.server_close()
+
+    def step(self) -> None:
+        """
+        Moves every market one tick, matches resting orders and TP/SL against the new prices, and publishes the
+        kline and ticker messages
+        """
+        messages = list()
+        now = int(time.time() * 1000)
+        with self.lock:
+            for symbol, market in self.markets.items():
+                confirmed = market.step()
+                self.__match(symbol, market.price)
+                topic = f"kline.{market.interval_ms // 60_000}.{symbol}"
+                if confirmed is not None:
+                    self.stats.candles += 1
+                    messages.append((topic, {"topic": topic, "data": [market.message(confirmed, True)], "ts": now,
+                                             "type": "snapshot"}))
+                messages.append((topic, {"topic": topic, "data": [market.message(market.open, False)], "ts": now,
+                                         "type": "snapshot"}))
+                topic = f"tickers.{symbol}"
+                messages.append((topic, {"topic": topic, "data": self.__ticker(market), "ts": now,
+                                         "type": "snapshot"}))
+        for topic, message in messages:
+            self.publish(topic, message)
+
+    def publish(self, topic: str, message: Dict) -> None:
+        """
+        Sends a message to every connection subscribed to a topic. Closed connections are dropped.
+        """
+        payload = None
+        with self.connections_lock:
+            connections = [connection for connection in self.connections if topic in connection.topics]
+        for connection in connections:
+            payload = payload if payload is not None else json.dumps(message, separators=(',', ':')).encode()
+            try:
+                connection.send(payload)
+                self.stats.messages += 1
+            except OSError:
+                self.__disconnect(connection)
+
+    # -------------------- REST Endpoints -------------------- #
+
+    def get_kline(self, account: str, params: Dict) -> Dict:
+        market = self.markets.get(params.get('symbol'))
+        if market is None:
+            return _error(PARAMS_ERROR, "params error: symbol invalid")
+        start, end = params.get('start'), params.get('end')
+        with self.lock:
+            rows = market.rows(int(start) if start else None, int(end) if end else None,
+                               int(params.get('limit', 200)))
+        return _response({'category': params.get('category'), 'symbol': market.symbol, 'list': rows})
+
+    def get_tickers(self, account: str, params: Dict) -> Dict:
+        symbol = params.get('symbol')
+        if symbol is not None and symbol not in self.markets:
+            return _error(PARAMS_ERROR, "params error: symbol invalid")
+        with self.lock:
+            tickers = [self.__ticker(m) for s, m in self.markets.items() if symbol is None or s == symbol]
+        return _response({'category': params.get('category'), 'list': tickers})
+
+    def get_positions(self, account: str, params: Dict) -> Dict:
+        symbol = params.get('symbol')
+        with self.lock:
+            positions = [_position(s, p) for s, p in self.accounts[account].positions.items()
+                         if symbol is None or s == symbol]
+        return _response({'category': params.get('category'), 'list': positions})
+
+    def get_open_orders(self, account: str, params: Dict) -> Dict:
+        symbol = params.get('symbol')
+        with self.lock:
+            orders = [dict(o) for o in self.accounts[account].orders.values() if symbol is None or o['symbol'] == symbol]
+        return _response({'list': orders})
+
+    def place_order(self, account: str, params: Dict) -> Dict:
+        with self.lock:
+            code, message, order_id = self.__order(account, params)
+        if code != 0:
+            return _error(code, message)
+        return _response({'orderId': order_id, 'orderLinkId': params.get('orderLinkId', '')})
+
+    def place_batch_order(self, account: str, params: Dict) -> Dict:
+        legs, statuses = list(), list()
+        with self.lock:
+            for request in params.get('request', []):
+                code, message, order_id = self.__order(account, request)
+                legs.append({'category': params.get('category'), 'symbol': request.get('symbol'),
+                             'orderId': order_id, 'orderLinkId': request.get('orderLinkId', '')})
+                statuses.append({'code': code, 'msg': message})
+        return {**_response({'list': legs}), 'retExtInfo': {'list': statuses}}
+
+    def cancel_batch_order(self, account: str, params: Dict) -> Dict:
+        legs, statuses = list(), list()
+        with self.lock:
+            orders = self.accounts[account].orders
+            for request in params.get('request', []):
+                found = orders.pop(request.get('orderId'), None) is not None
+                legs.append({'category': params.get('category'), 'symbol': request.get('symbol'),
+                             'orderId': request.get('orderId'), 'orderLinkId': ''})
+                statuses.append({'code': 0, 'msg': 'OK'} if found else
+                                {'code': ORDER_NOT_FOUND, 'msg': 'Order does not exist.'})
+        return {**_response({'list': legs}), 'retExtInfo': {'list': statuses}}
+
+    def cancel_all_orders(self, account: str, params: Dict) -> Dict:
+        symbol = params.get('symbol')
+        with self.lock:
+            orders = self.accounts[account].orders
+            cancelled = [o for o in orders.values() if symbol is None or o['symbol'] == symbol]
+            for o in cancelled:
+                del orders[o['orderId']]
+        return _response({'list': [{'orderId': o['orderId'], 'orderLinkId': ''} for o in cancelled]})
+
+    # -------------------- Request Handling -------------------- #
+
+    def handle(self, method: str, path: str, account: str, params: Dict) -> Tuple[Dict, Dict[str, str]]:
+        """
+        Answers a REST request after the configured latency. Returns the response body, and headers.
+        """
+        name = ROUTES[(method, path)]
+        delay = self.config.latency + self.random.uniform(-self.config.jitter, self.config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        headers = dict()
+        with self.lock:
+            self.stats.requests[name] += 1
+            if self.config.rate_limit is not None:
+                bucket = self.buckets.setdefault((account, path), TokenBucket(self.config.rate_limit))
+                now = time.monotonic()
+                allowed = bucket.available(now)
+                if allowed:
+                    bucket.take()
+                reset = time.time() + bucket.delay(now)
+                headers = {
+                    'X-Bapi-Limit': str(int(self.config.rate_limit)),
+                    'X-Bapi-Limit-Status': str(max(int(bucket.tokens), 0)),
+                    'X-Bapi-Limit-Reset-Timestamp': str(int(reset * 1000)),
+                }
+                if not allowed:
+                    self.stats.throttled += 1
+                    return _error(RATE_LIMITED, "Too many visits!"), headers
+            if self.random.random() < self.config.error_rate:
+                self.stats.errors += 1
+                return _error(SERVER_ERROR, "Internal server error."), headers
+
+        return getattr(self, name)(account, params), headers
+
+    def serve_websocket(self, handler: BaseHTTPRequestHandler) -> None:
+        """
+        Completes the WebSocket handshake of a request, and answers subscriptions and pings until it is closed
+        """
+        handler.send_response(101, "Switching Protocols")
+        handler.send_header('Upgrade', 'websocket')
+        handler.send_header('Connection', 'Upgrade')
+        handler.send_header('Sec-WebSocket-Accept', websocket.accept_key(handler.headers['Sec-WebSocket-Key']))
+        handler.end_headers()
+        handler.close_connection = True
+
+        connection = _Connection(handler.connection, handler.wfile)
+        with self.connections_lock:
+            self.connections.append(connection)
+        try:
+            while not self.stopped.is_set():
+                opcode, payload = websocket.read_frame(handler.rfile)
+                if opcode == websocket.CLOSE:
+                    connection.send(payload, websocket.CLOSE)
+                    break
+                if opcode == websocket.PING:
+                    connection.send(payload, websocket.PONG)
+                elif opcode == websocket.TEXT:
+                    self.__command(connection, json.loads(payload))
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self.__disconnect(connection)
+
+    # -------------------- Private Methods -------------------- #
+
+    def __feed(self) -> None:
+        while not self.stopped.wait(self.config.tick):
+            self.step()
+
+    def __command(self, connection: _Connection, message: Dict) -> None:
+        op = message.get('op')
+        reply = {"success": True, "ret_msg": "", "conn_id": connection.id, "req_id": message.get('req_id', ''),
+                 "op": op}
+        if op == 'subscribe':
+            time.sleep(SUBSCRIBE_DELAY)
+            unknown = [t for t in message.get('args', []) if t.split('.')[-1] not in self.markets]
+            if unknown:
+                reply.update(success=False, ret_msg=f"Invalid topics: {unknown}")
+            else:
+                connection.topics.update(message.get('args', []))
+        elif op == 'unsubscribe':
+            connection.topics.difference_update(message.get('args', []))
+        elif op == 'ping':
+            reply['ret_msg'] = 'pong'
+        connection.send(json.dumps(reply).encode())
+
+    def __disconnect(self, connection: _Connection) -> None:
+        with self.connections_lock:
+            if connection in self.connections:
+                self.connections.remove(connection)
+
+    def __order(self, account: str, params: Dict) -> Tuple[int, str, str]:
+        # Validates and matches an order. Returns (retCode, retMsg, order ID).
+        symbol, side, order_type = params.get('symbol'), params.get('side'), params.get('orderType')
+        if symbol not in self.markets:
+            return PARAMS_ERROR, "params error: symbol invalid", ''
+        if side not in ('Buy', 'Sell'):
+            return PARAMS_ERROR, f"params error: side invalid: {side}", ''
+        try:
+            qty = float(params.get('qty', 0))
+            price = float(params['price']) if order_type == 'Limit' else self.markets[symbol].price
+        except (KeyError, TypeError, ValueError):
+            return PARAMS_ERROR, "params error: qty or price invalid", ''
+        if qty <= 0 or order_type not in ('Market', 'Limit'):
+            return PARAMS_ERROR, "params error: qty or orderType invalid", ''
+
+        account_state = self.accounts[account]
+        reduce_only = str(params.get('reduceOnly', False)).lower() == 'true'
+        if reduce_only and _signed(account_state.positions.get(symbol)) * (1 if side == 'Buy' else -1) >= 0:
+            return REDUCE_ONLY_REJECTED, "Reduce-only order has same side with current position", ''
+
+        order_id = str(uuid.uuid4())
+        self.stats.orders += 1
+        order = {
+            'symbol': symbol, 'orderId': order_id, 'side': side, 'orderType': order_type, 'qty': repr(qty),
+            'price': repr(price), 'orderStatus': 'New', 'reduceOnly': reduce_only,
+            # Only the V5 field names are read. Other names (e.g. take_profit) are ignored, as by ByBit.
+            'takeProfit': str(params.get('takeProfit') or ''),
+            'stopLoss': str(params.get('stopLoss') or ''),
+        }
+        market_price = self.markets[symbol].price
+        crossed = price >= market_price if side == 'Buy' else price <= market_price
+        if order_type == 'Market' or crossed:
+            self.__fill(account_state, order, price if order_type == 'Limit' else market_price)
+        else:
+            account_state.orders[order_id] = order
+        return 0, "OK", order_id
+
+    def __fill(self, account: _Account, order: Dict, price: float) -> None:
+        # Nets a fill into the position of the order's symbol
+        symbol = order['symbol']
+        position = account.positions.get(symbol)
+        current = _signed(position)
+        qty = float(order['qty']) * (1 if order['side'] == 'Buy' else -1)
+        if order['reduceOnly']:
+            # Reduce-only fills are capped at the position size
+            qty = max(qty, -current) if current > 0 else min(qty, -current)
+        new = round(current + qty, 10)
+        self.stats.fills += 1
+
+        if new == 0:
+            account.positions.pop(symbol, None)
+        elif current == 0 or (new > 0) != (current > 0):
+            # Opened, or flipped
+            account.positions[symbol] = {'side': 'Buy' if new > 0 else 'Sell', 'size': abs(new), 'avgPrice': price,
+                                         'takeProfit': order['takeProfit'], 'stopLoss': order['stopLoss']}
+        elif abs(new) > abs(current):
+            position['avgPrice'] = (position['avgPrice'] * abs(current) + price * abs(qty)) / abs(new)
+            position['size'] = abs(new)
+        else:
+            position['size'] = abs(new)
+
+    def __match(self, symbol: str, price: float) -> None:
+        # Fills crossed resting orders, and closes positions whose TP or SL is crossed
+        for account in self.accounts.values():
+            crossed = [o for o in account.orders.values() if o['symbol'] == symbol and
+                       (price <= float(o['price']) if o['side'] == 'Buy' else price >= float(o['price']))]
+            for order in crossed:
+                del account.orders[order['orderId']]
+                self.__fill(account, order, float(order['price']))
+
+            position = account.positions.get(symbol)
+            if position is None:
+                continue
+            long = position['side'] == 'Buy'
+            tp, sl = _price(position['takeProfit']), _price(position['stopLoss'])
+            hit_tp = tp is not None and (price >= tp if long else price <= tp)
+            hit_sl = sl is not None and (price <= sl if long else price >= sl)
+            if hit_tp or hit_sl:
+                close = {'symbol': symbol, 'side': 'Sell' if long else 'Buy', 'qty': repr(position['size']),
+                         'reduceOnly': True}
+                self.__fill(account, close, price)
+
+    @staticmethod
+    def __ticker(market: _Market) -> Dict[str, str]:
+        price = market.price
+        return {'symbol': market.symbol, 'lastPrice': repr(price), 'markPrice': repr(price),
+                'bid1Price': repr(round(price * 0.9999, 4)), 'ask1Price': repr(round(price * 1.0001, 4))}
+
+
+class MockWebSocket(WebSocket):
+    """
+    pybit WebSocket connected to a mock exchange, instead of ByBit. Reconnects use the same URL.
+
+    Example:
+        ws = MockWebSocket(exchange.ws_url('linear'), channel_type='linear')
+        dispatcher = Dispatcher(channel='linear', websocket=ws)
+    """
+
+    def __init__(self, url: str, channel_type: str = c.CHANNEL, **kwargs):
+        self.mock_url = url
+        super().__init__(testnet=False, channel_type=channel_type, **kwargs)
+
+    def _connect(self, url):
+        super()._connect(self.mock_url)
+
+    def exit(self):
+        # websocket-client closes its socket without waking the thread reading it, which then holds this connection
+        # (and the callbacks' owners) for up to `ping_timeout` seconds. Shutting down reads first ends it now.
+        sock = getattr(getattr(getattr(self, 'ws', None), 'sock', None), 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        super().exit()
+
+
+# -------------------- Private Functions -------------------- #
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive connections, as with ByBit
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.headers.get('Upgrade', '').lower() == 'websocket':
+            self.server.exchange.serve_websocket(self)
+            return
+        url = urlsplit(self.path)
+        self.__answer('GET', url.path, dict(parse_qsl(url.query)))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length > 0 else b''
+        try:
+            params = json.loads(body) if body else dict()
+        except ValueError:
+            params = dict()
+        self.__answer('POST', urlsplit(self.path).path, params)
+
+    def log_message(self, format, *args):
+        # Requests are not logged
+        pass
+
+    def __answer(self, method: str, path: str, params: Dict) -> None:
+        if (method, path) not in ROUTES:
+            self.send_error(404)
+            return
+        response, headers = self.server.exchange.handle(method, path, self.headers.get('X-BAPI-API-KEY', ''), params)
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _response(result: Dict) -> Dict:
+    return {'retCode': 0, 'retMsg': 'OK', 'result': result, 'retExtInfo': {}, 'time': int(time.time() * 1000)}
+
+
+def _error(code: int, message: str) -> Dict:
+    return {'retCode': code, 'retMsg': message, 'result': {}, 'retExtInfo': {}, 'time': int(time.time() * 1000)}
+
+
+def _signed(position: Optional[Dict]) -> float:
+    # Signed size of a position. Positive if long.
+    if position is None:
+        return 0.0
+    return position['size'] if position['side'] == 'Buy' else -position['size']
+
+
+def _price(value: str) -> Optional[float]:
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if price > 0 else None
+
+
+def _position(symbol: str, p: Dict) -> Dict:
+    return {'symbol': symbol, 'side': p['side'], 'size': repr(p['size']), 'avgPrice': repr(p['avgPrice']),
+            'takeProfit': p['takeProfit'], 'stopLoss': p['stopLoss'], 'positionIdx': 0}
@@ -0,0 +1,206 @@
+"""
+Load scenario of the whole trading loop against a mock exchange: N strategies on each of M symbols, on one Dispatcher
+connection, with shared REST sessions and ticker streams, as in a live process.
+
+Each strategy seeds its candle window from the mock's history, then stages every confirmed candle, and sends its
+orders to the mock. The report holds the end-to-end throughput (candles staged, orders sent per second), and the
+latency of the tick-to-trade path. See `telemetry.latency` for the phases.
+
+Usage:
+    python -m mock_exchange.scenario --strategy demo_strategy --strategies 2 --symbols 10 --duration 30
+    python -m mock_exchange.scenario --strategy ma_cross --latency 0.01 --jitter 0.005 --error-rate 0.01
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from configs.trade_cfg import TradeConfig
+from constants import constants as c
+from engine.dispatcher import Dispatcher
+from engine.workers import WorkerPool
+from generic import generic
+from market_data.store import CandleStore
+from market_data.tickers import TickerCache
+from session.bybit_session import get_session
+from telemetry import latency
+from templates.intervals import Timeframes
+from .exchange import ExchangeConfig, ExchangeStats, MockExchange, MockWebSocket
+
+_log = logging.getLogger(__name__)
+
+# Phases in the report
+PHASES = ['ws_receive', 'queue', 'fetch', 'signal', 'place_order', 'stage', 'tick_to_trade']
+
+
+@dataclass
+class ScenarioReport:
+    """
+    Holds the result of a load scenario
+
+    Parameters
+    ----------
+        candles: Dict[str, int]
+            Queue counters, summed over every strategy. See `StrategyQueue.stats()`.
+
+        latencies: Dict[str, Dict[str, float]]
+            Latency summary (us) by phase, over every strategy
+    """
+    strategies: int
+    symbols: int
+    elapsed: float
+    startup: float
+    candles: Dict[str, int] = field(default_factory=dict)
+    exchange: ExchangeStats = field(default_factory=ExchangeStats)
+    latencies: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    @property
+    def candle_rate(self) -> float:
+        # Candles staged per second
+        return self.candles.get('processed', 0) / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def order_rate(self) -> float:
+        # Orders accepted by the exchange per second
+        return self.exchange.orders / self.elapsed if self.elapsed > 0 else 0.0
+
+    def lines(self) -> List[str]:
+        lines = [
+            f"Strategies: {self.strategies} Symbols: {self.symbols} Startup: {self.startup:.2f}s "
+            f"Elapsed: {self.elapsed:.2f}s",
+            f"Candles: {self.candles} ({self.candle_rate:.1f}/s)",
+            f"Orders: {self.exchange.orders} ({self.order_rate:.1f}/s) Fills: {self.exchange.fills} "
+            f"Requests: {sum(self.exchange.requests.values())} Errors: {self.exchange.errors} "
+            f"Throttled: {self.exchange.throttled}",
+        ]
+        for phase, summary in self.latencies.items():
+            lines.append(f"{phase:<14} count: {summary['count']:>7} p50: {summary['p50']:>8}us "
+                         f"p99: {summary['p99']:>8}us max: {summary['max']:>8}us")
+        return lines
+
+
+def symbols(count: int) -> List[str]:
+    """
+    Returns `count` symbols of the mock exchange. Example: SYM000USDT
+    """
+    return [f"SYM{i:03d}USDT" for i in range(count)]
+
+
+def run(
+        strategy: type,
+        strategy_config: Dict,
+        strategies: int = 1,
+        symbol_count: int = 1,
+        duration: float = 10.0,
+        config: Optional[ExchangeConfig] = None,
+        channel: str = c.CHANNEL,
+        workers: int = c.STRATEGY_WORKERS) -> ScenarioReport:
+    """
+    Runs `strategies` instances of a strategy on each of `symbol_count` symbols against a mock exchange, for
+    `duration` seconds.
+
+    Parameters
+    ----------
+        strategy: type
+            Strategy class. See `strategies.registry.load_strategy()`.
+
+        strategy_config: dict
+            Strategy configuration of every instance
+
+        config: ExchangeConfig
+            Market, latency and failure settings. Its symbols are replaced.
+
+        workers: int
+            Worker threads running the strategies
+    """
+    config = config if config is not None else ExchangeConfig()
+    config.symbols = symbols(symbol_count)
+    latency.reset()
+    latency.enable()
+
+    exchange = MockExchange(config)
+    exchange.start()
+    ws = MockWebSocket(exchange.ws_url(channel), channel_type=channel)
+    session = get_session(api_key='loadtest', api_secret='loadtest', demo=False, endpoint=exchange.url)
+    tickers = TickerCache(channel, websocket=ws)
+    dispatcher = Dispatcher(channel=channel, websocket=ws, pool=WorkerPool(workers))
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        for symbol in config.symbols:
+            trade_config = TradeConfig(symbol=symbol, interval=config.interval, channel=channel)
+            # Strategies of a symbol share its store, as with `get_store()`
+            store = CandleStore(symbol, channel, config.interval, directory=directory)
+            for _ in range(strategies):
+                instance = strategy(config=trade_config, strategy_config=dict(strategy_config))
+                instance.attach_session(session, store)
+                instance.attach_tickers(tickers)
+                dispatcher.add_strategy(instance)
+        startup = time.perf_counter() - start
+        _log.info(f"Started {len(dispatcher.queues)} strategies in {startup:.2f}s")
+
+        # Phases of the warm-up are not reported
+        latency.reset()
+        start = time.perf_counter()
+        dispatcher.run()
+        time.sleep(duration)
+        dispatcher.terminate()
+        elapsed = time.perf_counter() - start
+        exchange.stop()
+
+    candles: Dict[str, int] = dict()
+    for strategy_queue in dispatcher.queues:
+        for key, value in strategy_queue.stats().items():
+            candles[key] = candles.get(key, 0) + value
+
+    report = ScenarioReport(strategies=len(dispatcher.queues), symbols=symbol_count, elapsed=elapsed,
+                            startup=startup, candles=candles, exchange=exchange.stats)
+    report.latencies = {phase: latency.phase_summary(phase) for phase in PHASES}
+
+    # Releases the strategies. Exiting pybit threads can hold the connection, and its callbacks, a little longer.
+    dispatcher.routes.clear()
+    return report
+
+
+def main(args: Optional[List[str]] = None) -> ScenarioReport:
+    from strategies.registry import load_strategy
+
+    parser = argparse.ArgumentParser(description="Runs strategies against a mock exchange, and reports throughput "
+                                                 "and latency")
+    parser.add_argument("--strategy", default="demo_strategy", help="Strategy key in strategies.ini")
+    parser.add_argument("--cfg", default="default.ini", help="Config file in strategies/<strategy>/cfg, if present")
+    parser.add_argument("--strategies", type=int, default=1, help="Strategies per symbol")
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--interval", default=Timeframes.MIN_1.name,
+                        choices=[t.name for t in Timeframes if isinstance(t.value, int)])
+    parser.add_argument("--tick", type=float, default=0.1, help="Seconds between price updates")
+    parser.add_argument("--ticks-per-candle", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Response delay (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximum response delay deviation (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of failed requests")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second per endpoint")
+    parser.add_argument("--workers", type=int, default=c.STRATEGY_WORKERS)
+    options = parser.parse_args(args)
+
+    logging.basicConfig(format="%(asctime)s: %(message)s", level=logging.INFO, datefmt="%H:%M:%S")
+
+    cfg_path = os.path.join(c.STRATEGIES_DIRECTORY, options.strategy, c.CONFIG_FOLDER, options.cfg)
+    strategy_config = generic.cfg_as_dict(cfg_path) if os.path.isfile(cfg_path) else dict()
+    config = ExchangeConfig(interval=Timeframes[options.interval], tick=options.tick,
+                            ticks_per_candle=options.ticks_per_candle, latency=options.latency,
+                            jitter=options.jitter, error_rate=options.error_rate, rate_limit=options.rate_limit)
+
+    report = run(load_strategy(options.strategy), strategy_config, options.strategies, options.symbols,
+                 options.duration, config, workers=options.workers)
+    for line in report.lines():
+        _log.info(line)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+This module contains the server side of the WebSocket protocol (RFC 6455) used by the mock exchange: the opening
+handshake, and reading and writing single-frame messages.
+
+Only what pybit and websocket-client send is supported: unfragmented text, ping, pong and close frames.
+"""
+
+import base64
+import hashlib
+import struct
+from typing import BinaryIO, Tuple
+
+# Appended to the client key of the handshake. See RFC 6455, section 1.3.
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+TEXT = 0x1
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+
+
+def accept_key(key: str) -> str:
+    """
+    Returns the Sec-WebSocket-Accept value of a client Sec-WebSocket-Key
+    """
+    return base64.b64encode(hashlib.sha1((key + GUID).encode()).digest()).decode()
+
+
+def read_frame(rfile: BinaryIO) -> Tuple[int, bytes]:
+    """
+    Reads a frame, and returns its opcode and unmasked payload. Raises ConnectionError if the connection is closed.
+    """
+    header = rfile.read(2)
+    if len(header) < 2:
+        raise ConnectionError("WebSocket closed")
+    opcode = header[0] & 0x0F
+    masked = header[1] & 0x80
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', rfile.read(8))[0]
+    mask = rfile.read(4) if masked else b''
+    payload = rfile.read(length)
+    if len(payload) < length:
+        raise ConnectionError("WebSocket closed")
+    if masked:
+        # XOR of the payload with the repeated mask, as one integer operation
+        repeated = (mask * (length // 4 + 1))[:length]
+        payload = (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(length, 'big')
+    return opcode, payload
+
+
+def frame(payload: bytes, opcode: int = TEXT) -> bytes:
+    """
+    Returns an unmasked, final frame. Frames sent by a server are not masked.
+    """
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('>BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('>BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('>BBQ', 0x80 | opcode, 127, length)
+    return header + payload
@@ -4,10 +4,18 @@ import logging
 from typing import Tuple, Any, Dict, Optional
 import sys
 import os
+import time
 
 from configs.trade_cfg import TradeConfig
 from templates.candles import Candles
+from market_data.window import CandleWindow
+from market_data.tickers import get_ticker_cache
+from engine.dispatcher import record_receive
+from engine.replay import StreamRecorder
+from engine.workers import StrategyQueue, WorkerPool
+from telemetry import latency, metrics
 from generic import generic
+from strategies.registry import load_strategy
 from constants import constants as c
 
 
@@ -20,15 +28,38 @@ class TradeMain:
     Triggers candle interval events. 
 
     Equivalent of MQL OnTick() function. 
+
+    Candle events run off the WebSocket thread, on a worker pool (see `engine.workers`), so a slow stage does not
+    delay ping/pong or later messages.
     """
 
-    def __init__(self, config: TradeConfig, callback):
+    def __init__(
+            self,
+            config: TradeConfig,
+            callback,
+            window: Optional[CandleWindow] = None,
+            pool: Optional[WorkerPool] = None,
+            name: Optional[str] = None,
+            websocket: Any = None,
+            recorder: Optional[StreamRecorder] = None):
 
         # -------------------- Initializing member variables -------------------- #  
         self.config = config 
-        self.ws = WebSocket(testnet=True, channel_type=config.channel)
+        # An existing connection is used if given. Replays (see `engine.replay`) do not connect.
+        if websocket is None:
+            websocket = WebSocket(testnet=True, channel_type=config.channel)
+        self.ws = metrics.count_reconnects(websocket, config.channel)
         self.callback = callback
         self.running = False
+        # Rolling candle window, appended to on every confirmed candle
+        self.window = window
+        # Confirmed candles are queued here, and staged on a worker thread
+        self.pool = pool if pool is not None else WorkerPool(workers=1)
+        # Strategy name, used in logs and latency spans
+        self.name = name if name is not None else config.symbol
+        self.queue = StrategyQueue(self.name, self.on_new_candle, self.pool, window=window, symbol=config.symbol)
+        # Appends every received message to a recording file, if set
+        self.recorder = recorder
 
     def handler(self, contents: Dict) -> None:
         """
@@ -41,12 +72,20 @@ class TradeMain:
             contents: dict 
                 Received JSON contents from bybit
         """
-        data = contents['data'][0]
-        candles = Candles(self.config.symbol, **data)
-
-        if candles.confirm and self.running:
-            # New candle event handler 
-            self.on_new_candle(candles)
+        received = latency.clock()
+        if self.recorder is not None:
+            self.recorder.record(contents)
+        if not self.running:
+            return
+        # Open candles are skipped before a Candles object is constructed
+        candles = Candles.from_kline(self.config.symbol, contents['data'][0], received)
+        if candles is None:
+            return
+
+        if received:
+            record_receive(self.config.symbol, contents, received)
+        # Queues the new candle event. The window is appended to on the worker, before the strategy reads it.
+        self.queue.submit(candles)
 
     def on_new_candle(self, candle: Candles) -> None:
         """
@@ -104,7 +143,16 @@ class TradeMain:
         # Kill the thread first before calling exit. Reversing the order throws an exception
         self.ws.timer.join()
         self.ws.exit()
-        logging.info("Connection Ended.")
+
+        # Waits for a running stage (e.g. an order being sent) to finish
+        self.pool.shutdown(wait=True)
+        logging.info(f"Connection Ended. Candles: {self.queue.stats()}")
+
+        if self.recorder is not None:
+            self.recorder.close()
+
+        # Writes the latency histograms, if spans were recorded
+        latency.dump()
 
 
 class Root:
@@ -211,20 +259,15 @@ class Root:
 
     def load_module(self, key: str = None) -> Any:
         """
-        Loads a strategy given a strategy key. Refer to strategies.ini for keys. 
+        Loads a strategy given a strategy key. Refer to strategies.ini for keys. Only the selected strategy module
+        is imported. See `strategies.registry`.
 
         Parameters
         ----------
             key:str = None 
                 Contains the strategy key specified in strategies.ini
         """ 
-        module = generic.load_module(
-            target_module="strategies",
-            filename=key,
-            class_name=self.strategies_kv[key]
-        )
-        
-        return module 
+        return load_strategy(key)
     
     def get_config_dict(self, directory: str) -> Optional[Dict]:
         """
@@ -249,6 +292,9 @@ def main():
     # ----- Initialization ----- # 
     logging_format = "%(asctime)s: %(message)s"
     logging.basicConfig(format=logging_format, level=logging.INFO, datefmt="%H:%M:%S")
+    # Stage and REST durations are served on the metrics endpoint from the latency histograms
+    server = metrics.start_server() if c.METRICS_ENABLED else None
+    latency.enable(c.LATENCY_ENABLED or server is not None)
     print()
     print(" ==========================================  ")
     print(" ======= Launching ByBit-Algotrader ======= ")
@@ -265,7 +311,7 @@ def main():
     try: 
         module = root.load_module(strategy_key)
     except AttributeError: 
-        print(f"Module {strategy_key} not found. Make sure to add the strategy in the __init__.py file.")
+        print(f"Module {strategy_key} not found. Make sure the class name in strategies.ini is correct.")
         return main()
     # ----- Sets Strategy Configuration ----- # 
     config_dict = root.get_config_dict(directory)
@@ -279,11 +325,9 @@ def main():
         strategy_config=config_dict
     )
 
-    # ----- Creates instance of trade object ----- # 
-    trade_main = TradeMain(
-        config=trade_config,
-        callback=strategy.stage        
-    )
+    # ----- Seeds the rolling candle window from the candle store ----- #
+    window = CandleWindow(c.CANDLE_WINDOW_CAPACITY)
+    strategy.attach_window(window)
 
     # Check for presence of backtest function 
     try: 
@@ -292,12 +336,39 @@ def main():
         print(f"Error. Backtest Function does not exist for: {strategy.name}")
         return main()
 
+    def execute() -> TradeMain:
+        """
+        Connects the live streams, and runs the trade loop. Backtests do not connect.
+        """
+        # ----- Streams mark prices for orders ----- #
+        strategy.attach_tickers(get_ticker_cache(trade_config.channel))
+
+        # ----- Tracks positions and orders from the private stream ----- #
+        strategy.attach_account()
+
+        # ----- Records the kline stream, to be replayed with `python -m engine.replay` ----- #
+        recorder = None
+        if c.RECORD_STREAMS:
+            recorder = StreamRecorder(
+                os.path.join(c.RECORDINGS_DIRECTORY, f"{trade_config.symbol}_{int(time.time())}.rec"))
+
+        # ----- Creates instance of trade object ----- # 
+        trade = TradeMain(
+            config=trade_config,
+            callback=strategy.stage,
+            window=window,
+            name=strategy.name,
+            recorder=recorder
+        )
+        trade.run()
+        return trade
+
     # ----- Runs trading operations ----- # 
     while True:
         print()
         options = {
             "Exit": sys.exit,
-            "Execute": trade_main.run,
+            "Execute": execute,
             "Backtest": strategy.backtest,
         }
         for i, j in enumerate(options.keys()):
@@ -309,9 +380,10 @@ def main():
             key = list(options.keys())[index]
 
             # Run Function
-            options[key]() 
             if key == "Execute":
+                trade_main = execute()
                 break
+            options[key]() 
         except ValueError: 
             print("Invalid selection. Use index.")
 
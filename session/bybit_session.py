@@ -1 +1,147 @@
+"""
+This module contains the shared ByBit HTTP sessions of the process.
 
+Every `HTTP` session holds its own `requests` connection pool. Strategies trading the same account share one session
+from `get_session()`, so warm keep-alive connections (TLS handshake done) serve every strategy's order path, instead
+of each strategy opening its own pool. Requests of every session are paced by the shared Scheduler, see
+`session.scheduler`.
+
+Example:
+    session = get_session(api_key, api_secret, demo=True)
+    stats = session_stats()
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from pybit.unified_trading import HTTP
+from requests.adapters import HTTPAdapter
+
+from constants import constants as c
+from .scheduler import ScheduledSession, get_scheduler
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionStats:
+    """
+    Holds connection reuse counts of the shared sessions
+
+    Parameters
+    ----------
+        connections: int
+            Connections opened (each with a TCP/TLS handshake)
+
+        requests: int
+            Requests sent over the opened connections
+    """
+    sessions: int = 0
+    connections: int = 0
+    requests: int = 0
+
+    @property
+    def reuse(self) -> float:
+        """
+        Returns the fraction of requests sent over an already open connection
+        """
+        if self.requests == 0:
+            return 0.0
+        return max(0.0, 1 - self.connections / self.requests)
+
+
+def mount_pool(session: Any, pool_size: int = c.HTTP_POOL_SIZE) -> HTTPAdapter:
+    """
+    Replaces the connection pool of a session with a keep-alive pool of `pool_size` connections per host.
+
+    Parameters
+    ----------
+        session: HTTP
+            ByBit HTTP session
+
+        pool_size: int
+            Maximum number of open connections per host. Should be at least the number of concurrent REST calls
+            (see ORDER_WORKERS), otherwise connections are closed after use and reopened.
+    """
+    if pool_size <= 0:
+        raise ValueError(f"Invalid pool size. Value must be greater than 0. Input: {pool_size}")
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.client.mount("https://", adapter)
+    session.client.mount("http://", adapter)
+    return adapter
+
+
+# Sessions by (api key, api secret, demo, testnet, endpoint)
+_sessions: Dict[Tuple[Optional[str], Optional[str], bool, bool, Optional[str]], ScheduledSession] = dict()
+_sessions_lock = threading.Lock()
+
+
+def get_session(
+        api_key: Optional[str] = None,
+        api_secret: Optional[str] = None,
+        demo: bool = True,
+        testnet: bool = False,
+        pool_size: int = c.HTTP_POOL_SIZE,
+        endpoint: Optional[str] = None) -> ScheduledSession:
+    """
+    Returns the shared HTTP session of an account, creating it on first use. Requests are sent through the shared
+    Scheduler.
+
+    Parameters
+    ----------
+        api_key, api_secret: str
+            Account credentials. Public endpoints only if None.
+
+        demo: bool
+            Connects to demo trading
+
+        testnet: bool
+            Connects to the testnet
+
+        pool_size: int
+            Maximum number of open connections. Only used when the session is created.
+
+        endpoint: str
+            Base URL replacing the ByBit endpoint. Example: http://127.0.0.1:8001 (see `mock_exchange`)
+    """
+    key = (api_key, api_secret, demo, testnet, endpoint)
+    with _sessions_lock:
+        if key not in _sessions:
+            session = HTTP(testnet=testnet, api_key=api_key, api_secret=api_secret, demo=demo)
+            if endpoint is not None:
+                session.endpoint = endpoint
+            mount_pool(session, pool_size)
+            _sessions[key] = ScheduledSession(session, get_scheduler(), account=api_key)
+            _log.info(f"HTTP session created. Endpoint: {session.endpoint} Pool Size: {pool_size}")
+        return _sessions[key]
+
+
+def session_stats() -> SessionStats:
+    """
+    Returns the connection reuse counts of every shared session
+    """
+    stats = SessionStats()
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    stats.sessions = len(sessions)
+    for session in sessions:
+        adapter = session.client.get_adapter("https://")
+        for key in adapter.poolmanager.pools.keys():
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            stats.connections += pool.num_connections
+            stats.requests += pool.num_requests
+    return stats
+
+
+def close_sessions() -> None:
+    """
+    Closes the connections of every shared session, and empties the registry
+    """
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.client.close()
+        _sessions.clear()
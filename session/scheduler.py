@@ -0,0 +1,384 @@
+"""
+This module contains the request scheduler, which paces REST calls within ByBit's rate limits.
+
+ByBit limits requests per account (UID) and endpoint, and per IP. Each (account, endpoint class) has a token bucket,
+and every request also takes a token from the IP bucket. The sessions of every account share one scheduler, see
+`get_scheduler()`.
+
+Requests wait for tokens in priority lanes: orders are granted before position/account reads, which are granted
+before market data, so a burst of data fetches cannot delay an order.
+
+Buckets are corrected from the rate limit headers of each response:
+    X-Bapi-Limit                    - limit of the endpoint (requests per second)
+    X-Bapi-Limit-Status             - requests remaining in the current window
+    X-Bapi-Limit-Reset-Timestamp    - end of the current window (ms)
+
+Example:
+    session = ScheduledSession(HTTP(...), get_scheduler(), account=api_key)
+    session.place_order(...)        # waits in the order lane
+    stats = session.scheduler.stats()
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from constants import constants as c
+from telemetry import latency, metrics
+
+_log = logging.getLogger(__name__)
+
+# Endpoint class of each HTTP method. Methods not listed are in the 'default' class.
+ENDPOINT_CLASSES = {
+    'place_order': 'order',
+    'amend_order': 'order',
+    'cancel_order': 'order',
+    'cancel_all_orders': 'order',
+    'place_batch_order': 'batch',
+    'amend_batch_order': 'batch',
+    'cancel_batch_order': 'batch',
+    'get_positions': 'position',
+    'set_leverage': 'position',
+    'set_trading_stop': 'position',
+    'get_open_orders': 'order_query',
+    'get_order_history': 'order_query',
+    'get_executions': 'order_query',
+    'get_wallet_balance': 'account',
+    'get_kline': 'market',
+    'get_tickers': 'market',
+    'get_orderbook': 'market',
+    'get_instruments_info': 'market',
+}
+
+# Lanes by endpoint class. Lower values are granted first.
+PRIORITIES = {'order': 0, 'batch': 0, 'position': 1, 'order_query': 1, 'account': 1, 'default': 1, 'market': 2}
+LANES = {0: 'order', 1: 'account', 2: 'market'}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens per second, up to `capacity` tokens
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"Invalid rate. Value must be greater than 0. Input: {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else float(rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # Set when the exchange reports no requests remaining. No tokens are added until then.
+        self.blocked_until = 0.0
+
+    def refill(self, now: float) -> None:
+        if now < self.blocked_until:
+            self.updated = now
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - max(self.updated, self.blocked_until)) * self.rate)
+        self.updated = now
+
+    def available(self, now: float) -> bool:
+        self.refill(now)
+        return self.tokens >= 1
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def delay(self, now: float) -> float:
+        """
+        Returns the seconds until a token is available
+        """
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return max(self.blocked_until - now, 0.0) + (1 - self.tokens) / self.rate
+
+    def update(self, limit: Optional[int], remaining: Optional[int], reset: Optional[float], now: float) -> None:
+        """
+        Corrects the bucket from the rate limit headers of a response
+
+        Parameters
+        ----------
+            limit: int
+                Requests per second allowed by the exchange
+
+            remaining: int
+                Requests remaining in the current window
+
+            reset: float
+                Monotonic time of the end of the current window
+        """
+        self.refill(now)
+        if limit is not None and limit > 0:
+            self.rate = self.capacity = float(limit)
+        if remaining is not None:
+            # Requests in flight are not counted by the response yet, so the bucket is only ever lowered
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining <= 0 and reset is not None and reset > now:
+                self.blocked_until = reset
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    bucket: Tuple[Optional[str], str] = field(compare=False)
+    enqueued: float = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+
+
+@dataclass
+class LaneStats:
+    """
+    Holds request counts and wait times (ms) of a priority lane
+    """
+    depth: int = 0
+    max_depth: int = 0
+    requests: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests > 0 else 0.0
+
+
+class Scheduler:
+    """
+    Grants REST requests within the rate limits, by priority. See module docstring.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, float]] = None, ip_limit: float = c.IP_RATE_LIMIT):
+        """
+        Parameters
+        ----------
+            limits: Dict[str, float]
+                Requests per second of an account, by endpoint class. Defaults to RATE_LIMITS.
+
+            ip_limit: float
+                Requests per second of all endpoint classes
+        """
+        self.limits = limits if limits is not None else c.RATE_LIMITS
+        # (account, endpoint class) -> bucket
+        self.buckets: Dict[Tuple[Optional[str], str], TokenBucket] = dict()
+        self.ip = TokenBucket(ip_limit)
+        self.waiters: List[_Waiter] = list()
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.lanes: Dict[str, LaneStats] = {lane: LaneStats() for lane in LANES.values()}
+        # Responses reporting no requests remaining
+        self.throttled = 0
+        # Bucket of the request sent by the current thread. Read by the response hook.
+        self.local = threading.local()
+
+    def bucket(self, account: Optional[str], endpoint_class: str) -> TokenBucket:
+        key = (account, endpoint_class)
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(self.limits.get(endpoint_class, self.limits['default']))
+        return self.buckets[key]
+
+    def acquire(self, endpoint_class: str, account: Optional[str] = None) -> float:
+        """
+        Blocks until a request of an endpoint class may be sent. Returns the wait time (ms).
+
+        Parameters
+        ----------
+            endpoint_class: str
+                Endpoint class of the request. See ENDPOINT_CLASSES.
+
+            account: str
+                Account of the request (e.g. api key). Accounts have separate endpoint buckets.
+        """
+        priority = PRIORITIES.get(endpoint_class, PRIORITIES['default'])
+        lane = self.lanes[LANES[priority]]
+        with self.condition:
+            self.bucket(account, endpoint_class)
+            waiter = _Waiter(priority, next(self.sequence), (account, endpoint_class), time.monotonic())
+            heapq.heappush(self.waiters, waiter)
+            lane.depth += 1
+            lane.max_depth = max(lane.max_depth, lane.depth)
+
+            while not waiter.granted:
+                timeout = self.__grant(time.monotonic())
+                if waiter.granted:
+                    break
+                self.condition.wait(timeout)
+
+            wait = (time.monotonic() - waiter.enqueued) * 1000
+            lane.depth -= 1
+            lane.requests += 1
+            lane.total_wait += wait
+            lane.max_wait = max(lane.max_wait, wait)
+        self.local.bucket = (account, endpoint_class)
+        return wait
+
+    def call(self, endpoint_class: str, account: Optional[str], function: Callable, *args, **kwargs) -> Any:
+        """
+        Sends a request once granted
+        """
+        self.acquire(endpoint_class, account)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.local.bucket = None
+
+    def on_response(self, response: Any, *args, **kwargs) -> Any:
+        """
+        Response hook of the HTTP client. Corrects the bucket of the request from the rate limit headers.
+        """
+        key = getattr(self.local, 'bucket', None)
+        if key is None:
+            return response
+        headers = response.headers
+        limit = _header(headers, 'X-Bapi-Limit')
+        remaining = _header(headers, 'X-Bapi-Limit-Status')
+        reset = _header(headers, 'X-Bapi-Limit-Reset-Timestamp')
+        if limit is None and remaining is None:
+            return response
+
+        with self.condition:
+            now = time.monotonic()
+            # Converts the exchange reset time to monotonic time
+            reset_at = now + max(reset / 1000 - time.time(), 0.0) if reset is not None else None
+            self.bucket(*key).update(limit, remaining, reset_at, now)
+            if remaining is not None and remaining <= 0:
+                self.throttled += 1
+                _log.warning(f"Rate limit reached. Endpoint class: {key[1]} Limit: {limit}")
+            self.condition.notify_all()
+        return response
+
+    def metrics(self) -> List[metrics.Sample]:
+        """
+        Returns the queue depth and total wait of each lane as metric samples
+        """
+        with self.condition:
+            samples = list()
+            for name, s in self.lanes.items():
+                labels = {'lane': name}
+                samples.append(metrics.Sample('bybit_scheduler_queue_depth', labels, s.depth))
+                samples.append(metrics.Sample('bybit_scheduler_wait_seconds_total', labels, s.total_wait / 1000))
+            return samples
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the queue depth and wait times (ms) of each lane
+        """
+        with self.condition:
+            return {
+                name: {'depth': s.depth, 'max_depth': s.max_depth, 'requests': s.requests,
+                       'mean_wait': s.mean_wait, 'max_wait': s.max_wait}
+                for name, s in self.lanes.items()
+            }
+
+    # -------------------- Private Methods -------------------- #
+
+    def __grant(self, now: float) -> float:
+        """
+        Grants waiting requests in priority order. Returns the seconds until the next token. Must hold the condition.
+
+        A request waiting on its own endpoint bucket does not block requests of other endpoints. A request waiting on
+        the IP bucket blocks every later request, so lower lanes cannot take the IP tokens of higher lanes.
+        """
+        delay = None
+        granted = False
+        for waiter in sorted(self.waiters):
+            bucket = self.buckets[waiter.bucket]
+            if not bucket.available(now):
+                delay = bucket.delay(now) if delay is None else min(delay, bucket.delay(now))
+                continue
+            if not self.ip.available(now):
+                delay = self.ip.delay(now) if delay is None else min(delay, self.ip.delay(now))
+                break
+            bucket.take()
+            self.ip.take()
+            waiter.granted = True
+            granted = True
+
+        if granted:
+            self.waiters = [w for w in self.waiters if not w.granted]
+            heapq.heapify(self.waiters)
+            self.condition.notify_all()
+        return delay if delay is not None else 0.0
+
+
+class ScheduledSession:
+    """
+    ByBit HTTP session whose requests are sent through a Scheduler. Attributes other than public methods are read
+    from the wrapped session.
+    """
+
+    def __init__(self, session: Any, scheduler: Optional[Scheduler] = None, account: Optional[str] = None):
+        """
+        Parameters
+        ----------
+            session: HTTP
+                ByBit HTTP session
+
+            scheduler: Scheduler
+                Defaults to the scheduler shared by every session of the process
+
+            account: str
+                Account of the session (e.g. api key)
+        """
+        self.session = session
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
+        self.account = account
+        client = getattr(session, 'client', None)
+        if client is not None:
+            client.hooks['response'].append(self.scheduler.on_response)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.session, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        endpoint_class = ENDPOINT_CLASSES.get(name, 'default')
+        phase = f"rest.{name}"
+
+        def scheduled(*args, **kwargs):
+            return self.scheduler.call(endpoint_class, self.account, _timed, phase, attribute, *args, **kwargs)
+        return scheduled
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """
+    Returns the scheduler shared by every session of the process, creating it on first use
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+            metrics.register(_scheduler.metrics)
+        return _scheduler
+
+
+def _timed(phase: str, function: Callable, *args, **kwargs) -> Any:
+    # REST latency, request and error counts by method and symbol, excluding the scheduler wait
+    symbol = kwargs.get('symbol', '')
+    endpoint = phase[len('rest.'):]
+    metrics.inc('bybit_rest_requests_total', endpoint=endpoint, symbol=symbol)
+    try:
+        with latency.span('', symbol, phase):
+            response = function(*args, **kwargs)
+    except Exception:
+        metrics.inc('bybit_rest_errors_total', endpoint=endpoint, symbol=symbol)
+        raise
+    if isinstance(response, dict) and int(response.get('retCode', 0)) != 0:
+        metrics.inc('bybit_rest_errors_total', endpoint=endpoint, symbol=symbol)
+    return response
+
+
+def _header(headers: Any, name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
@@ -17,7 +17,8 @@ Registering a strategy: Allows the strategy to be selected by the user on the ro
 5. Strategy configuration files are structured in the ff. format: <property>=<value>.
     Example: mean_period=10 
 
-6. Import the strategy in this __init__.py file. 
+6. Strategies are imported on first use by `strategies.registry`. Do not import them in this __init__.py file, so
+    starting a worker imports only the selected strategy.
 
     
 Creating a Strategy File: 
@@ -40,10 +41,9 @@ Required Functions:
 2. Backtest - generates a backtest of the strategy from the most recent data from ByBit
 """
 
-# Note: Do not remove this
-from .ma_cross.ma_cross import *
-from .bbands.bbands import * 
-from .mean_reversion.mean_reversion import * 
-from .rsi.rsi import *
-from .risk_premia.risk_premia import *
-from .demo_strategy.demo_strategy import *
\ No newline at end of file
+
+def __getattr__(name: str):
+    # Strategy classes are imported on first access. Example: from strategies import MACross
+    from .registry import find
+
+    return find(name)
@@ -0,0 +1,275 @@
+"""
+This module contains the OrderPipeline class, which sends a strategy's orders with independent REST calls overlapped.
+
+Sequential flow (one round trip after another):
+    get_positions -> place_order (close) x N -> get_tickers -> place_order (open)
+
+Pipelined flow:
+    positions | mark price           - concurrent reads, from the account state and ticker cache if attached
+    place_batch_order (close)        - one batch request for all closes, as soon as positions are received
+    place_order (open)               - once the closes are acknowledged
+
+A reduce-only close rejected because the position is already zero (e.g. closed by its TP/SL before the private stream
+delivered the fill) is confirmed with a REST read, and counted as closed.
+
+The open order waits for the closes, so its TP/SL is never attached to a position that is then reduced by a late
+close. Tick-to-order latency is the slowest read, plus the slowest close, plus the order.
+"""
+
+import logging
+import math
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from configs.trade_cfg import TradeConfig
+from constants import constants as c
+from exchange.batch import LegResult, cancel_batch, close_requests, place_batch
+from exchange.state import AccountState, to_open_order, to_position
+from market_data.tickers import TickerCache
+from telemetry import latency
+from templates.open_order import OpenOrder
+from templates.order import Order
+from templates.position import Position
+from templates.side import Side
+from .risk import Risk
+
+_log = logging.getLogger(__name__)
+
+# REST calls of every strategy in the process share one pool
+_executor = ThreadPoolExecutor(max_workers=c.ORDER_WORKERS, thread_name_prefix="orders")
+
+
+@dataclass
+class ExecutionReport:
+    """
+    Holds the result and step timings (ms) of an order pipeline run
+    """
+    side: Side
+    success: bool = False
+    order_id: Optional[str] = None
+    mark_price: float = math.nan
+    take_profit: float = 0.0
+    stop_loss: float = 0.0
+    closed: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+    total: float = 0.0
+    error: Optional[str] = None
+
+    def info(self) -> str:
+        steps = " ".join(f"{k}: {v:.1f}ms" for k, v in self.timings.items())
+        return f"Side: {self.side.name} Closed: {self.closed} Success: {self.success} Total: {self.total:.1f}ms " \
+               f"Steps: {steps}"
+
+
+class OrderPipeline:
+    """
+    Sends market orders for a single instrument, overlapping independent REST calls. See module docstring.
+    """
+
+    def __init__(
+            self,
+            session: Any,
+            config: TradeConfig,
+            executor: Optional[ThreadPoolExecutor] = None,
+            tickers: Optional[TickerCache] = None,
+            account: Optional[AccountState] = None,
+            name: str = ''):
+        """
+        Parameters
+        ----------
+            session: HTTP
+                ByBit HTTP session
+
+            config: TradeConfig
+                Trading configuration (symbol, interval, channel)
+
+            executor: ThreadPoolExecutor
+                Pool running the REST calls. Defaults to the pool shared by all strategies.
+
+            tickers: TickerCache
+                Streamed ticker values. Mark prices are requested with REST if None, or if the cached value is stale.
+
+            account: AccountState
+                Streamed positions and orders of the account. Requested with REST if None.
+
+            name: str
+                Strategy label of the step latency spans. See `telemetry.latency`.
+        """
+        self.session = session
+        self.config = config
+        self.executor = executor if executor is not None else _executor
+        self.tickers = tickers
+        self.account = account
+        self.name = name
+
+    def get_open_positions(self) -> List[Position]:
+        """
+        Returns the open positions of the instrument, from the account state if attached
+        """
+        if self.account is not None:
+            return self.account.get_positions(self.config.symbol)
+
+        positions = self.session.get_positions(
+            category=self.config.channel,
+            symbol=self.config.symbol
+        )['result']['list']
+
+        return [to_position(p) for p in positions if float(p['size']) != 0]
+
+    def get_open_orders(self) -> List[OpenOrder]:
+        """
+        Returns the open orders of the instrument, from the account state if attached
+        """
+        if self.account is not None:
+            return self.account.get_orders(self.config.symbol)
+
+        orders = self.session.get_open_orders(
+            category=self.config.channel,
+            symbol=self.config.symbol
+        )['result']['list']
+
+        return [to_open_order(o) for o in orders]
+
+    def get_mark_price(self) -> float:
+        """
+        Returns the mark price of the instrument, from the ticker cache if fresh, otherwise with a REST request
+        """
+        if self.tickers is not None:
+            mark_price = self.tickers.mark_price(self.config.symbol)
+            if mark_price is not None:
+                return mark_price
+            _log.info(f"{self.config.symbol} - Cached mark price missing or stale. Requesting with REST.")
+
+        mark_price = self.session.get_tickers(
+            category=self.config.channel,
+            symbol=self.config.symbol
+        )['result']['list'][0]['markPrice']
+
+        return float(mark_price)
+
+    def is_flat(self) -> bool:
+        """
+        Returns True if the instrument has no open position, as requested with REST.
+
+        Reduce-only closes are rejected if the position was already closed on the exchange (e.g. by a TP/SL fill the
+        private stream has not delivered yet). The account state, if attached, is reconciled with the REST result.
+        """
+        if self.account is not None:
+            self.account.reconcile(self.config.symbol)
+            return len(self.account.get_positions(self.config.symbol)) == 0
+
+        positions = self.session.get_positions(
+            category=self.config.channel,
+            symbol=self.config.symbol
+        )['result']['list']
+
+        return all(float(p['size']) == 0 for p in positions)
+
+    def close_positions(self, positions: List[Position]) -> List[LegResult]:
+        """
+        Closes positions with reduce-only market orders, in batch requests. Returns one result per position.
+        """
+        if len(positions) == 0:
+            return list()
+        return place_batch(self.session, self.config.channel, close_requests(positions), self.executor)
+
+    def cancel_orders(self, orders: List[OpenOrder]) -> List[LegResult]:
+        """
+        Cancels open orders in batch requests. Returns one result per order.
+        """
+        if len(orders) == 0:
+            return list()
+        return cancel_batch(self.session, self.config.channel, orders, self.executor)
+
+    def cancel_all_orders(self) -> Optional[Dict]:
+        """
+        Cancels every open order of the instrument. No request is sent if there are no open orders.
+        """
+        if len(self.get_open_orders()) == 0:
+            return None
+        return self.session.cancel_all_orders(category=self.config.channel, symbol=self.config.symbol)
+
+    def execute(self, side: Side, close_positions: bool = True, risk: Optional[Risk] = None) -> ExecutionReport:
+        """
+        Optionally closes all open positions, and sends a market order with TP/SL. Errors are recorded in the report.
+
+        Parameters
+        ----------
+            side: Side
+                Side of the new order
+
+            close_positions: bool
+                Closes open positions of the instrument before opening
+
+            risk: Risk
+                Risk parameters. Defaults to `Risk()`.
+        """
+        risk = risk if risk is not None else Risk()
+        report = ExecutionReport(side=side)
+        start = time.perf_counter()
+        try:
+            # ----- Concurrent reads ----- #
+            mark_future = self.__submit(report, 'mark_price', self.get_mark_price)
+            if close_positions:
+                positions = self.__submit(report, 'positions', self.get_open_positions).result()
+
+                # ----- Batched closes ----- #
+                legs = self.__timed(report, 'close', self.close_positions, positions)
+                failed = [leg.message for leg in legs if not leg.success and leg.code != c.REDUCE_ONLY_REJECTED]
+                if len(failed) > 0:
+                    raise RuntimeError(f"Close Failed. {failed}")
+                rejected = [leg.message for leg in legs if leg.code == c.REDUCE_ONLY_REJECTED]
+                if len(rejected) > 0 and not self.__timed(report, 'refresh', self.is_flat):
+                    raise RuntimeError(f"Close Failed. {rejected}")
+                report.closed = len(legs)
+
+            # ----- Opens the new position ----- #
+            report.mark_price = mark_future.result()
+            with latency.span(self.name, self.config.symbol, 'risk'):
+                report.take_profit, report.stop_loss = risk.calculate(report.mark_price, side)
+            if side != Side.NEUTRAL:
+                result = self.__timed(report, 'place_order', self.session.place_order,
+                                      category=self.config.channel,
+                                      symbol=self.config.symbol,
+                                      side=side.name.title(),
+                                      orderType=Order.MARKET.name.title(),
+                                      qty=risk.params.quantity,
+                                      takeProfit=str(report.take_profit),
+                                      stopLoss=str(report.stop_loss))
+                if int(result['retCode']) != 0:
+                    raise RuntimeError(f"Order Send Failed. {result['retMsg']}")
+                report.order_id = result['result']['orderId']
+            report.success = True
+
+        except Exception as e:
+            report.error = f"{type(e).__name__}: {e}"
+
+        report.total = (time.perf_counter() - start) * 1000
+        return report
+
+    # -------------------- Private Methods -------------------- #
+
+    def __submit(self, report: ExecutionReport, step: str, function: Callable, *args) -> Future:
+        return self.executor.submit(self.__timed, report, step, function, *args)
+
+    def __timed(self, report: ExecutionReport, step: str, function: Callable, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            report.timings[step] = elapsed * 1000
+            latency.record(self.name, self.config.symbol, step, elapsed)
+
+
+def close_side(side: str) -> str:
+    """
+    Returns the order side that closes a position side. Example: Buy -> Sell
+    """
+    if side == Side.BUY.name.title():
+        return Side.SELL.name.title()
+    if side == Side.SELL.name.title():
+        return Side.BUY.name.title()
+    raise ValueError(f"Invalid position side: {side}")
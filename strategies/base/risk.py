@@ -26,10 +26,12 @@ class Risk:
             stop_loss=0.009, 
             leverage=10
         )
+        # Decimal places of TP/SL prices
+        self.digits = 2  # Temporary
 
     def calculate(self, mark_price: float, side: Side) -> Tuple[float, float]:
         # Calculate SL TP 
-        digits = 2 # Temporary
+        digits = self.digits
         if side == Side.BUY: 
             tp_price = round(mark_price + (mark_price*self.params.take_profit), digits)
             sl_price = round(mark_price - (mark_price*self.params.stop_loss), digits)
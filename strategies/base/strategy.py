@@ -4,15 +4,24 @@ as well as other generic functions required by strategies.
 """
 import logging
 import pandas as pd
-from pybit.unified_trading import HTTP
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from configs.trade_cfg import TradeConfig
 from api_secrets import api_secrets
+from market_data.store import CandleStore, get_store
+from market_data.window import CandleWindow
+from market_data.tickers import TickerCache
+from exchange.batch import LegResult
+from exchange.state import AccountState, get_account_state
+from session.bybit_session import get_session
+from indicators.streaming import parity_errors
+from telemetry import latency, metrics
 from .risk import Risk
+from .execution import OrderPipeline, close_side
 from templates.side import Side
 from templates.order import Order
 from templates.position import Position
+from templates.candles import Candles
 
 _log = logging.getLogger(__name__)
 
@@ -27,13 +36,29 @@ class Strategy:
         # Trading Configuration  
         self.trade_config = config
 
-        # Session  
-
-        self.session = HTTP(
-            testnet=False,
+        # Session. Shared by all strategies trading the same account. See `session.bybit_session`.
+        self.session = get_session(
             api_key=api_secrets.bybit_api_demo,
             api_secret=api_secrets.bybit_api_secret,
-            demo=True)
+            demo=True,
+            testnet=False)
+
+        # Order execution with overlapped REST calls. See `execute_order()`.
+        self.execution = OrderPipeline(self.session, config, name=name)
+
+        # Local candle store for this instrument. Shared by strategies trading the same instrument.
+        self.store = get_store(config.symbol, config.channel, config.interval)
+
+        # Rolling candle window fed by the kline stream. See `attach_window()`.
+        self.window: Optional[CandleWindow] = None
+
+        # Streaming indicators. See `stream()`.
+        self.indicator_values: Dict[str, float] = dict()
+        self.previous_indicator_values: Dict[str, float] = dict()
+        self.last_streamed: Optional[int] = None
+        # Parity mode: compares streamed values against `attach_indicators()` on every candle
+        self.parity = False
+        self.parity_tolerance = 1e-6
 
     def log(self, message: str) -> None:
         # Strategy Logger
@@ -51,7 +76,8 @@ class Strategy:
         # Sends market order 
         mark_price = self.__get_mark_price() 
         risk = Risk()
-        tp_price, sl_price = risk.calculate(mark_price, side) 
+        with self.span('risk'):
+            tp_price, sl_price = risk.calculate(mark_price, side) 
 
         try:
             session_side = side.name.title()
@@ -60,15 +86,17 @@ class Strategy:
             self.log(f"Sending Market Order: Symbol: {self.trade_config.symbol} Side: {session_side} Order: \
                 {session_order} Quantity: {risk.params.quantity} TP: {tp_price} SL: {sl_price}")
 
-            trade_result = self.session.place_order(
-                category=self.trade_config.channel, 
-                symbol=self.trade_config.symbol,
-                side=session_side, 
-                orderType=session_order,
-                qty=risk.params.quantity, 
-                take_profit=str(tp_price),
-                stop_loss=str(sl_price),
-            )
+            with self.span('place_order'):
+                trade_result = self.session.place_order(
+                    category=self.trade_config.channel, 
+                    symbol=self.trade_config.symbol,
+                    side=session_side, 
+                    orderType=session_order,
+                    qty=risk.params.quantity, 
+                    takeProfit=str(tp_price),
+                    stopLoss=str(sl_price),
+                )
+            self.__record_tick_to_trade()
             self.log(trade_result)
             
             if int(trade_result['retCode']) == 0: 
@@ -76,72 +104,97 @@ class Strategy:
 
         except Exception as e:
             self.log(f"Order Send Failed. {e}")
+            self.__count_order(False)
             return False
         
+        self.__count_order(int(trade_result['retCode']) == 0)
+        return True
+
+    def execute_order(self, side: Side, close_positions: bool = True) -> bool:
+        """
+        Closes all open positions, and sends a market order, with the independent REST calls overlapped. Equivalent
+        to `close_all_open_positions()` followed by `send_market_order()`. See `OrderPipeline`.
+
+        Parameters
+        ----------
+            side: Side
+                Side of the new order
+
+            close_positions: bool
+                Closes open positions of the instrument before opening
+        """
+        report = self.execution.execute(side, close_positions=close_positions)
+        if report.order_id is not None:
+            self.__record_tick_to_trade()
+        self.log(f"Order Pipeline - {report.info()}")
+        if not report.success:
+            self.log(f"Order Send Failed. {report.error}")
+            self.__count_order(False)
+            return False
+
+        if report.order_id is not None:
+            self.__count_order(True)
+        self.log(f"Order Send Successful. ID: {report.order_id} TP: {report.take_profit} SL: {report.stop_loss}")
         return True
 
     def close_opposite_order(self, side: Side) -> None:
-        # Closes order opposite to specified order type
-        print(f"Close Opposite Order of: {side.name}")
+        # Closes positions, and cancels entry orders, opposite to specified order type
+        if side == Side.NEUTRAL:
+            return
+        opposite = self.__get_close_side(side.name.title())
+
+        orders = [o for o in self.execution.get_open_orders() if o.side == opposite and not o.reduce_only]
+        positions = [p for p in self.get_open_positions() if p.side == opposite]
+        self.__log_legs("Cancel Opposite Orders", self.execution.cancel_orders(orders))
+        self.__log_legs("Close Opposite Positions", self.execution.close_positions(positions))
 
     def close_all_orders(self) -> None:
         # Closes all orders 
-        print(f"Close All Orders")
+        result = self.execution.cancel_all_orders()
+        if result is not None:
+            self.log(f"Cancel All Orders: {result['retMsg']}")
 
     def close_all_open_positions(self) -> None: 
-        # Closes all open positions 
-        # Needs symbol, side
+        # Closes all open positions, in batch requests
         positions_to_close = self.get_open_positions() 
-        for p in positions_to_close: 
-            side = self.__get_close_side(p.side)
-            symbol = p.symbol
-            qty = p.size
-            
-            trade_result = self.session.place_order(
-                category=self.trade_config.channel,
-                symbol=symbol,
-                side=side,
-                orderType=Order.MARKET.name.title(),
-                qty=qty
-            )
+        self.__log_legs("Close All Positions", self.execution.close_positions(positions_to_close))
 
     def get_open_positions(self) -> List[Position]:
         # Needs: Symbol, side
-        
-        positions = self.session.get_positions(
-            category=self.trade_config.channel, 
-            symbol=self.trade_config.symbol
-        )['result']['list']
-        
-        # convert to list of type Positions 
-        open_positions = list()
-        for p in positions:
-            if float(p['size']) == 0:
-                continue 
-            
-            open_positions.append(Position(
-                symbol=p['symbol'],
-                side=p['side'],
-                size=p['size']
-            ))
+        return self.execution.get_open_positions()
 
-        return open_positions 
+    def span(self, phase: str):
+        """
+        Returns a latency span of this strategy and symbol. No-op if latency spans are disabled.
+
+        Example:
+            with self.span('signal'):
+                side = self.get_side(values['calculated_side'])
+        """
+        return latency.span(self.name, self.trade_config.symbol, phase)
+
+    def __count_order(self, sent: bool) -> None:
+        metrics.inc('bybit_orders_total', strategy=self.name, symbol=self.trade_config.symbol,
+                    result='sent' if sent else 'failed')
+
+    def __record_tick_to_trade(self) -> None:
+        # Time from the receive of the staged candle to the order acknowledgement
+        elapsed = latency.since_tick()
+        if elapsed is not None:
+            latency.record(self.name, self.trade_config.symbol, 'tick_to_trade', elapsed)
+
+    def __log_legs(self, action: str, legs: List[LegResult]) -> None:
+        if len(legs) == 0:
+            return
+        failed = [f"{leg.symbol}: {leg.message}" for leg in legs if not leg.success]
+        self.log(f"{action} - Legs: {len(legs)} Failed: {failed}")
 
     @staticmethod
     def __get_close_side(side: str) -> str:
-        if side == Side.BUY.name.title():
-            return Side.SELL.name.title() 
-        if side == Side.SELL.name.title():
-            return Side.BUY.name.title() 
+        return close_side(side)
 
     def __get_mark_price(self) -> float:
-        
-        mark_price = self.session.get_tickers(
-            category=self.trade_config.channel, 
-            symbol=self.trade_config.symbol
-        )['result']['list'][0]['markPrice']
-
-        return float(mark_price)
+        return self.execution.get_mark_price()
 
     @staticmethod
     def __get_order_type(order: Order) -> str:
@@ -152,38 +205,180 @@ class Strategy:
         else: 
             return ""
 
-    def fetch(self, elements: int) -> Optional[pd.DataFrame]:
+    def attach_window(self, window: CandleWindow) -> None:
+        """
+        Serves `fetch` from a rolling candle window, and seeds it from the candle store.
+
+        The window is appended to by `TradeMain.handler` on every confirmed candle.
+
+        Parameters
+        ----------
+            window: CandleWindow
+                Rolling candle window for this instrument
+        """
+        self.window = window
+        if window.size == 0:
+            self.fetch(window.capacity)
+
+    def attach_tickers(self, tickers: TickerCache) -> None:
+        """
+        Reads mark prices from a streamed ticker cache, instead of a REST request on every order.
+
+        Parameters
+        ----------
+            tickers: TickerCache
+                Ticker cache of this strategy's channel. See `get_ticker_cache()`.
+        """
+        tickers.subscribe(self.trade_config.symbol)
+        self.execution.tickers = tickers
+
+    def attach_session(self, session: Any, store: Optional[CandleStore] = None) -> None:
+        """
+        Sends the REST calls of this strategy, including its orders, to another session. Used to run strategies
+        against a mock exchange, or a replay.
+
+        Parameters
+        ----------
+            session: HTTP
+                Session implementing the ByBit HTTP methods used by strategies
+
+            store: CandleStore
+                Candle store replacing the shared store of this instrument. Example: a store in a scratch directory,
+                so candles of the session are not mixed with the exchange's.
         """
-        Fetches data from ByBit 
+        self.session = session
+        self.execution.session = session
+        if store is not None:
+            self.store = store
 
+    def attach_account(self, state: Optional[AccountState] = None) -> None:
         """
+        Reads positions and orders from a book kept current by the private stream, instead of polling REST.
 
-        response = None 
-        try: 
-            response = self.session.get_kline(
-                category=self.trade_config.channel, 
-                symbol=self.trade_config.symbol,
-                interval=self.trade_config.interval.value,
-                limit=elements+1
+        Parameters
+        ----------
+            state: AccountState
+                Account state. Defaults to the shared state of this strategy's account and channel.
+        """
+        if state is None:
+            state = get_account_state(
+                self.session,
+                self.trade_config.channel,
+                api_key=api_secrets.bybit_api_demo,
+                api_secret=api_secrets.bybit_api_secret
             )
-        except Exception as e:
-            self.log(f"Error: {e}")
-            return None 
-        
-        df = pd.DataFrame(response['result']['list'])
-        
-        df.columns = ['Time', 'Open', 'High', 'Low', 'Close', 'Volume', 'Turnover']
-        df = df.set_index('Time', drop=True)
-        # convert timestamp to datetime
-        df.index = pd.to_datetime(df.index.astype('int64'), unit='ms')
-        # sets values to float 
-        df = df.astype(float)
-        # inverts the dataframe 
-        df = df[::-1] 
-        # excludes last row since this is fresh candle, and is still open 
-        df = df[:-1]  
-        
-        return df 
+        state.track(self.trade_config.symbol)
+        self.execution.account = state
+
+    def fetch(self, elements: int) -> Optional[pd.DataFrame]:
+        """
+        Fetches data from the rolling candle window, or the local candle store.
+
+        The window is read without copying, if attached and holding at least `elements` candles. Otherwise, the
+        store is topped up with only the candles newer than the last stored candle, and the window is reseeded from
+        it. The full history is downloaded only when the store holds fewer than `elements` candles.
+
+        Parameters
+        ----------
+            elements: int
+                Number of confirmed candles to return
+        """
+        with self.span('fetch'):
+            window = self.window
+            if window is not None and window.size >= elements:
+                return window.frame(elements)
+
+            try: 
+                df = self.store.top_up(self.session, elements)
+            except Exception as e:
+                self.log(f"Error: {e}")
+                return None 
+
+            if window is not None:
+                window.seed(self.store.tail(window.capacity))
+
+            return df
+
+    # -------------------- Streaming Indicators -------------------- #
+
+    def warmup_elements(self) -> int:
+        # Number of candles used to warm up the streaming indicators
+        raise NotImplementedError
+
+    def reset_indicators(self) -> None:
+        # Creates fresh streaming indicators
+        raise NotImplementedError
+
+    def update_indicators(self, close: float) -> Dict[str, float]:
+        # Advances the streaming indicators by one closing price, and returns the latest values by column name
+        raise NotImplementedError
+
+    def stream(self, candle: Candles) -> Optional[Dict[str, float]]:
+        """
+        Advances the streaming indicators by a confirmed candle, and returns the latest indicator values.
+
+        Indicators are warmed up from `fetch(warmup_elements())` on the first candle, or if candles were missed.
+        Afterwards, each candle costs a single `update_indicators()` call instead of recomputing the whole window.
+
+        Parameters
+        ----------
+            candle: Candles
+                Contains the latest ticker information
+        """
+        with self.span('indicators'):
+            return self.__stream(candle)
+
+    def __stream(self, candle: Candles) -> Optional[Dict[str, float]]:
+        start = candle.start
+        if self.last_streamed is not None and start <= self.last_streamed:
+            # Candle was already streamed
+            return self.indicator_values
+
+        interval = candle.end + 1 - start
+        if self.last_streamed is None or start - interval > self.last_streamed:
+            # Cold start, or candles were missed. Warms up the indicators from history.
+            df = self.fetch(self.warmup_elements())
+            if df is None:
+                return None
+
+            self.reset_indicators()
+            self.indicator_values = dict()
+            for close in df['Close'].to_numpy():
+                self.__advance(float(close))
+
+            history_end = (df.index[-1] - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1) if len(df) > 0 else None
+            if history_end is None or history_end < start:
+                self.__advance(candle.close)
+        else:
+            self.__advance(candle.close)
+
+        self.last_streamed = start
+
+        if self.parity:
+            self.__check_parity()
+
+        return self.indicator_values
+
+    def __advance(self, close: float) -> None:
+        self.previous_indicator_values = self.indicator_values
+        self.indicator_values = self.update_indicators(close)
+
+    def __check_parity(self) -> None:
+        """
+        Compares the streamed values with `attach_indicators()` on the same window.
+
+        Exponential averages depend on the whole history they were fed, so small differences are expected for
+        EXPONENTIAL moving averages and RSI, where pandas only sees the fetched window.
+        """
+        df = self.fetch(self.warmup_elements())
+        if df is None:
+            return
+
+        with self.span('attach_indicators'):
+            expected = self.attach_indicators(df).iloc[-1]
+        errors = parity_errors(self.indicator_values, expected, self.parity_tolerance)
+        if len(errors) > 0:
+            self.log(f"Parity check failed. Relative errors: {errors}")
 
     @staticmethod
     def valid_columns(data: pd.DataFrame, columns: list) -> bool:
@@ -42,12 +42,13 @@ class Demo(Strategy, Configs):
         candles_to_fetch = 5 
         df = self.fetch(candles_to_fetch)
 
-        df = self.build(df) 
+        with self.span('signal'):
+            df = self.build(df) 
 
-        last = df.iloc[-1]
-        calculated_side = last['calculated_side'].item()
+            last = df.iloc[-1]
+            calculated_side = last['calculated_side'].item()
 
-        side = self.get_side(calculated_side) 
+            side = self.get_side(calculated_side) 
         
         info = candle.info() + f" Side: {side.name}"
         self.log(info)
@@ -57,9 +58,7 @@ class Demo(Strategy, Configs):
 
         trade_result = False
         
-        self.close_all_open_positions() 
-
-        trade_result = self.send_market_order(side)
+        trade_result = self.execute_order(side)
 
         return trade_result
 
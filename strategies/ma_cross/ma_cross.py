@@ -3,18 +3,19 @@ This module contains the main implementation of a generic Moving Average Crossov
 """
 
 
+import math
 import pandas as pd
 from dataclasses import dataclass
-from typing import Tuple, Union, Optional
+from typing import Dict, Tuple, Union, Optional
 
-import constants as c
+from . import constants as c
+from indicators.streaming import moving_average
 from templates.indicator import MAType
 from templates.side import Side
 from templates.candles import Candles
 from configs.trade_cfg import TradeConfig
 from ..base.configs import Configs
 from ..base.strategy import Strategy
-from backtest.backtest import Backtest
 
 
 @dataclass
@@ -142,6 +143,18 @@ class MACross(Strategy, Configs):
         if self.ma_kind == MAType.EXPONENTIAL:
             return data.ewm(span=length).mean()
 
+    @staticmethod
+    def __is_crossover(last_side: int, prev_side: int) -> Optional[bool]:
+        """
+        Determines if MA crossover is present, given the last and the preceding calculated side.
+        """
+        # Returns None if no signal is found 
+        if last_side == 0 or prev_side == 0:
+            return None 
+        
+        # If returns True - Crossover is present, if last side, and previous side are different signals 
+        return last_side != prev_side
+
     def crossover(self, data: pd.DataFrame) -> Optional[bool]:
         """
         Determines if MA crossover is present. 
@@ -160,15 +173,20 @@ class MACross(Strategy, Configs):
             self.log("Error. Null Values found.")
             return None                    
 
-        last_side = last[c.CALCULATED_SIDE].item()
-        prev_side = prev[c.CALCULATED_SIDE].item()
+        return self.__is_crossover(last[c.CALCULATED_SIDE].item(), prev[c.CALCULATED_SIDE].item())
 
-        # Returns None if no signal is found 
-        if last_side == 0 or prev_side == 0:
-            return None 
-        
-        # If returns True - Crossover is present, if last side, and previous side are different signals 
-        return last_side != prev_side
+    def stream_crossover(self) -> Optional[bool]:
+        """
+        Determines if MA crossover is present from the last two streamed indicator values. See `stream()`.
+        """
+        last, prev = self.indicator_values, self.previous_indicator_values
+
+        # Returns None if Null values are found 
+        if len(prev) == 0 or any(math.isnan(v) for v in (*last.values(), *prev.values())):
+            self.log("Error. Null Values found.")
+            return None
+
+        return self.__is_crossover(last[c.CALCULATED_SIDE], prev[c.CALCULATED_SIDE])
 
     def attach_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
         """
@@ -195,6 +213,28 @@ class MACross(Strategy, Configs):
 
         return data
 
+    def warmup_elements(self) -> int:
+        return self.slow_ma_period * 2
+
+    def reset_indicators(self) -> None:
+        self.fast_ma = moving_average(self.ma_kind, self.fast_ma_period)
+        self.slow_ma = moving_average(self.ma_kind, self.slow_ma_period)
+
+    def update_indicators(self, close: float) -> Dict[str, float]:
+        """
+        Streaming equivalent of `attach_indicators()`. Advances the moving averages by one closing price.
+
+        Parameters
+        ----------
+            close: float
+                Closing price of the latest confirmed candle
+        """
+        fast_ma = self.fast_ma.update(close)
+        slow_ma = self.slow_ma.update(close)
+        side = Side.BUY if fast_ma > slow_ma else Side.SELL if fast_ma < slow_ma else Side.NEUTRAL
+
+        return {c.FAST_MA: fast_ma, c.SLOW_MA: slow_ma, c.CALCULATED_SIDE: int(side.value)}
+
     def stage(self, candle: Candles) -> bool:
         """
         Processes main trade logic 
@@ -207,24 +247,21 @@ class MACross(Strategy, Configs):
                 Contains latest ticker information 
         """
 
-        # Fetch data to calculate indicators 
-        candles_to_fetch = self.slow_ma_period * 2
-        df = self.fetch(candles_to_fetch)
+        # Advances the streaming indicators. Warms up from history on the first candle.
+        values = self.stream(candle)
+        if values is None:
+            return False
 
-        # Attaches indicators based on input values 
-        df = self.attach_indicators(df)
+        with self.span('signal'):
+            # Check for crossover 
+            cross = self.stream_crossover()
 
-        # Check for crossover 
-        cross = self.crossover(df)
+            # Gets last value 
+            fast_ma = values[c.FAST_MA]
+            slow_ma = values[c.SLOW_MA]
 
-        # Gets last value 
-        last = df.iloc[-1]
-        fast_ma = last[c.FAST_MA].item()
-        slow_ma = last[c.SLOW_MA].item()
-
-        # Determines side: Long or Short 
-        # side = self.get_side(fast_ma, slow_ma)
-        side = Side.BUY if fast_ma > slow_ma else Side.SELL if fast_ma < slow_ma else Side.NEUTRAL
+            # Determines side: Long or Short 
+            side = self.get_side(values[c.CALCULATED_SIDE])
 
         # General Logging 
         info = candle.info() + f" Crossover: {cross} Fast: {fast_ma:.2f} Slow: {slow_ma:.2f} Side: {side.name}"
@@ -233,11 +270,9 @@ class MACross(Strategy, Configs):
         trade_result = False 
         cross = True  # Temporary
         if cross: 
-            # Sends trade orders if MA Crossover is found
-            self.close_all_open_positions()
-
+            # Sends trade orders if MA Crossover is found. Closes open positions, and opens the new side.
             # Returns true if order was sent successfully. 
-            trade_result = self.send_market_order(side)
+            trade_result = self.execute_order(side)
 
         return trade_result 
 
@@ -245,6 +280,8 @@ class MACross(Strategy, Configs):
         """
         Tests the strategy on historical data, and plots the equity curve. 
         """
+        from backtest.backtest import Backtest
+
         df = self.fetch(1000)
 
         df = self.attach_indicators(df)
@@ -1,7 +1,8 @@
 import pandas as pd 
 from dataclasses import dataclass
-from typing import Union, Tuple, Optional
+from typing import Dict, Union, Tuple, Optional
 
+from indicators.streaming import ZScore, moving_average
 from ..base.strategy import Strategy 
 from ..base.configs import Configs 
 from configs.trade_cfg import TradeConfig 
@@ -91,16 +92,42 @@ class MeanReversion(Strategy, Configs):
             return Side.SELL
         return Side.NEUTRAL
         
-    def stage(self, candle: Candles) -> bool:
+    def warmup_elements(self) -> int:
+        return max(self.mean_period, self.spread_mean_period, self.spread_sdev_period) * 2
+
+    def reset_indicators(self) -> None:
+        self.mean = moving_average(self.ma_kind, self.mean_period)
+        self.z_score = ZScore(moving_average(self.ma_kind, self.spread_mean_period), self.spread_sdev_period)
+
+    def update_indicators(self, close: float) -> Dict[str, float]:
+        # Streaming equivalent of `attach_indicators()`
+        mean = self.mean.update(close)
+        spread = close - mean
+        z_score = self.z_score.update(spread)
+
+        calculated_side = 0
+        if z_score <= self.lower_threshold:
+            calculated_side = int(Side.BUY.value)
+        if z_score >= self.upper_threshold:
+            calculated_side = int(Side.SELL.value)
+
+        return {
+            'mean': mean,
+            'spread': spread,
+            'spread_mean': self.z_score.mean.value,
+            'spread_sdev': self.z_score.sdev.value,
+            'z_score': z_score,
+            'calculated_side': calculated_side
+        }
 
-        candles_to_fetch = max(self.mean_period, self.spread_mean_period, self.spread_sdev_period) * 2 
-        df = self.fetch(candles_to_fetch)
+    def stage(self, candle: Candles) -> bool:
 
-        df = self.attach_indicators(df)
+        values = self.stream(candle)
+        if values is None:
+            return False
 
-        last = df.iloc[-1]
-        z_score = last['z_score'].item()
-        calculated_side = last['calculated_side'].item()
+        z_score = values['z_score']
+        calculated_side = values['calculated_side']
         side = self.get_side(calculated_side)
         valid = side != Side.NEUTRAL
 
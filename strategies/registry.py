@@ -0,0 +1,178 @@
+"""
+This module contains the strategy registry, which imports strategy classes on first use.
+
+Strategies are registered in strategies/strategies.ini as `<strategy_key>=<class_name>`, and their logic is in
+`strategies/<strategy_key>/<strategy_key>.py`. Only the module of a requested strategy is imported, and its class is
+cached, so a live worker does not import every strategy, nor the dependencies of their backtests.
+
+Usage (import-time report, each row in a fresh interpreter):
+    python -m strategies.registry
+    python -m strategies.registry ma_cross rsi
+"""
+
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from constants import constants as c
+
+# Modules reported by the import-time report, if imported
+HEAVY_MODULES = ['pandas', 'pandas_ta', 'matplotlib', 'numba', 'scipy', 'pybit']
+
+# Modules imported by `import strategies` before the registry: the star imports of every strategy module, and the
+# module-level imports they made (the backtester, which imports numba, and pandas_ta). Compared against by the report.
+EAGER_IMPORTS = [
+    'strategies.ma_cross.ma_cross',
+    'strategies.bbands.bbands',
+    'strategies.mean_reversion.mean_reversion',
+    'strategies.rsi.rsi',
+    'strategies.risk_premia.risk_premia',
+    'strategies.demo_strategy.demo_strategy',
+    'backtest.backtest',
+    'pandas_ta',
+]
+
+_keys: Optional[Dict[str, str]] = None
+_strategies: Dict[str, type] = dict()
+_strategies_lock = threading.Lock()
+
+# Seconds taken to import the module of each loaded strategy
+import_times: Dict[str, float] = dict()
+
+
+def strategy_keys() -> Dict[str, str]:
+    """
+    Returns the registered strategies as {strategy key: class name}. strategies.ini is read once.
+    """
+    global _keys
+    if _keys is None:
+        from generic import generic
+
+        _keys = generic.cfg_as_dict(os.path.join(os.path.dirname(__file__), c.STRATEGIES_FILE))
+    return _keys
+
+
+def load_strategy(key: str) -> type:
+    """
+    Imports a strategy class given a strategy key, on first use. Refer to strategies.ini for keys.
+
+    Raises ValueError if the key is not registered, and AttributeError if the module does not contain the registered
+    class.
+
+    Parameters
+    ----------
+        key: str
+            Strategy key. Example: ma_cross
+    """
+    strategy = _strategies.get(key)
+    if strategy is not None:
+        return strategy
+
+    with _strategies_lock:
+        if key in _strategies:
+            return _strategies[key]
+
+        keys = strategy_keys()
+        if key not in keys:
+            raise ValueError(f"Strategy not found in {c.STRATEGIES_FILE}: {key}")
+
+        start = time.perf_counter()
+        module = importlib.import_module(f"{__package__}.{key}.{key}")
+        import_times[key] = time.perf_counter() - start
+
+        _strategies[key] = getattr(module, keys[key])
+        return _strategies[key]
+
+
+def find(name: str) -> Any:
+    """
+    Returns a name exported by the strategy modules. Registered class names are imported alone. Other names (e.g.
+    MAType) import every registered module, as the star imports of the package did.
+
+    Raises AttributeError if no strategy module defines the name.
+
+    Parameters
+    ----------
+        name: str
+            Name to look up. Example: MACross
+    """
+    keys = strategy_keys()
+    for key, class_name in keys.items():
+        if class_name == name:
+            return load_strategy(key)
+
+    if not name.startswith('_'):
+        for key in keys:
+            module = importlib.import_module(f"{__package__}.{key}.{key}")
+            if hasattr(module, name):
+                return getattr(module, name)
+
+    raise AttributeError(f"module '{__package__}' has no attribute '{name}'")
+
+
+# -------------------- Import-Time Report -------------------- #
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'modules': [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+
+def measure(statement: str) -> Dict[str, Any]:
+    """
+    Runs an import statement in a fresh interpreter. Returns its duration (s), and the heavy modules it imported.
+
+    Parameters
+    ----------
+        statement: str
+            Python statement. Example: from strategies.registry import load_strategy; load_strategy('ma_cross')
+    """
+    code = _PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def report(keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Measures the cold import of each strategy through the registry, and the eager import the package made before the
+    registry (see `EAGER_IMPORTS`). Modules that are not installed are left out of the eager import.
+
+    Parameters
+    ----------
+        keys: List[str]
+            Strategy keys. Defaults to every registered strategy.
+    """
+    keys = keys if keys else list(strategy_keys())
+    rows = list()
+    eager = "; ".join(f"import {m}" for m in EAGER_IMPORTS if importlib.util.find_spec(m) is not None)
+    rows.append({'import': 'eager (baseline)', **measure(eager)})
+    for key in keys:
+        statement = f"from {__package__}.registry import load_strategy; load_strategy('{key}')"
+        rows.append({'import': key, **measure(statement)})
+    return rows
+
+
+def main(args: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description="Reports the cold import time of strategies")
+    parser.add_argument("keys", nargs="*", help="Strategy keys in strategies.ini. Defaults to every strategy.")
+    options = parser.parse_args(args)
+
+    rows = report(options.keys)
+    for row in rows:
+        print(f"{row['import']:<16} {row['elapsed'] * 1000:>8.1f}ms  {', '.join(row['modules'])}")
+    return rows
+
+
+if __name__ == "__main__":
+    main()
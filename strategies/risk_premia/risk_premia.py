@@ -2,13 +2,13 @@
 
 import pandas as pd 
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Dict, Tuple
 
+from indicators.streaming import RollingSkew
 from ..base.strategy import Strategy 
 from configs.trade_cfg import TradeConfig 
 from templates.side import Side 
 from templates.candles import Candles
-from backtest.backtest import Backtest
 
 
 @dataclass
@@ -73,18 +73,33 @@ class RiskPremia(Strategy):
 
         return data
     
-    def stage(self, candle: Candles) -> bool:
+    def warmup_elements(self) -> int:
+        return self.skew_period * 2
 
-        candles_to_fetch = self.skew_period * 2 
-        df = self.fetch(candles_to_fetch) 
+    def reset_indicators(self) -> None:
+        self.skew = RollingSkew(self.skew_period)
 
-        df = self.attach_indicators(df)
+    def update_indicators(self, close: float) -> Dict[str, float]:
+        # Streaming equivalent of `attach_indicators()`
+        skew = self.skew.update(close)
 
-        last = df.iloc[-1]
+        calculated_side = 0
+        if skew < self.lower_threshold:
+            calculated_side = int(Side.BUY.value)
+        if skew > self.upper_threshold:
+            calculated_side = int(Side.SELL.value)
 
-        skew = last['skew'].item()
+        return {'skew': skew, 'calculated_side': calculated_side}
+
+    def stage(self, candle: Candles) -> bool:
 
-        side = Side.BUY if skew < self.lower_threshold else Side.SELL if skew > self.upper_threshold else Side.NEUTRAL
+        values = self.stream(candle)
+        if values is None:
+            return False
+
+        skew = values['skew']
+
+        side = self.get_side(values['calculated_side'])
 
         info = candle.info() + f" Skew: {skew} Side: {side.name}"
         self.log(info)
@@ -101,6 +116,8 @@ class RiskPremia(Strategy):
         """
         Tests the strategy on historical data, and plots the equity curve. 
         """
+        from backtest.backtest import Backtest
+
         df = self.fetch(1000)
 
         df = self.attach_indicators(df)
@@ -1,10 +1,9 @@
 
-import pandas_ta as ta 
 import pandas as pd 
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Dict, Tuple
 
-from backtest.backtest import Backtest
+from indicators.streaming import RSI as StreamingRSI
 from ..base.strategy import Strategy 
 from configs.trade_cfg import TradeConfig 
 from templates.side import Side 
@@ -66,7 +65,9 @@ class RSI(Strategy):
         return period, overbought, oversold
     
     def attach_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
-        
+        # Imported on first use. Live stages use the streaming RSI.
+        import pandas_ta as ta
+
         data['rsi'] = ta.rsi(data['Close'], self.period)
 
         # Build side as 1, -1, 0 
@@ -95,21 +96,39 @@ class RSI(Strategy):
             return Side.SELL
         return Side.NEUTRAL
 
-    def stage(self, candle: Candles) -> bool:
+    def warmup_elements(self) -> int:
+        return self.period * 2
 
-        candles_to_fetch = self.period * 2
-        df = self.fetch(candles_to_fetch)
+    def reset_indicators(self) -> None:
+        self.rsi = StreamingRSI(self.period)
 
-        # Attach indicators 
-        df = self.attach_indicators(df)
-    
-        # Check for overbought/oversold 
-        valid = self.is_trade_valid(df)
+    def update_indicators(self, close: float) -> Dict[str, float]:
+        # Streaming equivalent of `attach_indicators()`
+        rsi = self.rsi.update(close)
+
+        calculated_side = 0
+        if rsi > self.overbought:
+            # Sell if overbought
+            calculated_side = int(Side.SELL.value)
+        if rsi < self.oversold:
+            # Buy if oversold
+            calculated_side = int(Side.BUY.value)
+
+        return {'rsi': rsi, 'calculated_side': calculated_side}
+
+    def stage(self, candle: Candles) -> bool:
+
+        # Advances the streaming RSI. Warms up from history on the first candle.
+        values = self.stream(candle)
+        if values is None:
+            return False
 
         # Get Last 
-        last = df.iloc[-1]
-        rsi = last['rsi'].item()
-        calculated_side = last['calculated_side'].item()
+        rsi = values['rsi']
+        calculated_side = values['calculated_side']
+
+        # Check for overbought/oversold 
+        valid = calculated_side != 0
 
         # Get Side 
         side = self.get_side(calculated_side)
@@ -129,6 +148,8 @@ class RSI(Strategy):
         return trade_result 
 
     def backtest(self) -> None:
+        from backtest.backtest import Backtest
+
         df = self.fetch(1000)
 
         df = self.attach_indicators(df)
@@ -0,0 +1,301 @@
+"""
+This module contains the tick-to-trade latency instrumentation: timing spans, aggregated into log-linear (HDR style)
+histograms per (strategy, symbol, phase).
+
+Phases of a confirmed candle:
+    ws_receive      - exchange message time to local receive (network and exchange delay)
+    candle          - `Candles` construction on the WebSocket thread
+    queue           - local receive to the start of the strategy stage (queueing and coalescing)
+    fetch           - `Strategy.fetch`
+    indicators      - streaming indicator update (`Strategy.stream`)
+    attach_indicators
+    signal          - signal decision of the strategy
+    risk            - TP/SL calculation
+    positions, mark_price, close, place_order
+                    - order pipeline steps (REST calls, or cached reads)
+    rest.<method>   - every REST call of the shared sessions, by symbol
+    stage           - the whole strategy stage
+    tick_to_trade   - local receive to the `place_order` acknowledgement
+
+Spans recorded before candles are routed to a strategy (ws_receive, candle, rest.<method>) have no strategy label.
+
+Instrumentation is disabled by default. When disabled, `span()` returns a shared no-op span, and `record()` returns
+immediately. When enabled, a span costs a clock read and a histogram increment.
+
+Example:
+    latency.enable()
+    with latency.span(strategy.name, symbol, 'fetch'):
+        df = strategy.fetch(100)
+    print(latency.snapshot())
+    latency.dump('reports/latency.json')
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from constants import constants as c
+
+_log = logging.getLogger(__name__)
+
+# Sub-buckets per power of two. Values are recorded with a relative error of at most 1 / SUB_BUCKETS.
+SUB_BITS = 5
+SUB_BUCKETS = 1 << SUB_BITS
+# Values (us) up to 2 ** MAX_BITS (~19 hours) are recorded. Larger values are recorded as the maximum.
+MAX_BITS = 36
+
+
+def bucket_index(value: int) -> int:
+    """
+    Returns the histogram bucket of a value (us)
+    """
+    if value < SUB_BUCKETS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+
+def bucket_value(index: int) -> int:
+    """
+    Returns the lowest value (us) of a histogram bucket
+    """
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return (index % SUB_BUCKETS + SUB_BUCKETS) << shift
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in microseconds, with a fixed number of buckets
+    """
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (bucket_index((1 << MAX_BITS) - 1) + 1)
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max = 0
+        self.lock = threading.Lock()
+
+    def record(self, micros: int) -> None:
+        index = min(bucket_index(micros), len(self.counts) - 1)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += micros
+            if self.min is None or micros < self.min:
+                self.min = micros
+            if micros > self.max:
+                self.max = micros
+
+    def percentile(self, q: float) -> int:
+        """
+        Returns the lowest value (us) of the bucket holding the q-th percentile
+
+        Parameters
+        ----------
+            q: float
+                Percentile, from 0 to 100
+        """
+        if not 0 <= q <= 100:
+            raise ValueError(f"Invalid percentile. Value must be between 0 and 100. Input: {q}")
+        with self.lock:
+            if self.count == 0:
+                return 0
+            rank = max(1, round(self.count * q / 100))
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(bucket_value(index), self.max)
+        return self.max
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Adds the values recorded by another histogram
+        """
+        with other.lock:
+            counts, count, total, low, high = list(other.counts), other.count, other.total, other.min, other.max
+        with self.lock:
+            self.counts = [a + b for a, b in zip(self.counts, counts)]
+            self.count += count
+            self.total += total
+            if low is not None and (self.min is None or low < self.min):
+                self.min = low
+            self.max = max(self.max, high)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Returns the count, and the mean, min, percentiles and max in microseconds
+        """
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count > 0 else 0.0,
+            'min': self.min or 0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max,
+        }
+
+
+class Span:
+    """
+    Records the duration of a `with` block
+    """
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.histogram.record(int((time.perf_counter() - self.start) * 1_000_000))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *args) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+_enabled = c.LATENCY_ENABLED
+# (strategy, symbol, phase) -> histogram
+_histograms: Dict[Tuple[str, str, str], LatencyHistogram] = dict()
+_histograms_lock = threading.Lock()
+# Receive time of the candle being staged on the current thread. See `mark_tick()`.
+_tick = threading.local()
+
+
+def enable(enabled: bool = True) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def clock() -> float:
+    """
+    Returns the current `time.perf_counter()` if enabled, otherwise 0
+    """
+    return time.perf_counter() if _enabled else 0.0
+
+
+def histogram(strategy: str, symbol: str, phase: str) -> LatencyHistogram:
+    """
+    Returns the histogram of a (strategy, symbol, phase), creating it on first use
+    """
+    key = (strategy, symbol, phase)
+    h = _histograms.get(key)
+    if h is None:
+        with _histograms_lock:
+            h = _histograms.setdefault(key, LatencyHistogram())
+    return h
+
+
+def span(strategy: str, symbol: str, phase: str):
+    """
+    Returns a span recording the duration of a `with` block. See module docstring.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(histogram(strategy, symbol, phase))
+
+
+def record(strategy: str, symbol: str, phase: str, seconds: float) -> None:
+    """
+    Records a duration in seconds
+    """
+    if not _enabled:
+        return
+    histogram(strategy, symbol, phase).record(int(seconds * 1_000_000))
+
+
+def mark_tick(received: float) -> None:
+    """
+    Sets the receive time (`clock()`) of the candle staged on the current thread. Read by `since_tick()`.
+    """
+    if _enabled:
+        _tick.received = received
+
+
+def since_tick() -> Optional[float]:
+    """
+    Returns the seconds since the receive time of the candle staged on the current thread, if known
+    """
+    received = getattr(_tick, 'received', 0.0) if _enabled else 0.0
+    if not received:
+        return None
+    return time.perf_counter() - received
+
+
+def snapshot() -> Dict[Tuple[str, str, str], Dict[str, float]]:
+    """
+    Returns the summary of every histogram, by (strategy, symbol, phase)
+    """
+    with _histograms_lock:
+        histograms = list(_histograms.items())
+    return {key: h.summary() for key, h in histograms}
+
+
+def phase_summary(phase: str) -> Dict[str, float]:
+    """
+    Returns the summary of a phase, over every strategy and symbol. Example: phase_summary('tick_to_trade')
+    """
+    merged = LatencyHistogram()
+    with _histograms_lock:
+        histograms = [h for key, h in _histograms.items() if key[2] == phase]
+    for h in histograms:
+        merged.merge(h)
+    return merged.summary()
+
+
+def reset() -> None:
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def dump(path: Optional[str] = None) -> Optional[str]:
+    """
+    Logs the summary of every histogram, and writes it as JSON. Returns the path of the file, or None if there were
+    no spans.
+
+    Parameters
+    ----------
+        path: str
+            Output file. Defaults to LATENCY_REPORT.
+    """
+    summaries = snapshot()
+    if len(summaries) == 0:
+        return None
+
+    path = path if path is not None else c.LATENCY_REPORT
+    rows = list()
+    for (strategy, symbol, phase), summary in sorted(summaries.items()):
+        rows.append({'strategy': strategy, 'symbol': symbol, 'phase': phase, **summary})
+        _log.info(f"Latency - {strategy} {symbol} {phase}: count: {summary['count']} p50: {summary['p50']}us "
+                  f"p99: {summary['p99']}us max: {summary['max']}us")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(rows, file, indent=2)
+    return path
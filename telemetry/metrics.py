@@ -0,0 +1,269 @@
+"""
+This module contains the runtime metrics of the trading loop, and an HTTP endpoint serving them in the Prometheus text
+format.
+
+Metrics are either counters incremented where events happen (`inc()`), or samples read from registered collectors
+when the endpoint is scraped (`register()`), e.g. queue depths. Latency histograms (see `telemetry.latency`) are
+served as summaries.
+
+    bybit_candles_total{strategy, symbol, state}            - received, processed, coalesced, dropped candles
+    bybit_strategy_errors_total{strategy, symbol}           - stages that raised an exception
+    bybit_strategy_queue_depth{strategy, symbol}            - queued candles
+    bybit_latency_seconds{strategy, symbol, phase}          - stage and REST durations (summary)
+    bybit_rest_requests_total{endpoint, symbol}
+    bybit_rest_errors_total{endpoint, symbol}               - exceptions and non-zero retCodes
+    bybit_orders_total{strategy, symbol, result}            - sent, failed
+    bybit_websocket_reconnects_total{stream}
+    bybit_scheduler_queue_depth{lane}                       - requests waiting for a rate limit token
+    bybit_scheduler_wait_seconds_total{lane}
+
+Example:
+    server = start_server(port=8000)
+    # curl http://127.0.0.1:8000/metrics
+"""
+
+import logging
+import math
+import threading
+import weakref
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from constants import constants as c
+from telemetry import latency
+
+_log = logging.getLogger(__name__)
+
+# Name -> (type, help)
+METRICS = {
+    'bybit_candles_total': ('counter', 'Confirmed candles by queue state'),
+    'bybit_strategy_errors_total': ('counter', 'Strategy stages that raised an exception'),
+    'bybit_strategy_queue_depth': ('gauge', 'Candles queued for a strategy'),
+    'bybit_latency_seconds': ('summary', 'Stage and REST call durations'),
+    'bybit_rest_requests_total': ('counter', 'REST requests by endpoint'),
+    'bybit_rest_errors_total': ('counter', 'REST requests that failed, or returned a non-zero retCode'),
+    'bybit_orders_total': ('counter', 'Orders by result'),
+    'bybit_websocket_reconnects_total': ('counter', 'WebSocket reconnects'),
+    'bybit_scheduler_queue_depth': ('gauge', 'REST requests waiting for a rate limit token'),
+    'bybit_scheduler_wait_seconds_total': ('counter', 'Time REST requests waited for a rate limit token'),
+}
+
+# Quantiles of the latency summaries, by summary key
+QUANTILES = {'p50': '0.5', 'p90': '0.9', 'p99': '0.99', 'p999': '0.999'}
+
+
+class Sample(NamedTuple):
+    name: str
+    labels: Dict[str, str]
+    value: float
+
+
+# (name, sorted labels) -> value
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+_counters_lock = threading.Lock()
+# Callables returning samples. Bound methods are held weakly, so registered objects can be garbage collected.
+_collectors: List[Any] = list()
+_collectors_lock = threading.Lock()
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    """
+    Increments a counter
+
+    Example:
+        inc('bybit_orders_total', strategy='MA Crossover', symbol='BTCUSDT', result='sent')
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _counters_lock:
+        _counters[key] += value
+
+
+def register(collector: Callable[[], Iterable[Sample]]) -> None:
+    """
+    Registers a callable returning samples, read on every scrape. Example: `strategy_queue.metrics`
+    """
+    reference = weakref.WeakMethod(collector) if hasattr(collector, '__self__') else (lambda: collector)
+    with _collectors_lock:
+        _collectors.append(reference)
+
+
+def count_reconnects(ws: Any, stream: str) -> Any:
+    """
+    Counts the reconnects of a connected pybit WebSocket in `bybit_websocket_reconnects_total`. pybit reconnects
+    without a callback, so every connection attempt after the first is counted.
+
+    Parameters
+    ----------
+        ws: WebSocket
+            Connected WebSocket
+
+        stream: str
+            Label of the connection. Example: linear, private
+    """
+    connect = getattr(ws, '_connect', None)
+    if connect is None:
+        return ws
+
+    def reconnect(*args, **kwargs):
+        inc('bybit_websocket_reconnects_total', stream=stream)
+        return connect(*args, **kwargs)
+
+    ws._connect = reconnect
+    return ws
+
+
+def reset() -> None:
+    # Clears the counters. Registered collectors are kept.
+    with _counters_lock:
+        _counters.clear()
+
+
+def samples() -> List[Sample]:
+    """
+    Returns the counters, the samples of every registered collector, and the latency summaries
+    """
+    with _counters_lock:
+        result = [Sample(name, dict(labels), value) for (name, labels), value in _counters.items()]
+
+    with _collectors_lock:
+        live = [(reference, reference()) for reference in _collectors]
+        _collectors[:] = [reference for reference, collector in live if collector is not None]
+    for _, collector in live:
+        if collector is None:
+            continue
+        try:
+            result.extend(collector())
+        except Exception as e:
+            _log.error(f"Metrics collector failed. {e}")
+
+    for (strategy, symbol, phase), summary in latency.snapshot().items():
+        labels = {'strategy': strategy, 'symbol': symbol, 'phase': phase}
+        for key, quantile in QUANTILES.items():
+            result.append(Sample('bybit_latency_seconds', {**labels, 'quantile': quantile}, summary[key] / 1e6))
+        result.append(Sample('bybit_latency_seconds_sum', labels, summary['mean'] * summary['count'] / 1e6))
+        result.append(Sample('bybit_latency_seconds_count', labels, summary['count']))
+    return result
+
+
+def render() -> str:
+    """
+    Returns every sample in the Prometheus text format
+    """
+    families: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples():
+        family = sample.name
+        for suffix in ('_sum', '_count'):
+            if family.endswith(suffix) and family[:-len(suffix)] in METRICS:
+                family = family[:-len(suffix)]
+        families[family].append(sample)
+
+    lines = list()
+    for family in sorted(families):
+        kind, description = METRICS.get(family, ('untyped', family))
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {kind}")
+        for sample in families[family]:
+            lines.append(f"{sample.name}{_labels(sample.labels)} {_value(sample.value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    HTTP server serving `render()` on /metrics, on a daemon thread
+    """
+
+    def __init__(self, host: str = c.METRICS_HOST, port: int = c.METRICS_PORT):
+        """
+        Parameters
+        ----------
+            host: str
+                Interface to listen on
+
+            port: int
+                Port to listen on. A free port is picked if 0.
+        """
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> None:
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+            self.thread.start()
+            _log.info(f"Serving metrics on port {self.port}")
+
+    def stop(self) -> None:
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
+
+
+_server: Optional[MetricsServer] = None
+_server_lock = threading.Lock()
+
+
+def start_server(host: str = c.METRICS_HOST, port: int = c.METRICS_PORT) -> Optional[MetricsServer]:
+    """
+    Starts the metrics endpoint of the process, once. Later calls return the running server.
+
+    Returns None if the port cannot be bound (e.g. used by another strategy process). Trading is not stopped by a
+    missing endpoint.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = MetricsServer(host, port)
+            except OSError as e:
+                _log.warning(f"Metrics endpoint not started on {host}:{port}. {e}")
+                return None
+            _server.start()
+        return _server
+
+
+# -------------------- Private Functions -------------------- #
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are not logged
+        pass
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if len(labels) == 0:
+        return ''
+    escaped = (f'{k}="{_escape(str(v))}"' for k, v in sorted(labels.items()))
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
@@ -1,27 +1,75 @@
-from dataclasses import dataclass 
+from typing import Any, Dict, Optional
 
 
-@dataclass 
 class Candles:
     """
-    Contains information on latest ticker values 
+    Contains information on latest ticker values
+
+    Fields are typed: prices and volumes are floats, times are ints (ms). Values received as strings from ByBit are
+    converted once, on construction. Slots keep each candle a fixed-size record, without an attribute dictionary.
     """
-    symbol: str
-    start: int 
-    end: int 
-    interval: str 
-    open: float 
-    close: float 
-    high: float 
-    low: float 
-    volume: float 
-    turnover: float 
-    confirm: bool 
-    timestamp: int 
+    __slots__ = ('symbol', 'start', 'end', 'interval', 'open', 'close', 'high', 'low', 'volume', 'turnover',
+                 'confirm', 'timestamp', 'received')
+
+    def __init__(
+            self,
+            symbol: str,
+            start: int,
+            end: int,
+            interval: str,
+            open: float,
+            close: float,
+            high: float,
+            low: float,
+            volume: float,
+            turnover: float,
+            confirm: bool,
+            timestamp: int,
+            received: float = 0.0):
+        self.symbol = symbol
+        self.start = int(start)
+        self.end = int(end)
+        self.interval = str(interval)
+        self.open = float(open)
+        self.close = float(close)
+        self.high = float(high)
+        self.low = float(low)
+        self.volume = float(volume)
+        self.turnover = float(turnover)
+        self.confirm = bool(confirm)
+        self.timestamp = int(timestamp)
+        # Local receive time, from `latency.clock()`. Set by the WebSocket handlers when latency spans are enabled.
+        self.received = received
+
+    @classmethod
+    def from_kline(cls, symbol: str, data: Dict[str, Any], received: float = 0.0) -> Optional["Candles"]:
+        """
+        Returns a confirmed candle of a kline stream message, or None if the candle is still open. Nothing is
+        constructed for open candles, which are most of the stream.
+
+        Parameters
+        ----------
+            symbol: str
+                Symbol of the message topic
+
+            data: dict
+                Element of the message `data`, as received from bybit
+        """
+        if not data['confirm']:
+            return None
+        return cls(symbol, data['start'], data['end'], data['interval'], data['open'], data['close'], data['high'],
+                   data['low'], data['volume'], data['turnover'], True, data['timestamp'], received)
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{s}={getattr(self, s)!r}" for s in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
 
     def info(self):
         message = f"{self.symbol} Open: {self.open} High: {self.high} Low: {self.low} Close: {self.close} Volume: \
             {self.volume}"
         return message
-
-
@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class OpenOrder:
+    symbol: str
+    order_id: str
+    side: str
+    order_type: str
+    qty: str
+    price: str
+    status: str
+    reduce_only: bool
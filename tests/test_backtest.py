@@ -0,0 +1,196 @@
+"""
+Tests the functions in the `backtest` module.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+
+from backtest import batch, kernel, sweep
+from backtest.backtest import Backtest
+from backtest.metrics import Metrics
+from templates.indicator import MAType
+from templates.intervals import Timeframes
+
+
+@dataclass
+class SweepConfigs:
+    fast_ma_period: int = 20
+    slow_ma_period: int = 100
+    ma_kind: str = "SIMPLE"
+
+
+class TestSweep(unittest.TestCase):
+    """
+    Tests the parameter sweep helpers
+    """
+
+    def test_expand_grid(self):
+        """
+        Tests that the grid is expanded into every combination, keeping defaults for other parameters
+        """
+        configs = sweep.expand_grid(SweepConfigs, {"fast_ma_period": [10, 20], "slow_ma_period": [50, 100, 200]})
+        self.assertEqual(len(configs), 6)
+        self.assertTrue(all(c["ma_kind"] == "SIMPLE" for c in configs))
+        self.assertIn({"fast_ma_period": 20, "slow_ma_period": 50, "ma_kind": "SIMPLE"}, configs)
+
+        # Test invalid parameter
+        self.assertRaises(ValueError, sweep.expand_grid, SweepConfigs, {"period": [1]})
+
+    def test_parse_grid(self):
+        """
+        Tests parsing grid items from the command line
+        """
+        grid = sweep.parse_grid(["fast_ma_period=10,20", "threshold=0.5", "ma_kind=SIMPLE,EXPONENTIAL"])
+        self.assertEqual(grid, {"fast_ma_period": [10, 20], "threshold": [0.5], "ma_kind": ["SIMPLE", "EXPONENTIAL"]})
+        self.assertRaises(ValueError, sweep.parse_grid, ["fast_ma_period"])
+
+
+class TestKernel(unittest.TestCase):
+    """
+    Tests the broadcasted backtest kernel against the pandas implementation
+    """
+
+    def setUp(self) -> None:
+        """
+        Sets up the parameters for testing
+        """
+        rng = np.random.default_rng(3)
+        self.close = 100 + np.cumsum(rng.normal(0, 1, 500))
+
+    def test_ma_matrix(self):
+        """
+        Tests that moving averages match pandas for every period
+        """
+        series = pd.Series(self.close)
+        sma = kernel.ma_matrix(self.close, [5, 20], MAType.SIMPLE)
+        ema = kernel.ma_matrix(self.close, [5, 20], MAType.EXPONENTIAL)
+        for i, period in enumerate([5, 20]):
+            np.testing.assert_allclose(sma[:, i], series.rolling(period).mean(), rtol=1e-9)
+            np.testing.assert_allclose(ema[:, i], series.ewm(span=period).mean(), rtol=1e-9)
+        # Periods longer than the series give NaN columns
+        self.assertTrue(np.isnan(kernel.sma_matrix(self.close[:3], [5])).all())
+
+    def test_evaluate(self):
+        """
+        Tests that a matrix of signals gives the same returns as `Backtest.start` for each column
+        """
+        sma = kernel.sma_matrix(self.close, [10, 50])
+        sides = kernel.crossover_sides(sma[:, [0]], sma[:, [1]])
+        results = kernel.evaluate(self.close, np.hstack([sides, -sides]))
+
+        data = pd.DataFrame({"Close": self.close, "calculated_side": sides[:, 0]})
+        backtest = Backtest.start(data)
+        expected = backtest['cumm_returns'].iloc[-1]
+        self.assertAlmostEqual(results['total_return'][0], expected)
+        self.assertAlmostEqual(results['total_return'][1], -expected)
+        self.assertEqual(results['position_changes'][0], np.count_nonzero(np.diff(backtest['signal'].fillna(0))))
+
+    def test_ma_cross_grid(self):
+        """
+        Tests that only pairs where fast < slow are evaluated
+        """
+        results = kernel.ma_cross_grid(self.close, [5, 10, 60], [20, 50])
+        self.assertEqual(len(results), 4)
+        self.assertTrue((results['fast_ma_period'] < results['slow_ma_period']).all())
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Tests the single-pass performance metrics
+    """
+
+    def test_summary(self):
+        """
+        Tests drawdown, trade and exposure metrics on a known sequence
+        """
+        returns = np.array([np.nan, 0.1, -0.2, 0.05, 0.0, 0.3])
+        positions = np.array([0, 1, 1, -1, 0, 1])
+        summary = Metrics().extend(returns, positions).summary()
+
+        self.assertAlmostEqual(summary['total_return'], 0.25)
+        self.assertAlmostEqual(summary['max_drawdown'], 0.2)
+        self.assertEqual(summary['max_drawdown_bars'], 3)
+        self.assertEqual(summary['trades'], 3)
+        self.assertAlmostEqual(summary['win_rate'], 2 / 3)
+        self.assertAlmostEqual(summary['profit_factor'], 0.35 / 0.1)
+        self.assertAlmostEqual(summary['exposure'], 4 / 6)
+        self.assertEqual(summary['turnover'], 5)
+
+    def test_flat_trades(self):
+        """
+        Tests that trades with a return of 0, closed or still open, are counted
+        """
+        returns = np.array([np.nan, 0.1, 0.0, 0.0, 0.0, 0.0, 0.0])
+        positions = np.array([0, 1, 0, -1, -1, 0, 1])
+        summary = Metrics().extend(returns, positions).summary()
+
+        self.assertEqual(summary['trades'], 3)
+        self.assertAlmostEqual(summary['win_rate'], 1 / 3)
+
+    def test_incremental(self):
+        """
+        Tests that updating bar by bar gives the same metrics as a single pass, and matches the kernel
+        """
+        rng = np.random.default_rng(5)
+        returns = rng.normal(0, 0.01, 1000)
+        positions = np.sign(rng.normal(0, 1, 1000))
+
+        incremental = Metrics(periods_per_year=525600)
+        for value, position in zip(returns, positions):
+            incremental.update(value, position)
+        single_pass = Metrics(periods_per_year=525600).extend(returns, positions).summary()
+        for key, value in single_pass.items():
+            self.assertAlmostEqual(incremental.summary()[key], value)
+
+        summary = kernel.summarize(returns, positions)
+        self.assertAlmostEqual(Metrics().extend(returns).summary()['sharpe'], summary['sharpe_per_bar'][0])
+        self.assertAlmostEqual(single_pass['max_drawdown'], summary['max_drawdown'][0])
+
+
+class TestBatch(unittest.TestCase):
+    """
+    Tests the headless batch runner
+    """
+
+    def test_parse_job(self):
+        """
+        Tests that jobs are parsed from the command line, with defaults for symbol and interval
+        """
+        job = batch.BacktestJob.parse("ma_cross:default.ini:ETHUSDT:MIN_5")
+        self.assertEqual(job, batch.BacktestJob("ma_cross", "default.ini", "ETHUSDT", "MIN_5"))
+        self.assertEqual(job.name, "ma_cross_default_ETHUSDT_MIN_5")
+        self.assertEqual(batch.BacktestJob.parse("rsi:default.ini").interval, Timeframes.MIN_1.name)
+
+        with self.assertRaises(ValueError):
+            batch.BacktestJob.parse("ma_cross")
+        with self.assertRaises(ValueError):
+            batch.BacktestJob.parse("ma_cross:default.ini:BTCUSDT:MIN_2")
+
+    def test_periods_per_year(self):
+        self.assertEqual(batch.periods_per_year(Timeframes.MIN_1), 525600)
+        self.assertEqual(batch.periods_per_year(Timeframes.MIN_15), 35040)
+        self.assertEqual(batch.periods_per_year(Timeframes.D_1), 365)
+
+    def test_write_report(self):
+        """
+        Tests that the equity curve, data and metrics are written to files
+        """
+        index = pd.date_range("2024-01-01", periods=50, freq="min")
+        close = pd.Series(np.linspace(100, 110, 50), index=index)
+        bt = Backtest(pd.DataFrame({'close': close, 'calculated_side': 1}, index=index))
+        metrics = bt.metrics()
+
+        with tempfile.TemporaryDirectory() as directory:
+            batch.write_report("job", bt.backtest_data, metrics, directory)
+            for extension in ['png', 'csv', 'json']:
+                self.assertTrue(os.path.isfile(os.path.join(directory, f"job.{extension}")))
+            with open(os.path.join(directory, "job.json")) as file:
+                written = json.load(file)
+            self.assertAlmostEqual(written['total_return'], metrics['total_return'])
+            # Infinite profit factor (no losing trades) is written as a string
+            self.assertEqual(written['profit_factor'], 'inf')
@@ -0,0 +1,170 @@
+"""
+Tests the classes in the `strategies.base` module.
+"""
+
+import threading
+import time
+import unittest
+
+from configs.trade_cfg import TradeConfig
+from exchange.state import AccountState
+from market_data.tickers import TickerCache
+from strategies.base.execution import OrderPipeline, close_side
+from templates.intervals import Timeframes
+from templates.side import Side
+
+
+class FakeSession:
+    """
+    Serves position, ticker and order requests with a fixed round trip time, and records the order of requests.
+    """
+    def __init__(self, positions: list, latency: float = 0.05):
+        self.positions = positions
+        self.latency = latency
+        self.orders = list()
+        self.ticker_requests = 0
+        self.position_requests = 0
+        self.batches = 0
+        self.lock = threading.Lock()
+
+    def get_positions(self, category: str, symbol: str):
+        time.sleep(self.latency)
+        self.position_requests += 1
+        return {"result": {"list": self.positions}}
+
+    def get_tickers(self, category: str, symbol: str):
+        time.sleep(self.latency)
+        self.ticker_requests += 1
+        return {"result": {"list": [{"markPrice": "100.0"}]}}
+
+    def place_order(self, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.orders.append(kwargs)
+            order_id = str(len(self.orders))
+        return {"retCode": 0, "retMsg": "OK", "result": {"orderId": order_id}}
+
+    def place_batch_order(self, category: str, request: list):
+        time.sleep(self.latency)
+        with self.lock:
+            self.batches += 1
+            self.orders.extend(request)
+            count = len(self.orders)
+        legs = [{"symbol": r["symbol"], "orderId": str(count - len(request) + i + 1)} for i, r in enumerate(request)]
+        return {"retCode": 0, "retMsg": "OK", "result": {"list": legs},
+                "retExtInfo": {"list": [{"code": 0, "msg": "OK"} for _ in request]}}
+
+
+class TestOrderPipeline(unittest.TestCase):
+    """
+    Tests overlapping of order REST calls
+    """
+
+    def setUp(self) -> None:
+        self.config = TradeConfig(symbol='BTCUSDT', interval=Timeframes.MIN_1, channel='linear')
+        self.positions = [
+            {"symbol": "BTCUSDT", "side": "Buy", "size": "0.001", "positionIdx": 1},
+            {"symbol": "BTCUSDT", "side": "Sell", "size": "0.002", "positionIdx": 2},
+            {"symbol": "BTCUSDT", "side": "", "size": "0", "positionIdx": 0},
+        ]
+
+    def test_execute(self):
+        """
+        Tests that open positions are closed before the new order is sent, in less than the sequential time
+        """
+        session = FakeSession(self.positions)
+        report = OrderPipeline(session, self.config).execute(Side.SELL)
+
+        self.assertTrue(report.success, report.error)
+        self.assertEqual(report.closed, 2)
+        self.assertEqual(report.mark_price, 100.0)
+        self.assertEqual(len(session.orders), 3)
+        self.assertTrue(all(order['reduceOnly'] for order in session.orders[:2]))
+        self.assertEqual({order['side'] for order in session.orders[:2]}, {'Buy', 'Sell'})
+        self.assertEqual(session.orders[2]['side'], 'Sell')
+        self.assertEqual(session.orders[2]['takeProfit'], str(report.take_profit))
+        self.assertEqual(session.orders[2]['stopLoss'], str(report.stop_loss))
+        self.assertEqual(report.order_id, '3')
+        self.assertEqual(session.batches, 1)
+
+        # Sequential: 2 reads + 2 closes + 1 order. Pipelined: 1 read + 1 batch close + 1 order.
+        self.assertLess(report.total, 4 * session.latency * 1000)
+        self.assertIn('place_order', report.timings)
+
+    def test_failure(self):
+        """
+        Tests that a rejected close leg stops the new order, and is reported
+        """
+        session = FakeSession(self.positions[:1], latency=0)
+        session.place_batch_order = lambda category, request: {
+            "retCode": 0, "retMsg": "OK", "result": {"list": [{"symbol": "BTCUSDT", "orderId": ""}]},
+            "retExtInfo": {"list": [{"code": 110017, "msg": "Rejected"}]}
+        }
+        report = OrderPipeline(session, self.config).execute(Side.BUY)
+
+        self.assertFalse(report.success)
+        self.assertIn("Rejected", report.error)
+
+    def test_cached_mark_price(self):
+        """
+        Tests that the mark price is read from the ticker cache, with a REST fallback when stale
+        """
+        session = FakeSession([], latency=0)
+        tickers = TickerCache('linear', max_age=60, websocket=object())
+        pipeline = OrderPipeline(session, self.config, tickers=tickers)
+
+        self.assertEqual(pipeline.get_mark_price(), 100.0)
+        self.assertEqual(session.ticker_requests, 1)
+
+        tickers.handler({"ts": 0, "data": {"symbol": "BTCUSDT", "markPrice": "101.5", "lastPrice": "101.4"}})
+        report = pipeline.execute(Side.BUY)
+        self.assertEqual(report.mark_price, 101.5)
+        self.assertEqual(session.ticker_requests, 1)
+
+        tickers.max_age = -1
+        self.assertEqual(pipeline.get_mark_price(), 100.0)
+        self.assertEqual(session.ticker_requests, 2)
+
+    def test_account_state(self):
+        """
+        Tests that positions to close are read from the account state instead of REST
+        """
+        session = FakeSession(self.positions, latency=0)
+        session.get_open_orders = lambda category, symbol: {"result": {"list": []}}
+        account = AccountState(session, 'linear', websocket=object(), reconcile_interval=0)
+        account.track('BTCUSDT')
+        self.assertEqual(session.position_requests, 1)
+
+        pipeline = OrderPipeline(session, self.config, account=account)
+        report = pipeline.execute(Side.BUY)
+        self.assertEqual(report.closed, 2)
+        self.assertEqual(session.position_requests, 1)
+
+    def test_stale_position(self):
+        """
+        Tests that a close rejected because the position was already closed (e.g. by its TP/SL) does not stop the new
+        order, once the position is confirmed flat with REST
+        """
+        session = FakeSession(self.positions, latency=0)
+        session.get_open_orders = lambda category, symbol: {"result": {"list": []}}
+        account = AccountState(session, 'linear', websocket=object(), reconcile_interval=0)
+        account.track('BTCUSDT')
+
+        # The positions are closed on the exchange, and the private stream has not delivered the fills yet
+        session.positions = []
+        session.place_batch_order = lambda category, request: {
+            "retCode": 0, "retMsg": "OK", "result": {"list": [{"symbol": "BTCUSDT", "orderId": ""}] * len(request)},
+            "retExtInfo": {"list": [{"code": 110017, "msg": "current position is zero"}] * len(request)}
+        }
+        report = OrderPipeline(session, self.config, account=account).execute(Side.BUY)
+
+        self.assertTrue(report.success, report.error)
+        self.assertEqual(report.closed, 2)
+        self.assertEqual(session.orders[-1]['side'], 'Buy')
+        self.assertEqual(account.get_positions('BTCUSDT'), [])
+
+    def test_close_side(self):
+        self.assertEqual(close_side("Buy"), "Sell")
+        self.assertEqual(close_side("Sell"), "Buy")
+        with self.assertRaises(ValueError):
+            close_side("None")
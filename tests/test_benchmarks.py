@@ -0,0 +1,74 @@
+"""
+Tests the helpers of the `benchmarks` module.
+"""
+
+import sys
+import unittest
+from unittest import mock
+
+from benchmarks import bench
+from market_data.store import parse_klines
+
+
+class TestBench(unittest.TestCase):
+    """
+    Tests the synthetic data and regression checks of the benchmark suite
+    """
+
+    def test_synthetic_data(self):
+        """
+        Tests that a canned kline payload parses back into the synthetic series
+        """
+        df = bench.synthetic_ohlcv(500)
+        self.assertEqual(len(df), 500)
+        self.assertTrue((df['High'] >= df[['Open', 'Close']].max(axis=1)).all())
+        self.assertTrue((df['Low'] <= df[['Open', 'Close']].min(axis=1)).all())
+
+        parsed = parse_klines(bench.kline_payload(500))
+        self.assertTrue(parsed.index.equals(df.index))
+        self.assertTrue(parsed['Close'].equals(df['Close']))
+
+    def test_regressions(self):
+        baseline = {r.key: r for r in [bench.Result('a', 10, 1.0, 1.0, 5), bench.Result('b', 10, 1.0, 1.0, 5)]}
+        results = [bench.Result('a', 10, 1.3, 1.2, 5), bench.Result('b', 10, 1.1, 1.0, 5),
+                   bench.Result('c', 10, 9.0, 9.0, 5)]
+        found = bench.regressions(results, baseline, threshold=0.2)
+        self.assertEqual(len(found), 1)
+        self.assertTrue(found[0].startswith('a[10]'))
+
+    def test_run(self):
+        """
+        Tests that benchmarks run on small series
+        """
+        results = bench.run([100], repeat=1, name_filter='Backtest', candles=10)
+        self.assertEqual([r.key for r in results], ['Backtest.start[100]'])
+        self.assertGreater(results[0].median, 0)
+
+    def test_filter(self):
+        """
+        Tests that inputs are only built for benchmarks that pass the filter. A series of 10^12 bars cannot be built.
+        """
+        results = bench.run([10 ** 12], repeat=1, name_filter='Candles', candles=10)
+        self.assertEqual([r.key for r in results], ['Candles[10]', 'Candles.from_kline[10]'])
+
+    def test_missing_dependency(self):
+        """
+        Tests that a strategy whose indicator dependency is missing is skipped
+        """
+        with mock.patch.dict(sys.modules, {'pandas_ta': None}):
+            instances = bench.strategies()
+        self.assertNotIn('RSI', instances)
+        self.assertIn('MACross', instances)
+
+    def test_failed_benchmark(self):
+        """
+        Tests that a failing benchmark is logged, and does not stop the others
+        """
+        def fail(data):
+            raise ImportError("No module named 'missing'")
+
+        benchmarks = [bench.Benchmark('Failing', 10, list, fail), bench.Benchmark('Passing', 10, list, len)]
+        with mock.patch.object(bench, 'benchmarks', lambda sizes, candles: iter(benchmarks)):
+            with self.assertLogs('benchmarks.bench', level='ERROR'):
+                results = bench.run([10], repeat=1)
+        self.assertEqual([r.key for r in results], ['Passing[10]'])
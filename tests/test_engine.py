@@ -0,0 +1,379 @@
+"""
+Tests the classes in the `engine` module.
+"""
+
+import gc
+import os
+import signal
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from configs.trade_cfg import TradeConfig
+from engine.dispatcher import Dispatcher, kline_topic
+from engine.fleet import Fleet, Manifest
+from engine.replay import ReplaySession, StreamRecorder, StreamReplayer, read_records, replay_strategy
+from engine.workers import StrategyQueue, WorkerPool
+from mock_exchange.exchange import ExchangeConfig, MockExchange, MockWebSocket
+from session import bybit_session
+from strategies.registry import load_strategy
+from templates.candles import Candles
+from market_data.window import CandleWindow
+from templates.intervals import Timeframes
+
+
+class FakeWebSocket:
+    """
+    Records kline subscriptions instead of connecting to ByBit.
+    """
+    def __init__(self):
+        self.subscriptions = list()
+        self.closed = False
+
+    def kline_stream(self, interval, symbol, callback):
+        self.subscriptions.append((interval, list(symbol)))
+
+    def exit(self):
+        self.closed = True
+
+
+def kline_message(symbol: str, minute: int, confirm: bool = True, interval: int = 1) -> dict:
+    start = minute * 60_000
+    return {
+        "topic": f"kline.{interval}.{symbol}",
+        "data": [{
+            "start": start, "end": start + 59_999, "interval": str(interval),
+            "open": "1", "close": str(minute), "high": "2", "low": "0.5",
+            "volume": "10", "turnover": "100", "confirm": confirm, "timestamp": start + 59_999
+        }]
+    }
+
+
+class TestDispatcher(unittest.TestCase):
+    """
+    Tests routing of kline messages to strategies on a single connection
+    """
+
+    def setUp(self) -> None:
+        self.ws = FakeWebSocket()
+        self.dispatcher = Dispatcher(channel='linear', websocket=self.ws)
+        self.btc = TradeConfig(symbol='BTCUSDT', interval=Timeframes.MIN_1, channel='linear')
+        self.eth = TradeConfig(symbol='ETHUSDT', interval=Timeframes.MIN_1, channel='linear')
+
+    def tearDown(self) -> None:
+        self.dispatcher.terminate()
+
+    def test_subscribe(self):
+        """
+        Tests that every topic is subscribed once, on the same connection
+        """
+        self.dispatcher.register(self.btc, lambda candle: None)
+        self.dispatcher.register(self.btc, lambda candle: None)
+        self.dispatcher.register(self.eth, lambda candle: None)
+        self.dispatcher.run()
+
+        self.assertEqual(self.ws.subscriptions, [(1, ['BTCUSDT', 'ETHUSDT'])])
+        self.assertEqual(kline_topic(self.btc), "kline.1.BTCUSDT")
+
+        with self.assertRaises(ValueError):
+            self.dispatcher.register(TradeConfig('BTCUSDT', Timeframes.MIN_1, 'spot'), lambda candle: None)
+
+    def test_routing(self):
+        """
+        Tests that confirmed candles reach every strategy of their topic only, and feed their windows
+        """
+        received = {'btc_1': [], 'btc_2': [], 'eth': []}
+        window = CandleWindow(10)
+        self.dispatcher.register(self.btc, lambda candle: received['btc_1'].append(candle), window=window)
+        self.dispatcher.register(self.btc, lambda candle: received['btc_2'].append(candle))
+        self.dispatcher.register(self.eth, lambda candle: received['eth'].append(candle))
+        self.dispatcher.run()
+
+        self.dispatcher.handler(kline_message('BTCUSDT', 1))
+        self.dispatcher.handler(kline_message('BTCUSDT', 2, confirm=False))
+        self.dispatcher.handler(kline_message('ETHUSDT', 1))
+        self.dispatcher.handler(kline_message('SOLUSDT', 1))
+        self.dispatcher.pool.shutdown(wait=True)
+
+        self.assertEqual([c.symbol for c in received['btc_1']], ['BTCUSDT'])
+        self.assertEqual([c.symbol for c in received['btc_2']], ['BTCUSDT'])
+        self.assertEqual([c.symbol for c in received['eth']], ['ETHUSDT'])
+        self.assertEqual(window.last_timestamp, 60_000)
+
+    def test_slow_strategy(self):
+        """
+        Tests that a blocked strategy does not delay the socket thread, or other strategies
+        """
+        release = threading.Event()
+        delivered = threading.Event()
+        self.dispatcher.register(self.btc, lambda candle: release.wait(5))
+        self.dispatcher.register(self.btc, lambda candle: delivered.set())
+        self.dispatcher.run()
+
+        self.dispatcher.handler(kline_message('BTCUSDT', 1))
+        self.assertTrue(delivered.wait(5))
+        release.set()
+
+
+class TestStrategyQueue(unittest.TestCase):
+    """
+    Tests off-thread strategy execution and coalescing of stale candles
+    """
+
+    def setUp(self) -> None:
+        self.pool = WorkerPool(workers=2)
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.staged = list()
+
+    def tearDown(self) -> None:
+        self.release.set()
+        self.pool.shutdown(wait=True)
+
+    def stage(self, candle: Candles) -> None:
+        # Blocks on the first candle until released
+        self.staged.append(int(candle.close))
+        self.started.set()
+        self.release.wait(5)
+
+    @staticmethod
+    def candle(minute: int) -> Candles:
+        start = minute * 60_000
+        return Candles('BTCUSDT', start, start + 59_999, '1', 1.0, float(minute), 2.0, 0.5, 10.0, 100.0, True, start)
+
+    def test_coalesce(self):
+        """
+        Tests that candles queued while the strategy is busy are coalesced into the newest, and all reach the window
+        """
+        window = CandleWindow(10)
+        strategy_queue = StrategyQueue('test', self.stage, self.pool, window=window)
+
+        strategy_queue.submit(self.candle(1))
+        self.assertTrue(self.started.wait(5))
+        for minute in range(2, 5):
+            strategy_queue.submit(self.candle(minute))
+        self.release.set()
+        self.pool.shutdown(wait=True)
+
+        self.assertEqual(self.staged, [1, 4])
+        self.assertEqual(len(window), 4)
+        stats = strategy_queue.stats()
+        self.assertEqual((stats['received'], stats['processed'], stats['coalesced']), (4, 2, 2))
+        self.assertFalse(strategy_queue.busy)
+
+    def test_bounded(self):
+        """
+        Tests that the oldest candles are dropped when the queue is full
+        """
+        strategy_queue = StrategyQueue('test', self.stage, self.pool, capacity=2)
+
+        strategy_queue.submit(self.candle(1))
+        self.assertTrue(self.started.wait(5))
+        for minute in range(2, 6):
+            strategy_queue.submit(self.candle(minute))
+        self.assertEqual(strategy_queue.stats()['pending'], 2)
+        self.release.set()
+        self.pool.shutdown(wait=True)
+
+        self.assertEqual(self.staged, [1, 5])
+        self.assertEqual(strategy_queue.stats()['dropped'], 2)
+
+    def test_error(self):
+        """
+        Tests that a failing strategy keeps receiving candles
+        """
+        def stage(candle: Candles) -> None:
+            self.staged.append(int(candle.close))
+            raise RuntimeError("Order failed")
+
+        strategy_queue = StrategyQueue('test', stage, self.pool)
+        strategy_queue.submit(self.candle(1))
+        self.pool.shutdown(wait=True)
+        strategy_queue.submit(self.candle(2))
+        self.pool.shutdown(wait=True)
+
+        self.assertEqual(self.staged, [1, 2])
+        self.assertEqual(strategy_queue.stats()['errors'], 2)
+
+
+class TestReplay(unittest.TestCase):
+    """
+    Tests recording and replaying of kline streams
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'BTCUSDT.rec')
+        self.btc = TradeConfig(symbol='BTCUSDT', interval=Timeframes.MIN_1, channel='linear')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """
+        Tests that recorded messages are replayed in order into a handler, and that a truncated record is ignored
+        """
+        recorder = StreamRecorder(self.path)
+        dispatcher = Dispatcher(channel='linear', websocket=FakeWebSocket(), recorder=recorder)
+        dispatcher.register(self.btc, lambda candle: None)
+        dispatcher.run()
+        for minute in range(1, 4):
+            dispatcher.handler(kline_message('BTCUSDT', minute, confirm=False))
+            dispatcher.handler(kline_message('BTCUSDT', minute))
+        dispatcher.terminate()
+        self.assertEqual(recorder.count, 6)
+
+        with open(self.path, 'ab') as file:
+            file.write(b'\x01\x02\x03')
+
+        received = list()
+        stats = StreamReplayer(self.path).replay(received.append, speed=0)
+
+        self.assertEqual(stats.messages, 6)
+        self.assertEqual(received[-1], kline_message('BTCUSDT', 3))
+        self.assertEqual([m['data'][0]['confirm'] for m in received], [False, True] * 3)
+
+    def test_speed(self):
+        """
+        Tests that messages are replayed at the recorded pace, scaled by the speed
+        """
+        with StreamRecorder(self.path) as recorder:
+            recorder.record(kline_message('BTCUSDT', 1), received=0)
+            recorder.record(kline_message('BTCUSDT', 2), received=200_000_000)
+
+        stats = StreamReplayer(self.path).replay(lambda contents: None, speed=2)
+        self.assertEqual([r for r, _ in read_records(self.path)], [0, 200_000_000])
+        self.assertAlmostEqual(stats.duration, 0.2)
+        self.assertGreaterEqual(stats.elapsed, 0.1)
+
+        with self.assertRaises(ValueError):
+            StreamReplayer(self.path).replay(lambda contents: None, speed=-1)
+
+    def test_session(self):
+        """
+        Tests that the replay session serves klines and mark prices up to the replayed message, and acknowledges
+        orders
+        """
+        session = ReplaySession()
+        closes = list()
+
+        def handler(contents):
+            klines = session.get_kline(category='linear', symbol='BTCUSDT', interval=1, limit=2)['result']['list']
+            closes.append([row[4] for row in klines])
+
+        with StreamRecorder(self.path) as recorder:
+            for minute in range(1, 4):
+                recorder.record(kline_message('BTCUSDT', minute))
+        StreamReplayer(self.path, session).replay(handler, speed=None)
+
+        self.assertEqual(closes, [['1'], ['2', '1'], ['3', '2']])
+        ticker = session.get_tickers(category='linear', symbol='BTCUSDT')['result']['list'][0]
+        self.assertEqual(ticker['markPrice'], '3')
+
+        first = session.place_order(category='linear', symbol='BTCUSDT', side='Buy', qty='0.001')
+        batch = session.place_batch_order(category='linear', request=[{'symbol': 'BTCUSDT', 'side': 'Sell'}])
+        self.assertEqual(first['result']['orderId'], 'replay-1')
+        self.assertEqual(batch['result']['list'][0]['orderId'], 'replay-2')
+        self.assertEqual(len(session.orders), 2)
+        self.assertEqual(session.get_positions(category='linear')['result']['list'], [])
+
+    def test_deterministic(self):
+        """
+        Tests that a replay as fast as possible stages every confirmed candle, and sends the same orders every time
+        """
+        with StreamRecorder(self.path) as recorder:
+            for minute in range(1, 301):
+                # Two open candle updates, then the confirmed candle. Closes follow a zig-zag, to cross the averages.
+                close = 100 + (minute % 40 if minute % 80 < 40 else 40 - minute % 40)
+                for confirm in (False, False, True):
+                    message = kline_message('BTCUSDT', minute, confirm=confirm)
+                    message['data'][0]['close'] = str(close)
+                    recorder.record(message)
+
+        runs = list()
+        for _ in range(2):
+            strategy = load_strategy('ma_cross')(config=self.btc, strategy_config={
+                "fast_ma_period": "5", "slow_ma_period": "20", "ma_kind": "SIMPLE"})
+            stats, session, trade_main = replay_strategy(self.path, strategy, speed=0)
+            counters = trade_main.queue.stats()
+            self.assertEqual(stats.messages, 900)
+            self.assertEqual(counters['processed'], counters['received'])
+            self.assertEqual(counters['received'], 300)
+            runs.append([(o['side'], o.get('reduceOnly', False)) for o in session.orders])
+
+        self.assertGreater(len(runs[0]), 0)
+        self.assertEqual(runs[0], runs[1])
+
+
+class TestFleet(unittest.TestCase):
+    """
+    Tests the fleet launcher against the mock exchange
+    """
+
+    def setUp(self) -> None:
+        bybit_session.close_sessions()
+        self.exchange = MockExchange(ExchangeConfig(symbols=['AAAUSDT', 'BBBUSDT'], history=10, tick=0.02,
+                                                    ticks_per_candle=5))
+        self.exchange.start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.environ = mock.patch.dict(os.environ, {'FLEET_TEST_KEY': 'fleet', 'FLEET_TEST_SECRET': 'secret'})
+        self.environ.start()
+
+    def tearDown(self) -> None:
+        self.environ.stop()
+        self.exchange.stop()
+        self.directory.cleanup()
+        bybit_session.close_sessions()
+        # Strategy queues are in reference cycles with the closed connections. See `TestScenario`.
+        gc.collect()
+
+    def manifest(self) -> Manifest:
+        entries = [{'strategy': 'demo_strategy', 'symbol': s, 'account': 'mock'} for s in ('AAAUSDT', 'BBBUSDT')] * 2
+        return Manifest.parse({
+            'accounts': {'mock': {'endpoint': self.exchange.url, 'demo': False, 'private_stream': False,
+                                  'api_key_env': 'FLEET_TEST_KEY', 'api_secret_env': 'FLEET_TEST_SECRET'}},
+            'strategies': entries + [{'strategy': 'wrong_strategy', 'account': 'mock'}],
+        })
+
+    def test_manifest(self):
+        """
+        Tests that unknown intervals and accounts are rejected, live accounts need credential variables, and the demo
+        account is always defined
+        """
+        self.assertIn('demo', self.manifest().accounts)
+        self.assertEqual(self.manifest().accounts['mock'].api_key, 'fleet')
+        self.assertRaises(ValueError, Manifest.parse, {'accounts': {'main': {'demo': False}}})
+        self.assertRaises(ValueError, Manifest.parse, {'strategies': [{'strategy': 'rsi', 'interval': 'MIN_2'}]})
+        self.assertRaises(ValueError, Manifest.parse, {'strategies': [{'strategy': 'rsi', 'account': 'other'}]})
+        self.assertRaises(ValueError, Manifest.parse, {'accounts': {'main': {'api_key': 'key'}}})
+
+    def test_run(self):
+        """
+        Tests that every valid entry trades on one connection, failed entries are reported, and SIGTERM stops the
+        fleet gracefully
+        """
+        fleet = Fleet(self.manifest(), workers=2,
+                      websocket=lambda channel: MockWebSocket(self.exchange.ws_url(channel), channel_type=channel),
+                      store_directory=self.directory.name)
+        fleet.start()
+        self.assertEqual(len(fleet.strategies), 4)
+        self.assertEqual(list(fleet.failed), ['4:wrong_strategy_defaults_BTCUSDT_MIN_1_mock'])
+        self.assertEqual(len(self.exchange.connections), 1)
+        # Queues and strategies are labelled by entry, not by the strategy class
+        names = {q.name for d in fleet.dispatchers.values() for queues in d.routes.values() for q in queues}
+        self.assertEqual(names, {e.name for e in fleet.manifest.entries if e.strategy == 'demo_strategy'})
+        self.assertEqual({s.name for s in fleet.strategies}, names)
+
+        timer = threading.Timer(1.5, signal.raise_signal, args=(signal.SIGTERM,))
+        timer.start()
+        fleet.run_forever(status_interval=0.5)
+        timer.join()
+
+        self.assertFalse(fleet.running)
+        self.assertGreater(fleet.status()['processed'], 0)
+        self.assertEqual(fleet.status()['errors'], 0)
+        self.assertGreater(self.exchange.stats.orders, 0)
+        self.assertIs(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
+        for dispatcher in fleet.dispatchers.values():
+            dispatcher.routes.clear()
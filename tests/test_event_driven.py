@@ -0,0 +1,68 @@
+"""
+Tests the event-driven backtester in the `backtest` module.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from backtest.event_driven import EventBacktest
+from strategies.base.risk import Risk
+
+
+class TestEventBacktest(unittest.TestCase):
+    """
+    Tests TP/SL handling, fees and signal exits
+    """
+
+    def setUp(self) -> None:
+        """
+        Sets up the parameters for testing
+        """
+        self.risk = Risk()
+        self.risk.params.quantity = 1.0
+        self.risk.params.take_profit = 0.01
+        self.risk.params.stop_loss = 0.01
+
+    def frame(self, close: list, high: list, low: list, sides: list) -> pd.DataFrame:
+        return pd.DataFrame({"Open": close, "High": high, "Low": low, "Close": close, "calculated_side": sides})
+
+    def test_take_profit(self):
+        """
+        Tests that a long position exits at the take profit price when the High reaches it
+        """
+        data = self.frame([100, 100, 100], [100, 102, 100], [100, 99.5, 100], [1, 0, 0])
+        bt = EventBacktest(data, risk=self.risk, fee=0.0)
+        trade = bt.trades.iloc[0]
+        self.assertEqual(trade['reason'], "Take Profit")
+        self.assertAlmostEqual(trade['exit_price'], 101.0)
+        self.assertAlmostEqual(bt.equity.iloc[-1], 1.0)
+
+    def test_stop_loss_first(self):
+        """
+        Tests that the stop loss is assumed first when both levels are within the bar, and fees are charged
+        """
+        data = self.frame([100, 100], [100, 102], [100, 98], [-1, 0])
+        bt = EventBacktest(data, risk=self.risk, fee=0.001)
+        trade = bt.trades.iloc[0]
+        self.assertEqual(trade['reason'], "Stop Loss")
+        self.assertAlmostEqual(trade['pnl'], -1.0 - 0.001 * (100 + 101))
+
+    def test_signal_flip(self):
+        """
+        Tests that an opposite signal closes the position at the close, and opens the opposite position
+        """
+        data = self.frame([100, 100.5, 100.2], [100, 100.5, 100.2], [100, 100.5, 100.2], [1, -1, -1])
+        bt = EventBacktest(data, risk=self.risk, fee=0.0)
+        self.assertEqual(list(bt.trades['reason']), ["Signal", "End"])
+        self.assertEqual(list(bt.trades['side']), [1, -1])
+        self.assertAlmostEqual(bt.trades['pnl'].sum(), 0.5 + 0.3)
+
+    def test_no_reentry(self):
+        """
+        Tests that a persisting signal does not re-enter after a TP/SL exit when reenter is disabled
+        """
+        close = list(np.full(5, 100.0))
+        data = self.frame(close, [100, 102, 100, 100, 100], close, [1, 1, 1, 1, 1])
+        self.assertEqual(len(EventBacktest(data, risk=self.risk, reenter=False).trades), 1)
+        self.assertEqual(len(EventBacktest(data, risk=self.risk, reenter=True).trades), 2)
@@ -0,0 +1,161 @@
+"""
+Tests the classes in the `exchange` module.
+"""
+
+import unittest
+
+from exchange import batch
+from exchange.state import AccountState
+from templates.open_order import OpenOrder
+from templates.position import Position
+
+
+def position(size: str, updated: int, side: str = "Buy") -> dict:
+    return {"category": "linear", "symbol": "BTCUSDT", "side": side, "size": size, "positionIdx": 0,
+            "updatedTime": str(updated)}
+
+
+def order(order_id: str, status: str, updated: int, side: str = "Buy") -> dict:
+    return {"category": "linear", "symbol": "BTCUSDT", "orderId": order_id, "side": side, "orderType": "Limit",
+            "qty": "0.001", "price": "100", "orderStatus": status, "reduceOnly": False, "updatedTime": str(updated)}
+
+
+class FakeSession:
+    """
+    Serves position and open order requests from fixed lists, and counts requests.
+    """
+    def __init__(self):
+        self.positions = list()
+        self.orders = list()
+        self.requests = 0
+
+    def get_positions(self, category: str, symbol: str):
+        self.requests += 1
+        return {"result": {"list": self.positions}}
+
+    def get_open_orders(self, category: str, symbol: str):
+        self.requests += 1
+        return {"result": {"list": self.orders}}
+
+
+class TestAccountState(unittest.TestCase):
+    """
+    Tests the streamed position and order book
+    """
+
+    def setUp(self) -> None:
+        self.session = FakeSession()
+        self.session.positions = [position("0.001", 1)]
+        self.state = AccountState(self.session, 'linear', websocket=object(), reconcile_interval=0)
+        self.state.track('BTCUSDT')
+
+    def test_seed(self):
+        """
+        Tests that a tracked symbol is seeded from REST once, and read without requests
+        """
+        self.state.track('BTCUSDT')
+        self.assertEqual(self.session.requests, 2)
+        self.assertEqual([p.size for p in self.state.get_positions('BTCUSDT')], ["0.001"])
+        self.assertEqual(self.session.requests, 2)
+        self.assertEqual(self.state.corrections, 0)
+
+    def test_stream(self):
+        """
+        Tests that stream updates open and close positions and orders
+        """
+        self.state.on_position({"data": [position("0.003", 2)]})
+        self.state.on_order({"data": [order("a", "New", 2), order("b", "New", 2, side="Sell")]})
+        self.state.on_order({"data": [order("a", "Filled", 3)]})
+        self.assertEqual([p.size for p in self.state.get_positions('BTCUSDT')], ["0.003"])
+        self.assertEqual([o.order_id for o in self.state.get_orders('BTCUSDT')], ["b"])
+
+        # Older updates are ignored
+        self.state.on_position({"data": [position("0.002", 1)]})
+        self.assertEqual([p.size for p in self.state.get_positions('BTCUSDT')], ["0.003"])
+
+        self.state.on_position({"data": [position("0", 4)]})
+        self.assertEqual(self.state.get_positions('BTCUSDT'), [])
+
+    def test_reconcile(self):
+        """
+        Tests that reconciles repair missed updates, without reopening records closed by the stream
+        """
+        # Closed on the stream after the REST snapshot was taken
+        self.state.on_position({"data": [position("0", 2 ** 62)]})
+        self.assertEqual(self.state.reconcile(), 0)
+        self.assertEqual(self.state.get_positions('BTCUSDT'), [])
+
+        # Missed order update
+        self.session.orders = [order("c", "New", 5)]
+        self.assertEqual(self.state.reconcile(), 1)
+        self.assertEqual([o.order_id for o in self.state.get_orders('BTCUSDT')], ["c"])
+
+        # Missed cancel
+        self.session.orders = []
+        self.assertEqual(self.state.reconcile(), 1)
+        self.assertEqual(self.state.get_orders('BTCUSDT'), [])
+        self.assertEqual(self.state.corrections, 2)
+
+
+class BatchSession:
+    """
+    Serves batch requests, rejecting legs of the symbols in `reject`.
+    """
+    def __init__(self, reject: tuple = ()):
+        self.reject = reject
+        self.requests = list()
+
+    def respond(self, request: list) -> dict:
+        legs = [{"symbol": r["symbol"], "orderId": r.get("orderId", f"id-{r['symbol']}")} for r in request]
+        statuses = [{"code": 10001 if r["symbol"] in self.reject else 0, "msg": "Rejected" if r["symbol"] in
+                     self.reject else "OK"} for r in request]
+        return {"retCode": 0, "retMsg": "OK", "result": {"list": legs}, "retExtInfo": {"list": statuses}}
+
+    def place_batch_order(self, category: str, request: list):
+        self.requests.append(('place', request))
+        return self.respond(request)
+
+    def cancel_batch_order(self, category: str, request: list):
+        self.requests.append(('cancel', request))
+        return self.respond(request)
+
+
+class TestBatch(unittest.TestCase):
+    """
+    Tests batch order requests
+    """
+
+    def test_chunks(self):
+        self.assertEqual(batch.chunks([1, 2, 3, 4, 5], 2), [[1, 2], [3, 4], [5]])
+        self.assertEqual(batch.batch_limit('spot'), 10)
+        with self.assertRaises(ValueError):
+            batch.chunks([1], 0)
+
+    def test_flatten(self):
+        """
+        Tests that a multi-symbol book is flattened in chunks of the batch limit, with per-leg results
+        """
+        session = BatchSession(reject=("SYM7USDT",))
+        positions = [Position(f"SYM{i}USDT", "Buy" if i % 2 else "Sell", "0.01") for i in range(45)]
+        orders = [OpenOrder("SYM1USDT", "order-1", "Buy", "Limit", "0.01", "100", "New", False)]
+        results = batch.flatten(session, 'linear', positions, orders)
+
+        self.assertEqual([(kind, len(r)) for kind, r in session.requests],
+                         [('cancel', 1), ('place', 20), ('place', 20), ('place', 5)])
+        self.assertEqual(len(results), 46)
+        self.assertEqual(results[0].order_id, "order-1")
+        self.assertEqual([r.symbol for r in results if not r.success], ["SYM7USDT"])
+
+        legs = [leg for _, request in session.requests[1:] for leg in request]
+        self.assertTrue(all(leg['reduceOnly'] for leg in legs))
+        self.assertEqual(legs[1]['side'], 'Sell')
+        self.assertEqual(legs[0]['side'], 'Buy')
+
+    def test_rejected_request(self):
+        """
+        Tests that a rejected batch request fails every leg
+        """
+        session = BatchSession()
+        session.place_batch_order = lambda category, request: {"retCode": 10006, "retMsg": "Too many visits"}
+        results = batch.place_batch(session, 'linear', batch.close_requests([Position("BTCUSDT", "Buy", "1")] * 3))
+        self.assertEqual([r.code for r in results], [10006] * 3)
@@ -0,0 +1,60 @@
+"""
+Tests the streaming indicators in the `indicators` module.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from indicators.streaming import SMA, EMA, RSI, RollingStd, ZScore, RollingSkew, moving_average, check_parity
+from templates.indicator import MAType
+
+
+class TestStreamingIndicators(unittest.TestCase):
+    """
+    Tests the streaming indicators against the pandas calculations used by the strategies
+    """
+
+    def setUp(self) -> None:
+        """
+        Sets up the parameters for testing
+        """
+        rng = np.random.default_rng(7)
+        self.closes = pd.Series(60000 + np.cumsum(rng.normal(0, 50, 3000)))
+
+    def test_moving_averages(self):
+        """
+        Tests SMA and EMA parity
+        """
+        self.assertLess(check_parity(SMA(20), self.closes), 1e-9)
+        self.assertLess(check_parity(EMA(30), self.closes), 1e-9)
+
+    def test_rsi(self):
+        """
+        Tests RSI parity with Wilder smoothing
+        """
+        self.assertLess(check_parity(RSI(14), self.closes), 1e-9)
+
+    def test_dispersion(self):
+        """
+        Tests rolling standard deviation, z-score and skew parity
+        """
+        self.assertLess(check_parity(RollingStd(10), self.closes), 1e-6)
+        self.assertLess(check_parity(ZScore(SMA(10), 10), self.closes), 1e-6)
+        self.assertLess(check_parity(RollingSkew(20), self.closes, tolerance=1e-4), 1e-4)
+
+    def test_nan_inputs_are_skipped(self):
+        """
+        Tests that leading NaN values are skipped, as in pandas
+        """
+        data = pd.Series([np.nan] * 5 + list(self.closes[:50]))
+        self.assertLess(check_parity(SMA(10), data), 1e-9)
+        self.assertLess(check_parity(EMA(10), data), 1e-9)
+
+    def test_moving_average(self):
+        """
+        Tests the moving average factory
+        """
+        self.assertIsInstance(moving_average(MAType.SIMPLE, 10), SMA)
+        self.assertIsInstance(moving_average(MAType.EXPONENTIAL, 10), EMA)
+        self.assertRaises(ValueError, moving_average, "SIMPLE", 10)
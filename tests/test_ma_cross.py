@@ -10,6 +10,8 @@ from strategies import MACross, MAType
 from configs.trade_cfg import TradeConfig
 from templates.side import Side
 from templates.intervals import Timeframes
+from templates.candles import Candles
+from market_data.window import CandleWindow
 from constants import constants
 
 
@@ -62,4 +64,28 @@ class TestMACrossStrategy(unittest.TestCase):
         short_df.loc[last_row, ['fast_ma', 'calculated_side']] = [100000, 1]
         crossover = self.strategy.crossover(short_df)
         self.assertTrue(crossover)
-    
\ No newline at end of file
+    
+    def test_stream(self) -> None:
+        """
+        Tests that streamed indicator values match `attach_indicators`
+        """
+        minute = 60_000
+        closes = 100 + np.sin(np.arange(0, 400) / 10)
+        history = pd.DataFrame(
+            {"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": 1.0, "Turnover": 1.0},
+            index=pd.to_datetime(np.arange(0, 400) * minute, unit='ms')
+        )
+        window = CandleWindow(capacity=500)
+        window.seed(history.iloc[:-1])
+        self.strategy.attach_window(window)
+
+        last = history.iloc[-1]
+        window.append(399 * minute, *last.to_numpy())
+        candle = Candles(constants.SYMBOL, 399 * minute, 400 * minute - 1, "1", last.Open, last.Close, last.High,
+                         last.Low, last.Volume, last.Turnover, True, 0)
+        values = self.strategy.stream(candle)
+
+        expected = self.strategy.attach_indicators(history.iloc[-200:].copy()).iloc[-1]
+        self.assertAlmostEqual(values['fast_ma'], expected['fast_ma'])
+        self.assertAlmostEqual(values['slow_ma'], expected['slow_ma'])
+        self.assertEqual(values['calculated_side'], expected['calculated_side'])
@@ -0,0 +1,215 @@
+"""
+Tests the classes in the `market_data` module.
+"""
+
+import tempfile
+import unittest
+import numpy as np
+
+from market_data.store import CandleStore, parse_klines
+from market_data.tickers import TickerCache
+from market_data.window import CandleWindow
+from templates.candles import Candles
+from templates.intervals import Timeframes
+from constants import constants
+
+
+class FakeSession:
+    """
+    Serves get_kline requests from a list of one minute candles. The last candle is still open.
+    """
+    def __init__(self, candles: int):
+        self.minute = 60_000
+        self.rows = [self.row(i) for i in range(candles)]
+        self.requests = list()
+
+    def row(self, i: int) -> list:
+        return [str(i * self.minute), str(i), str(i + 1), str(i - 1), str(i + 0.5), "10", "100"]
+
+    def get_kline(self, category: str, symbol: str, interval, limit: int, start: int = None, end: int = None):
+        self.requests.append(dict(limit=limit, start=start, end=end))
+        rows = [r for r in self.rows if (start is None or int(r[0]) >= start) and (end is None or int(r[0]) <= end)]
+        return {"result": {"list": rows[::-1][:limit]}}
+
+
+class TestCandleStore(unittest.TestCase):
+    """
+    Tests the local candle store
+    """
+
+    def setUp(self) -> None:
+        """
+        Sets up the parameters for testing
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.session = FakeSession(50)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def store(self) -> CandleStore:
+        return CandleStore(constants.SYMBOL, constants.CHANNEL, Timeframes.MIN_1, directory=self.directory.name)
+
+    def test_parse_klines(self):
+        """
+        Tests that klines are returned in ascending order as floats
+        """
+        df = parse_klines(self.session.get_kline(constants.CHANNEL, constants.SYMBOL, 1, 5)['result']['list'])
+        self.assertEqual(list(df['Open']), [45.0, 46.0, 47.0, 48.0, 49.0])
+        self.assertTrue(df.index.is_monotonic_increasing)
+
+    def test_initial_download(self):
+        """
+        Tests that the first request downloads the full window, and excludes the open candle
+        """
+        df = self.store().top_up(self.session, 10)
+        self.assertEqual(len(df), 10)
+        self.assertEqual(df['Open'].iloc[-1], 48.0)
+        self.assertEqual(self.session.requests[0]['limit'], 11)
+
+    def test_incremental_top_up(self):
+        """
+        Tests that only candles newer than the last stored candle are requested
+        """
+        store = self.store()
+        store.top_up(self.session, 10)
+
+        self.session.rows.extend([self.session.row(50), self.session.row(51)])
+        df = store.top_up(self.session, 10)
+
+        self.assertEqual(self.session.requests[-1]['start'], 48 * self.session.minute)
+        self.assertEqual(list(df['Open'].iloc[-3:]), [48.0, 49.0, 50.0])
+
+    def test_restart_reuses_history(self):
+        """
+        Tests that a new store reads the history persisted by a previous one
+        """
+        self.store().top_up(self.session, 10)
+
+        store = self.store()
+        self.assertEqual(len(store.load()), 10)
+        self.assertEqual(store.last_timestamp(), 48 * self.session.minute)
+
+        store.top_up(self.session, 10)
+        self.assertIsNotNone(self.session.requests[-1]['start'])
+
+
+class TestCandleWindow(unittest.TestCase):
+    """
+    Tests the rolling candle window
+    """
+
+    def setUp(self) -> None:
+        """
+        Sets up the parameters for testing
+        """
+        self.session = FakeSession(20)
+        rows = self.session.get_kline(constants.CHANNEL, constants.SYMBOL, 1, 20)['result']['list']
+        self.history = parse_klines(rows)
+        self.window = CandleWindow(capacity=8)
+
+    def test_seed(self):
+        """
+        Tests that seeding keeps the latest candles, oldest first
+        """
+        self.window.seed(self.history)
+        self.assertEqual(len(self.window), 8)
+        self.assertEqual(list(self.window.column('Open', 3)), [17.0, 18.0, 19.0])
+        self.assertEqual(self.window.last_timestamp, 19 * self.session.minute)
+
+    def test_append_wraps_around(self):
+        """
+        Tests that appending past the capacity drops the oldest candles, and stale candles are ignored
+        """
+        self.window.seed(self.history)
+        for i in range(20, 31):
+            self.assertTrue(self.window.append(i * self.session.minute, i, i + 1, i - 1, i + 0.5, 10, 100))
+        self.assertFalse(self.window.append(25 * self.session.minute, 0, 0, 0, 0, 0, 0))
+
+        df = self.window.frame()
+        self.assertEqual(list(df['Open']), [float(i) for i in range(23, 31)])
+        self.assertTrue(df.index.is_monotonic_increasing)
+
+    def test_frame_is_view(self):
+        """
+        Tests that frames share memory with the window
+        """
+        self.window.seed(self.history)
+        df = self.window.frame(4)
+        self.assertTrue(np.shares_memory(df['Close'].to_numpy(), self.window.column('Close')))
+
+    def test_gap_clears_window(self):
+        """
+        Tests that a missed candle clears the window
+        """
+        self.window.seed(self.history)
+        minute = self.session.minute
+        candle = Candles(constants.SYMBOL, 22 * minute, 23 * minute - 1, "1", "22", "23", "24", "21", "10", "100",
+                         True, 0)
+        self.window.append_candle(candle)
+        self.assertEqual(len(self.window), 1)
+
+
+class TestCandles(unittest.TestCase):
+    """
+    Tests decoding kline stream messages into candles
+    """
+
+    message = {"start": 60_000, "end": 119_999, "interval": "1", "open": "100.5", "close": "100.7", "high": "100.9",
+               "low": "100.1", "volume": "12.5", "turnover": "1258.75", "confirm": True, "timestamp": 119_999}
+
+    def test_from_kline(self):
+        """
+        Tests that confirmed candles have typed fields, and open candles are skipped
+        """
+        candle = Candles.from_kline(constants.SYMBOL, self.message, 1.5)
+        self.assertEqual(candle, Candles(constants.SYMBOL, **self.message, received=1.5))
+        self.assertEqual((candle.start, candle.close, candle.received), (60_000, 100.7, 1.5))
+        self.assertIsInstance(candle.volume, float)
+        self.assertFalse(hasattr(candle, '__dict__'))
+
+        self.assertIsNone(Candles.from_kline(constants.SYMBOL, {**self.message, "confirm": False}))
+
+
+class TestTickerCache(unittest.TestCase):
+    """
+    Tests the streamed ticker cache
+    """
+
+    class FakeWebSocket:
+        def __init__(self):
+            self.symbols = list()
+
+        def ticker_stream(self, symbol, callback):
+            self.symbols.append(symbol)
+
+    @staticmethod
+    def message(symbol: str, mark_price: str = "100.5") -> dict:
+        data = {"symbol": symbol, "markPrice": mark_price, "lastPrice": "100.4", "bid1Price": "100.3",
+                "ask1Price": "100.6"}
+        return {"topic": f"tickers.{symbol}", "type": "snapshot", "ts": 1700000000000, "data": data}
+
+    def test_subscribe(self):
+        ws = self.FakeWebSocket()
+        tickers = TickerCache('linear', websocket=ws)
+        tickers.subscribe('BTCUSDT')
+        tickers.subscribe('BTCUSDT')
+        tickers.subscribe('ETHUSDT')
+        self.assertEqual(ws.symbols, ['BTCUSDT', 'ETHUSDT'])
+
+    def test_mark_price(self):
+        """
+        Tests that cached prices are returned only while fresh
+        """
+        tickers = TickerCache('linear', max_age=60, websocket=self.FakeWebSocket())
+        self.assertIsNone(tickers.mark_price('BTCUSDT'))
+
+        tickers.handler(self.message('BTCUSDT'))
+        ticker = tickers.get('BTCUSDT')
+        self.assertEqual((ticker.mark_price, ticker.bid, ticker.ask), (100.5, 100.3, 100.6))
+        self.assertEqual(tickers.mark_price('BTCUSDT'), 100.5)
+        self.assertIsNone(tickers.mark_price('BTCUSDT', max_age=-1))
+
+        # Spot tickers have no mark price
+        tickers.handler(self.message('ETHUSDT', mark_price=None))
+        self.assertEqual(tickers.mark_price('ETHUSDT'), 100.4)
@@ -0,0 +1,176 @@
+"""
+Tests the mock exchange in the `mock_exchange` module.
+"""
+
+import gc
+import threading
+import unittest
+
+from mock_exchange import exchange as mock
+from mock_exchange import scenario
+from session import bybit_session
+from strategies import Demo
+
+
+class TestMockExchange(unittest.TestCase):
+    """
+    Tests the REST endpoints, matching model, failures and kline stream of the mock exchange
+    """
+
+    def setUp(self) -> None:
+        bybit_session.close_sessions()
+        self.exchange = mock.MockExchange(mock.ExchangeConfig(symbols=['AAAUSDT', 'BBBUSDT'], history=20,
+                                                              ticks_per_candle=2))
+        self.exchange.start(feed=False)
+        self.session = bybit_session.get_session('mock-key', 'mock-secret', demo=False, endpoint=self.exchange.url)
+
+    def tearDown(self) -> None:
+        bybit_session.close_sessions()
+        self.exchange.stop()
+
+    def test_market_data(self):
+        """
+        Tests that klines are served newest first, including the open candle, and paged by start and end
+        """
+        rows = self.session.get_kline(category='linear', symbol='AAAUSDT', interval=1, limit=100)['result']['list']
+        self.assertEqual(len(rows), 21)
+        starts = [int(r[0]) for r in rows]
+        self.assertEqual(starts, sorted(starts, reverse=True))
+        self.assertEqual(starts[0] - starts[1], 60_000)
+
+        page = self.session.get_kline(category='linear', symbol='AAAUSDT', interval=1, limit=5,
+                                      end=starts[10])['result']['list']
+        self.assertEqual([int(r[0]) for r in page], starts[10:15])
+        page = self.session.get_kline(category='linear', symbol='AAAUSDT', interval=1, start=starts[2])
+        self.assertEqual(len(page['result']['list']), 3)
+
+        self.exchange.step()
+        self.exchange.step()
+        rows = self.session.get_kline(category='linear', symbol='AAAUSDT', interval=1)['result']['list']
+        self.assertEqual(int(rows[0][0]) - starts[0], 60_000)
+
+        ticker = self.session.get_tickers(category='linear', symbol='AAAUSDT')['result']['list'][0]
+        self.assertEqual(float(ticker['markPrice']), self.exchange.markets['AAAUSDT'].price)
+
+    def test_orders(self):
+        """
+        Tests that market orders open, net and close positions, and limit orders rest until crossed
+        """
+        price = self.exchange.markets['AAAUSDT'].price
+        result = self.session.place_order(category='linear', symbol='AAAUSDT', side='Buy', orderType='Market',
+                                          qty='2')
+        self.assertEqual(result['retCode'], 0)
+        self.session.place_order(category='linear', symbol='AAAUSDT', side='Sell', orderType='Market', qty='0.5')
+        position = self.session.get_positions(category='linear', symbol='AAAUSDT')['result']['list'][0]
+        self.assertEqual((position['side'], float(position['size'])), ('Buy', 1.5))
+
+        self.session.place_order(category='linear', symbol='AAAUSDT', side='Buy', orderType='Limit', qty='1',
+                                 price=str(round(price / 2, 4)))
+        orders = self.session.get_open_orders(category='linear', symbol='AAAUSDT')['result']['list']
+        self.assertEqual(len(orders), 1)
+
+        # Reduce-only legs are capped at the position, and rejected without one
+        batch = self.session.place_batch_order(category='linear', request=[
+            {'symbol': 'AAAUSDT', 'side': 'Sell', 'orderType': 'Market', 'qty': '5', 'reduceOnly': True},
+            {'symbol': 'BBBUSDT', 'side': 'Sell', 'orderType': 'Market', 'qty': '1', 'reduceOnly': True},
+        ])
+        codes = [leg['code'] for leg in batch['retExtInfo']['list']]
+        self.assertEqual(codes, [0, mock.REDUCE_ONLY_REJECTED])
+        self.assertEqual(self.session.get_positions(category='linear')['result']['list'], [])
+
+        self.session.cancel_all_orders(category='linear', symbol='AAAUSDT')
+        self.assertEqual(self.session.get_open_orders(category='linear')['result']['list'], [])
+
+    def test_take_profit(self):
+        """
+        Tests that a position is closed when its stop loss is crossed, and that TP/SL under other field names than the
+        V5 names are ignored
+        """
+        price = self.exchange.markets['AAAUSDT'].price
+        self.session.place_order(category='linear', symbol='AAAUSDT', side='Buy', orderType='Market', qty='1',
+                                 take_profit=str(price * 10), stop_loss=str(price * 2))
+        self.exchange.step()
+        self.assertEqual(len(self.session.get_positions(category='linear')['result']['list']), 1)
+        self.session.place_order(category='linear', symbol='AAAUSDT', side='Sell', orderType='Market', qty='1',
+                                 reduceOnly=True)
+
+        self.session.place_order(category='linear', symbol='AAAUSDT', side='Buy', orderType='Market', qty='1',
+                                 takeProfit=str(price * 10), stopLoss=str(price * 2))
+        self.exchange.step()
+        self.assertEqual(self.session.get_positions(category='linear')['result']['list'], [])
+
+    def test_failures(self):
+        """
+        Tests injected errors, and rate limits with their headers
+        """
+        self.exchange.config.rate_limit = 1
+        response, headers = self.exchange.handle('GET', '/v5/market/tickers', 'key', {})
+        self.assertEqual(response['retCode'], 0)
+        response, headers = self.exchange.handle('GET', '/v5/market/tickers', 'key', {})
+        self.assertEqual(response['retCode'], mock.RATE_LIMITED)
+        self.assertEqual(headers['X-Bapi-Limit-Status'], '0')
+        # Limits are per account
+        response, _ = self.exchange.handle('GET', '/v5/market/tickers', 'other', {})
+        self.assertEqual(response['retCode'], 0)
+
+        self.exchange.config.rate_limit = None
+        self.exchange.config.error_rate = 1.0
+        response, _ = self.exchange.handle('POST', '/v5/order/create', 'key', {})
+        self.assertEqual(response['retCode'], mock.SERVER_ERROR)
+        self.assertEqual((self.exchange.stats.throttled, self.exchange.stats.errors), (1, 1))
+
+    def test_websocket(self):
+        """
+        Tests that subscribed kline topics are streamed to a pybit WebSocket, with the candle confirmed every
+        `ticks_per_candle` ticks
+        """
+        confirmed = threading.Event()
+        messages = list()
+
+        def handler(contents):
+            messages.append(contents)
+            if contents['data'][0]['confirm']:
+                confirmed.set()
+
+        ws = mock.MockWebSocket(self.exchange.ws_url('linear'), channel_type='linear')
+        try:
+            ws.kline_stream(interval=1, symbol='AAAUSDT', callback=handler)
+            # Waits for the subscription to be registered
+            for _ in range(100):
+                if len(self.exchange.connections) > 0 and self.exchange.connections[0].topics:
+                    break
+                confirmed.wait(0.02)
+            self.exchange.step()
+            self.exchange.step()
+            self.assertTrue(confirmed.wait(5))
+        finally:
+            ws.exit()
+
+        self.assertEqual({m['topic'] for m in messages}, {'kline.1.AAAUSDT'})
+        self.assertEqual(self.exchange.stats.candles, 2)
+
+
+class TestScenario(unittest.TestCase):
+    """
+    Tests the load scenario end to end
+    """
+
+    def tearDown(self) -> None:
+        bybit_session.close_sessions()
+        # Strategy queues are in reference cycles with the closed connections. Collected so their metrics
+        # collectors are dropped.
+        gc.collect()
+
+    def test_run(self):
+        """
+        Tests that strategies stage streamed candles, and send their orders to the mock exchange
+        """
+        config = mock.ExchangeConfig(history=10, tick=0.02, ticks_per_candle=5)
+        report = scenario.run(Demo, dict(), strategies=2, symbol_count=2, duration=1.5, config=config, workers=2)
+
+        self.assertEqual(report.strategies, 4)
+        self.assertGreater(report.candles['processed'], 0)
+        self.assertEqual(report.candles['errors'], 0)
+        self.assertGreater(report.exchange.orders, 0)
+        self.assertGreater(report.latencies['stage']['count'], 0)
+        self.assertGreater(report.candle_rate, 0)
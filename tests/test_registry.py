@@ -0,0 +1,57 @@
+"""
+Tests the lazy strategy registry in the `strategies.registry` module.
+"""
+
+import subprocess
+import sys
+import unittest
+
+import strategies
+from strategies import registry
+from templates.indicator import MAType
+
+
+class TestRegistry(unittest.TestCase):
+    """
+    Tests that strategies are imported on first use, and cached
+    """
+
+    def test_load_strategy(self):
+        """
+        Tests that a strategy key loads its class once, and unknown keys are rejected
+        """
+        strategy = registry.load_strategy('demo_strategy')
+        self.assertEqual(strategy.__name__, 'Demo')
+        self.assertIs(registry.load_strategy('demo_strategy'), strategy)
+        self.assertIs(strategies.Demo, strategy)
+        self.assertIn('demo_strategy', registry.import_times)
+
+        self.assertRaises(ValueError, registry.load_strategy, 'wrong_strategy')
+
+    def test_find(self):
+        """
+        Tests that names exported by the strategy modules are still importable from the package
+        """
+        self.assertIs(registry.find('MAType'), MAType)
+        self.assertRaises(AttributeError, registry.find, 'wrong_class')
+        self.assertRaises(AttributeError, getattr, strategies, '__wrong__')
+
+    def test_cold_import(self):
+        """
+        Tests that loading a strategy in a fresh interpreter imports neither the other strategies, nor the backtester
+        """
+        code = "import sys; from strategies.registry import load_strategy; load_strategy('demo_strategy'); " \
+               "print([m for m in ('strategies.rsi.rsi', 'strategies.ma_cross.ma_cross', 'backtest.backtest') " \
+               "if m in sys.modules])"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), '[]')
+
+    def test_report(self):
+        """
+        Tests that the report compares against the eager import of the package before the registry, and that a
+        strategy loaded through the registry imports no heavy module the eager import did not
+        """
+        baseline, row = registry.report(['demo_strategy'])
+        self.assertEqual(baseline['import'], 'eager (baseline)')
+        self.assertEqual(row['import'], 'demo_strategy')
+        self.assertLessEqual(set(row['modules']), set(baseline['modules']))
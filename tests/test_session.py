@@ -0,0 +1,153 @@
+"""
+Tests the shared HTTP sessions in the `session` module.
+"""
+
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from session import bybit_session, scheduler
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSessions(unittest.TestCase):
+    """
+    Tests the session registry and connection reuse
+    """
+
+    def setUp(self) -> None:
+        bybit_session.close_sessions()
+
+    def tearDown(self) -> None:
+        bybit_session.close_sessions()
+
+    def test_registry(self):
+        """
+        Tests that an account gets one session, and different accounts or environments get separate sessions
+        """
+        session = bybit_session.get_session("registry-key", "registry-secret", demo=True, pool_size=4)
+        self.assertIs(bybit_session.get_session("registry-key", "registry-secret", demo=True), session)
+        self.assertIsNot(bybit_session.get_session("other-key", "registry-secret", demo=True), session)
+        self.assertIsNot(bybit_session.get_session("registry-key", "registry-secret", demo=False), session)
+        self.assertEqual(session.client.get_adapter("https://").poolmanager.connection_pool_kw['maxsize'], 4)
+        self.assertEqual(bybit_session.session_stats().sessions, 3)
+
+        with self.assertRaises(ValueError):
+            bybit_session.mount_pool(session, 0)
+
+    def test_reuse(self):
+        """
+        Tests that sequential requests reuse one keep-alive connection
+        """
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            session = bybit_session.get_session("reuse-key", "reuse-secret")
+            for _ in range(5):
+                session.client.get(f"http://127.0.0.1:{server.server_port}/")
+            stats = bybit_session.session_stats()
+            self.assertEqual((stats.connections, stats.requests), (1, 5))
+            self.assertAlmostEqual(stats.reuse, 0.8)
+        finally:
+            bybit_session.close_sessions()
+            server.shutdown()
+            server.server_close()
+
+
+class Response:
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+class HeaderSession:
+    """
+    Responds to orders with fixed rate limit headers, passed to the response hook of the scheduler
+    """
+    def __init__(self, scheduler: scheduler.Scheduler, headers: dict):
+        self.scheduler = scheduler
+        self.headers = headers
+        self.endpoint = "https://api-demo.bybit.com"
+
+    def place_order(self, **kwargs):
+        self.scheduler.on_response(Response(self.headers))
+        return {"retCode": 0}
+
+
+class TestScheduler(unittest.TestCase):
+    """
+    Tests the rate limit scheduler
+    """
+
+    def test_priority(self):
+        """
+        Tests that an order is granted before a market data request that waited longer
+        """
+        s = scheduler.Scheduler(limits={'default': 100, 'order': 100, 'market': 100}, ip_limit=20)
+        s.ip.tokens = 0
+        granted = list()
+
+        def request(endpoint_class: str):
+            s.acquire(endpoint_class)
+            granted.append(endpoint_class)
+
+        threads = [threading.Thread(target=request, args=('market',)), threading.Thread(target=request, args=('order',))]
+        for t in threads:
+            t.start()
+            time.sleep(0.01)
+        for t in threads:
+            t.join()
+
+        self.assertEqual(granted, ['order', 'market'])
+        stats = s.stats()
+        self.assertEqual((stats['order']['requests'], stats['market']['requests']), (1, 1))
+        self.assertGreater(stats['market']['max_wait'], stats['order']['max_wait'])
+        self.assertEqual(stats['market']['depth'], 0)
+
+    def test_bucket(self):
+        """
+        Tests that a bucket is refilled at its rate, and blocked until the reset of an exhausted limit
+        """
+        bucket = scheduler.TokenBucket(10)
+        now = bucket.updated
+        for _ in range(10):
+            bucket.take()
+        self.assertAlmostEqual(bucket.delay(now), 0.1)
+        self.assertTrue(bucket.available(now + 0.11))
+
+        bucket.update(limit=5, remaining=0, reset=now + 1, now=now + 0.1)
+        self.assertFalse(bucket.available(now + 0.5))
+        self.assertAlmostEqual(bucket.delay(now + 0.5), 0.7)
+        self.assertEqual(bucket.rate, 5)
+
+    def test_headers(self):
+        """
+        Tests that response headers of a scheduled session correct the bucket of its account and endpoint class
+        """
+        s = scheduler.Scheduler()
+        headers = {'X-Bapi-Limit': '20', 'X-Bapi-Limit-Status': '0',
+                   'X-Bapi-Limit-Reset-Timestamp': str(int(time.time() * 1000) + 50)}
+        session = scheduler.ScheduledSession(HeaderSession(s, headers), s, account="key")
+        self.assertEqual(session.place_order(category='linear')['retCode'], 0)
+        self.assertEqual(session.endpoint, "https://api-demo.bybit.com")
+
+        bucket = s.bucket("key", 'order')
+        self.assertEqual(bucket.rate, 20)
+        self.assertEqual(s.throttled, 1)
+        self.assertEqual(s.stats()['order']['requests'], 1)
+        self.assertFalse(bucket.available(time.monotonic()))
+        self.assertTrue(s.bucket("other", 'order').available(time.monotonic()))
@@ -0,0 +1,130 @@
+"""
+Tests the simulated broker in the `backtest` module.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from backtest.simulated_broker import PARAMS_ERROR, REDUCE_ONLY_REJECTED, SimulatedBroker, StageBacktest
+from configs.trade_cfg import TradeConfig
+from constants import constants
+from strategies import Demo
+from templates.intervals import Timeframes
+
+
+def candles(open_: list, high: list, low: list, close: list) -> pd.DataFrame:
+    index = pd.date_range('2024-01-01', periods=len(close), freq='1min', name='Time')
+    volume = np.ones(len(close))
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume,
+                         'Turnover': volume}, index=index).astype(float)
+
+
+class TestSimulatedBroker(unittest.TestCase):
+    """
+    Tests kline serving, next-bar fills, netting and TP/SL exits
+    """
+
+    def setUp(self) -> None:
+        """
+        Sets up the parameters for testing
+        """
+        prices = [100, 101, 102, 103, 104, 105]
+        self.broker = SimulatedBroker(candles(prices, prices, prices, prices), 'BTCUSDT', fee=0.0)
+
+    def test_get_kline(self):
+        """
+        Tests that klines are served newest first up to the current bar, with the next bar as a flat open candle
+        """
+        self.broker.advance()
+        self.broker.advance()
+        rows = self.broker.get_kline(symbol='BTCUSDT', limit=10)['result']['list']
+        self.assertEqual([float(r[4]) for r in rows], [102, 101, 100])
+        self.assertEqual(rows[0][1:5], ['102.0'] * 4)
+
+        rows = self.broker.get_kline(symbol='BTCUSDT', limit=2)['result']['list']
+        self.assertEqual(len(rows), 2)
+        start = int(self.broker.time[1])
+        rows = self.broker.get_kline(symbol='BTCUSDT', start=start)['result']['list']
+        self.assertEqual([int(r[0]) for r in rows], list(self.broker.time[1:3][::-1]))
+
+    def test_next_bar_fill(self):
+        """
+        Tests that market orders fill at the next open, and closes and flips net the position
+        """
+        self.broker.advance()
+        self.broker.place_order(category='linear', symbol='BTCUSDT', side='Buy', orderType='Market', qty='2')
+        self.assertEqual(self.broker.get_positions()['result']['list'], [])
+
+        self.broker.advance()
+        position = self.broker.get_positions()['result']['list'][0]
+        self.assertEqual((position['side'], float(position['size']), float(position['avgPrice'])), ('Buy', 2, 101))
+
+        # Reduce-only close, followed by the opposite order
+        batch = self.broker.place_batch_order(category='linear', request=[
+            {'symbol': 'BTCUSDT', 'side': 'Sell', 'orderType': 'Market', 'qty': '2', 'reduceOnly': True}])
+        self.assertEqual(batch['retExtInfo']['list'][0]['code'], 0)
+        self.broker.place_order(category='linear', symbol='BTCUSDT', side='Sell', orderType='Market', qty='1')
+        self.broker.advance()
+
+        self.assertEqual(self.broker.position.side, -1)
+        self.assertEqual(self.broker.position.size, 1)
+        self.assertAlmostEqual(self.broker.trades[0]['pnl'], 2.0)
+        self.assertEqual(self.broker.trades[0]['reason'], "Signal")
+
+        result = self.broker.place_order(category='linear', symbol='BTCUSDT', side='Sell', orderType='Market',
+                                         qty='1', reduceOnly=True)
+        self.assertEqual(result['retCode'], REDUCE_ONLY_REJECTED)
+
+    def test_take_profit(self):
+        """
+        Tests that the stop loss is assumed first when both levels are within the bar, and that TP/SL sent under other
+        names than the V5 fields are rejected
+        """
+        broker = SimulatedBroker(candles([100, 100, 100], [100, 100, 102], [100, 100, 98], [100, 100, 100]),
+                                 'BTCUSDT', fee=0.001)
+        broker.advance()
+        rejected = broker.place_order(category='linear', symbol='BTCUSDT', side='Buy', orderType='Market', qty='1',
+                                      take_profit='101', stop_loss='99')
+        self.assertEqual(rejected['retCode'], PARAMS_ERROR)
+
+        broker.place_order(category='linear', symbol='BTCUSDT', side='Buy', orderType='Market', qty='1',
+                           takeProfit='101', stopLoss='99')
+        broker.advance()
+        broker.advance()
+        trade = broker.trades[0]
+        self.assertEqual(trade['reason'], "Stop Loss")
+        self.assertAlmostEqual(trade['pnl'], -1.0 - 0.001 * (100 + 99))
+        self.assertIsNone(broker.position)
+
+
+class TestStageBacktest(unittest.TestCase):
+    """
+    Tests that a strategy's stage() is driven through history
+    """
+
+    def test_demo(self):
+        """
+        Tests that the Demo strategy opens on the bar after each signal, and flips through its own closes
+        """
+        open_ = [100, 100, 101, 102, 101, 100, 101, 102]
+        close = [100, 101, 102, 101, 100, 101, 102, 103]
+        data = candles(open_, np.maximum(open_, close), np.minimum(open_, close), close)
+        config = TradeConfig(symbol=constants.SYMBOL, interval=Timeframes.MIN_1, channel=constants.CHANNEL)
+
+        result = StageBacktest(Demo(config=config, strategy_config=dict()), data, warmup=1, fee=0.0)
+        self.assertEqual(result.staged, len(data) - 2)
+        # One opening order per staged signal, and a reduce-only close whenever a position was still open
+        orders = result.broker.orders
+        self.assertEqual(len([o for o in orders if not o['reduceOnly']]), result.staged)
+        self.assertEqual(len([o for o in orders if o['reduceOnly']]), 3)
+        self.assertEqual(result.broker.rejected, 0)
+
+        # The first signal is the rising candle at bar 1, filled at the open of bar 2
+        first = result.trades.iloc[0]
+        self.assertEqual(first['entry_time'], data.index[2])
+        self.assertEqual(first['side'], 1)
+        self.assertEqual(result.trades.iloc[-1]['reason'], "End")
+        self.assertAlmostEqual(result.equity.iloc[-1], result.trades['pnl'].sum())
+        # The strategy keeps running against the broker
+        self.assertIs(result.strategy.session, result.broker)
@@ -0,0 +1,177 @@
+"""
+Tests the classes in the `telemetry` module.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from configs.trade_cfg import TradeConfig
+from engine.dispatcher import Dispatcher
+from engine.workers import StrategyQueue, WorkerPool
+from telemetry import latency, metrics
+from templates.intervals import Timeframes
+from tests.test_engine import FakeWebSocket, kline_message
+
+
+class TestLatency(unittest.TestCase):
+    """
+    Tests the latency histograms and spans
+    """
+
+    def setUp(self) -> None:
+        latency.reset()
+        latency.enable()
+
+    def tearDown(self) -> None:
+        latency.enable(False)
+        latency.reset()
+
+    def test_buckets(self):
+        """
+        Tests that bucket values are within the histogram precision
+        """
+        for value in (0, 31, 32, 63, 64, 1000, 123_456, 10 ** 9):
+            low = latency.bucket_value(latency.bucket_index(value))
+            self.assertLessEqual(low, value)
+            self.assertLessEqual(value - low, value / latency.SUB_BUCKETS)
+        self.assertEqual(latency.bucket_index(latency.bucket_value(500)), 500)
+
+    def test_percentiles(self):
+        h = latency.LatencyHistogram()
+        for value in range(1, 1001):
+            h.record(value)
+        summary = h.summary()
+        self.assertEqual((summary['count'], summary['min'], summary['max']), (1000, 1, 1000))
+        self.assertAlmostEqual(summary['mean'], 500.5)
+        self.assertAlmostEqual(summary['p50'], 500, delta=500 / latency.SUB_BUCKETS)
+        self.assertAlmostEqual(summary['p99'], 990, delta=990 / latency.SUB_BUCKETS)
+        with self.assertRaises(ValueError):
+            h.percentile(101)
+
+    def test_disabled(self):
+        """
+        Tests that nothing is recorded while disabled
+        """
+        latency.enable(False)
+        with latency.span('strategy', 'BTCUSDT', 'fetch'):
+            pass
+        latency.record('strategy', 'BTCUSDT', 'fetch', 1.0)
+        latency.mark_tick(1.0)
+        self.assertEqual(latency.clock(), 0.0)
+        self.assertIsNone(latency.since_tick())
+        self.assertEqual(latency.snapshot(), {})
+
+    def test_candle_spans(self):
+        """
+        Tests that a routed candle records receive, queue, stage and tick-to-trade spans
+        """
+        done = threading.Event()
+        ticks = list()
+
+        def stage(candle):
+            ticks.append(latency.since_tick())
+            done.set()
+
+        dispatcher = Dispatcher(channel='linear', websocket=FakeWebSocket())
+        config = TradeConfig(symbol='BTCUSDT', interval=Timeframes.MIN_1, channel='linear')
+        dispatcher.register(config, stage, name='strategy')
+        dispatcher.run()
+        dispatcher.handler(kline_message('BTCUSDT', 1))
+        done.wait(5)
+        dispatcher.terminate()
+
+        phases = {key[2]: key[0] for key in latency.snapshot().keys()}
+        self.assertEqual(phases, {'candle': '', 'queue': 'strategy', 'stage': 'strategy'})
+        self.assertGreater(ticks[0], 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = latency.dump(os.path.join(directory, 'latency.json'))
+            with open(path) as file:
+                rows = json.load(file)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['count'], 1)
+
+
+class ReconnectingWebSocket:
+    def __init__(self):
+        self.connects = 0
+
+    def _connect(self, url):
+        self.connects += 1
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Tests the metrics endpoint
+    """
+
+    def setUp(self) -> None:
+        metrics.reset()
+        latency.reset()
+
+    def tearDown(self) -> None:
+        metrics.reset()
+        latency.enable(False)
+        latency.reset()
+
+    def test_render(self):
+        """
+        Tests counters, collectors and latency summaries in the text format
+        """
+        metrics.inc('bybit_orders_total', strategy='MA "Cross"', symbol='BTCUSDT', result='sent')
+        metrics.inc('bybit_orders_total', strategy='MA "Cross"', symbol='BTCUSDT', result='sent')
+        strategy_queue = StrategyQueue('strategy', lambda candle: None, WorkerPool(1), symbol='ETHUSDT')
+        latency.enable()
+        latency.record('strategy', 'ETHUSDT', 'stage', 0.002)
+
+        text = metrics.render()
+        self.assertIn('# TYPE bybit_orders_total counter', text)
+        self.assertIn('bybit_orders_total{result="sent",strategy="MA \\"Cross\\"",symbol="BTCUSDT"} 2', text)
+        self.assertIn('bybit_strategy_queue_depth{strategy="strategy",symbol="ETHUSDT"} 0', text)
+        self.assertIn('bybit_latency_seconds_count{phase="stage",strategy="strategy",symbol="ETHUSDT"} 1', text)
+        self.assertIn('# TYPE bybit_latency_seconds summary', text)
+
+        # Collectors of garbage collected objects are dropped
+        del strategy_queue
+        self.assertNotIn('bybit_strategy_queue_depth', metrics.render())
+
+    def test_reconnects(self):
+        ws = metrics.count_reconnects(ReconnectingWebSocket(), 'linear')
+        ws._connect("wss://stream")
+        ws._connect("wss://stream")
+        self.assertEqual(ws.connects, 2)
+        self.assertIn('bybit_websocket_reconnects_total{stream="linear"} 2', metrics.render())
+
+    def test_server(self):
+        """
+        Tests that the endpoint serves the metrics on /metrics only
+        """
+        metrics.inc('bybit_rest_requests_total', endpoint='get_kline', symbol='BTCUSDT')
+        server = metrics.MetricsServer(port=0)
+        server.start()
+        try:
+            url = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+                self.assertIn('bybit_rest_requests_total{endpoint="get_kline",symbol="BTCUSDT"} 1',
+                              response.read().decode())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other")
+        finally:
+            server.stop()
+
+    def test_port_in_use(self):
+        """
+        Tests that a port already bound by another process does not raise
+        """
+        server = metrics.MetricsServer(port=0)
+        try:
+            with self.assertLogs('telemetry.metrics', level='WARNING'):
+                self.assertIsNone(metrics.start_server(port=server.port))
+        finally:
+            server.stop()